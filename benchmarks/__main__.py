@@ -0,0 +1,67 @@
+import fnmatch
+import sys
+from optparse import OptionParser
+
+from benchmarks.cases import get_benchmarks
+from benchmarks.runner import (
+    REGRESSION,
+    compare_results,
+    format_result,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def main() -> int:
+    op = OptionParser(usage='python -m benchmarks [options]')
+    op.add_option(
+        '-k', '--filter', action='store', default='*',
+        help='glob pattern of benchmark names to run'
+    )
+    op.add_option(
+        '--min-time', action='store', type=float, default=0.5,
+        help='min seconds spent measuring each benchmark'
+    )
+    op.add_option(
+        '--save', action='store', default=None,
+        help='save results to JSON baseline file'
+    )
+    op.add_option(
+        '--compare', action='store', default=None,
+        help='compare results with JSON baseline file'
+    )
+    op.add_option(
+        '--threshold', action='store', type=float, default=0.1,
+        help='relative throughput change reported as regression or improvement'
+    )
+    (opts, args) = op.parse_args()
+
+    benchmarks = [
+        benchmark for benchmark in get_benchmarks()
+        if fnmatch.fnmatch(benchmark.name, opts.filter)
+    ]
+    results = run_benchmarks(
+        benchmarks,
+        min_time_sec=opts.min_time,
+        report=lambda name, result: print(format_result(name, result))
+    )
+    if opts.save:
+        save_results(results, opts.save)
+    if opts.compare:
+        regressions = 0
+        print()
+        for name, change, verdict in compare_results(
+            results, load_results(opts.compare), opts.threshold
+        ):
+            regressions += verdict == REGRESSION
+            mark = verdict.upper() if verdict else ''
+            print(f'{name:<40} {change:>+8.1%} {mark}')
+        if regressions:
+            print(f'\n{regressions} regression(s) found')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
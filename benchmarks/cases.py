@@ -0,0 +1,150 @@
+import hashlib
+import itertools
+import json
+from datetime import datetime
+from typing import Any
+
+from benchmarks.runner import Benchmark
+from scoring_api.api import codec, constants
+from scoring_api.api.api import (
+    ClientsInterestsRequest,
+    MethodRequest,
+    OnlineScoreRequest,
+)
+from scoring_api.api.handler import build_response, check_auth, method_handler
+from scoring_api.api.scoring import get_interests, get_interests_many, get_score
+from scoring_api.api.store import KeyCacheStore, KeyValueStore, MemoryStorage
+from scoring_api.migrate_interests import migrate_interests
+
+
+def with_token(request: dict) -> dict:
+    if request['login'] == constants.ADMIN_LOGIN:
+        msg = datetime.now().strftime('%Y%m%d%H') + constants.ADMIN_SALT
+    else:
+        msg = request['account'] + request['login'] + constants.SALT
+    request['token'] = hashlib.sha512(msg.encode()).hexdigest()
+    return request
+
+
+SCORE_ARGUMENTS = dict(
+    phone='79175002040',
+    email='stupnikov@otus.ru',
+    first_name='a',
+    last_name='b',
+    birthday='01.01.2000',
+    gender=1,
+)
+CLIENT_IDS = list(range(100))
+SCORE_REQUEST = with_token(dict(
+    account='horns&hoofs',
+    login='h&f',
+    method='online_score',
+    arguments=SCORE_ARGUMENTS,
+))
+ADMIN_SCORE_REQUEST = with_token(dict(
+    SCORE_REQUEST,
+    login=constants.ADMIN_LOGIN,
+))
+INTERESTS_REQUEST = with_token(dict(
+    account='horns&hoofs',
+    login='h&f',
+    method='clients_interests',
+    arguments=dict(client_ids=CLIENT_IDS, date='01.01.2020'),
+))
+
+
+def _build_store() -> KeyValueStore:
+    store = MemoryStorage(max_keys=10_000)
+    for cid in CLIENT_IDS:
+        store.set(f'i:{cid}', json.dumps(['books', 'music', 'travel']))
+    return store
+
+
+def _build_compact_store() -> KeyValueStore:
+    store = _build_store()
+    migrate_interests(store)
+    # dictionary is loaded on the first read
+    get_interests_many(store, CLIENT_IDS)
+    return store
+
+
+def get_benchmarks() -> list[Benchmark]:
+    store = _build_store()
+    compact_store = _build_compact_store()
+    cached_store = KeyCacheStore(store, prefix='i:', max_entries=1000)
+    # unique names make each call a cache miss
+    unique_names = map(str, itertools.count())
+    user_request = MethodRequest(**SCORE_REQUEST)
+    admin_request = MethodRequest(**ADMIN_SCORE_REQUEST)
+    request_body = json.dumps(INTERESTS_REQUEST).encode()
+    interests_response = build_response(
+        get_interests_many(store, CLIENT_IDS), constants.OK
+    )
+
+    def handle(request: dict, target_store: KeyValueStore) -> Any:
+        return method_handler(
+            request={'body': request, 'headers': {}},
+            ctx={},
+            store=target_store
+        )
+
+    return [
+        Benchmark(
+            'schema.method_request',
+            lambda: MethodRequest(**SCORE_REQUEST)
+        ),
+        Benchmark(
+            'schema.online_score_request',
+            lambda: OnlineScoreRequest(**SCORE_ARGUMENTS)
+        ),
+        Benchmark(
+            'schema.clients_interests_request',
+            lambda: ClientsInterestsRequest(**INTERESTS_REQUEST['arguments'])
+        ),
+        Benchmark('check_auth.user', lambda: check_auth(user_request)),
+        Benchmark('check_auth.admin', lambda: check_auth(admin_request)),
+        Benchmark(
+            'get_score.cache_hit',
+            lambda: get_score(store, **SCORE_ARGUMENTS),
+            setup=lambda: get_score(store, **SCORE_ARGUMENTS)
+        ),
+        Benchmark(
+            'get_score.cache_miss',
+            lambda: get_score(
+                store, **dict(SCORE_ARGUMENTS, first_name=next(unique_names))
+            )
+        ),
+        Benchmark('get_interests.single', lambda: get_interests(store, 1)),
+        Benchmark(
+            'get_interests.many_100',
+            lambda: get_interests_many(store, CLIENT_IDS)
+        ),
+        Benchmark(
+            'get_interests.many_100_compact',
+            lambda: get_interests_many(compact_store, CLIENT_IDS)
+        ),
+        Benchmark(
+            'get_interests.many_100_local_cache',
+            lambda: get_interests_many(cached_store, CLIENT_IDS)
+        ),
+        Benchmark(
+            'method_handler.online_score',
+            lambda: handle(SCORE_REQUEST, store)
+        ),
+        Benchmark(
+            'method_handler.online_score_admin',
+            lambda: handle(ADMIN_SCORE_REQUEST, store)
+        ),
+        Benchmark(
+            'method_handler.clients_interests_100',
+            lambda: handle(INTERESTS_REQUEST, store)
+        ),
+        Benchmark(
+            'do_post.json_decode_request',
+            lambda: codec.loads(request_body)
+        ),
+        Benchmark(
+            'do_post.json_encode_interests_100',
+            lambda: codec.dumps(interests_response)
+        ),
+    ]
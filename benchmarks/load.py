@@ -0,0 +1,416 @@
+"""Replays requests against a running server
+
+Requests are read from JSON lines files with bodies of `/method` requests
+or from access logs, whose entries keep the route and the request body.
+Tokens are generated again the way `check_auth` expects them, so captured
+traffic stays valid and admin tokens do not expire.
+
+Open loop mode sends requests at a fixed rate regardless of responses.
+Latency is measured from the time the request was due, so a stalled
+server is charged for the requests queued behind it instead of hiding
+them (coordinated omission). Closed loop mode keeps a fixed number of
+requests in flight, each client sends the next request after the
+response to the previous one
+"""
+import functools
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.client import HTTPConnection, HTTPException
+from optparse import OptionParser
+from typing import Iterable, Iterator
+
+from scoring_api.api.constants import ADMIN_LOGIN, ADMIN_SALT, SALT
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Histogram of latencies with bounded relative error
+
+    Values are kept in microseconds in log-linear buckets like in HDR
+    histogram: each power of two range is split into `SUB_BUCKETS` linear
+    buckets, so values below `2 * SUB_BUCKETS` microseconds are exact and
+    larger ones are within 1% of the real ones
+    """
+    SUB_BUCKETS = 128
+
+    def __init__(self):
+        self.counts: dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record(self, latency_sec: float) -> None:
+        value = max(int(latency_sec * 1e6), 0)
+        self.counts[self._index(value)] += 1
+        self.min_us = min(self.min_us, value) if self.count else value
+        self.max_us = max(self.max_us, value)
+        self.count += 1
+        self.total_us += value
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        if not other.count:
+            return
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.min_us = (
+            min(self.min_us, other.min_us) if self.count else other.min_us
+        )
+        self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+
+    def percentile(self, percent: float) -> float:
+        """Returns latency in seconds below which `percent` of values are"""
+        if not self.count:
+            return 0.
+        rank = max(percent / 100 * self.count, 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value(index), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def mean(self) -> float:
+        return self.total_us / self.count / 1e6 if self.count else 0.
+
+    def _index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.SUB_BUCKETS.bit_length(), 0)
+        return shift * self.SUB_BUCKETS + (value >> shift)
+
+    def _value(self, index: int) -> int:
+        """Returns the highest value of the bucket"""
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        shift, sub_bucket = divmod(index - self.SUB_BUCKETS, self.SUB_BUCKETS)
+        return ((sub_bucket + self.SUB_BUCKETS + 1) << shift) - 1
+
+
+class Stats:
+    """Latencies, response codes and errors by request method"""
+
+    def __init__(self):
+        self.latencies: dict[str, LatencyHistogram] = defaultdict(
+            LatencyHistogram
+        )
+        self.codes: dict[str, dict[int, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.errors: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, method: str, latency_sec: float, code: int | None):
+        with self._lock:
+            self.latencies[method].record(latency_sec)
+            if code is None:
+                self.errors[method] += 1
+            else:
+                self.codes[method][code] += 1
+
+    def summary(self, duration_sec: float) -> dict[str, dict]:
+        """Returns rate, response codes and latency percentiles by method
+
+        Latencies are in milliseconds, `total` combines all methods
+        """
+        total = LatencyHistogram()
+        for histogram in self.latencies.values():
+            total.merge(histogram)
+        summary = {}
+        for method, histogram in [*sorted(self.latencies.items()),
+                                  ('total', total)]:
+            if method == 'total':
+                codes = defaultdict(int)
+                for method_codes in self.codes.values():
+                    for code, count in method_codes.items():
+                        codes[code] += count
+                errors = sum(self.errors.values())
+            else:
+                codes = self.codes[method]
+                errors = self.errors[method]
+            summary[method] = dict(
+                count=histogram.count,
+                rps=histogram.count / duration_sec if duration_sec else 0.,
+                codes={str(code): count for code, count in sorted(
+                    codes.items()
+                )},
+                errors=errors,
+                mean_ms=histogram.mean() * 1000,
+                max_ms=histogram.max_us / 1000,
+                **{
+                    f'p{percent:g}_ms': histogram.percentile(percent) * 1000
+                    for percent in PERCENTILES
+                }
+            )
+        return summary
+
+
+class Request:
+    """Request to replay
+
+    Args:
+        route: path of the request without slashes, e.g. `method`
+        body: decoded request body
+    """
+
+    def __init__(self, route: str, body: dict | list):
+        self.route = route
+        self.body = body
+        if route == 'method' and isinstance(body, dict):
+            self.method = str(body.get('method', 'unknown'))
+        else:
+            self.method = route
+
+    def encode(self, now: float) -> bytes:
+        """Encodes request body with tokens valid at the moment"""
+        body = self.body
+        if isinstance(body, dict):
+            body = sign(body, now)
+        elif isinstance(body, list):
+            body = [sign(item, now) for item in body]
+        return json.dumps(body).encode()
+
+
+def _digest(msg: str) -> str:
+    return hashlib.sha512(msg.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=1024)
+def _user_token(account: str, login: str) -> str:
+    return _digest(account + login + SALT)
+
+
+@functools.lru_cache(maxsize=2)
+def _admin_token(hour: str) -> str:
+    return _digest(hour + ADMIN_SALT)
+
+
+def sign(request: dict, now: float) -> dict:
+    """Returns copy of method request with a valid token"""
+    if not isinstance(request, dict) or 'login' not in request:
+        return request
+    login = str(request['login'])
+    if login == ADMIN_LOGIN:
+        token = _admin_token(
+            datetime.fromtimestamp(now).strftime('%Y%m%d%H')
+        )
+    else:
+        token = _user_token(str(request.get('account') or ''), login)
+    return dict(request, token=token)
+
+
+def read_requests(lines: Iterable[str | bytes]) -> Iterator[Request]:
+    """Parses JSON lines of request bodies or of access log entries
+
+    Access log entries with truncated or invalid requests are skipped
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and 'route' in entry:
+            if entry.get('truncated') or not entry.get('request'):
+                continue
+            try:
+                body = json.loads(entry['request'])
+            except ValueError:
+                continue
+            yield Request(entry['route'], body)
+        else:
+            yield Request('method', entry)
+
+
+def load_requests(paths: list[str]) -> list[Request]:
+    requests = []
+    for path in paths:
+        if path == '-':
+            requests.extend(read_requests(sys.stdin))
+            continue
+        with open(path, 'rb') as f:
+            requests.extend(read_requests(f))
+    return requests
+
+
+class _Client:
+    """Sends requests over a persistent connection of the current thread"""
+
+    def __init__(self, host: str, port: int, timeout_sec: float):
+        self.host = host
+        self.port = port
+        self.timeout_sec = timeout_sec
+        self._local = threading.local()
+
+    def send(self, request: Request) -> int | None:
+        """Sends request and returns response code, None on errors"""
+        body = request.encode(time.time())
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = HTTPConnection(
+                self.host, self.port, timeout=self.timeout_sec
+            )
+        try:
+            connection.request('POST', f'/{request.route}', body=body)
+            response = connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.close()
+            return response.status
+        except (OSError, HTTPException):
+            self.close()
+            return None
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def run_open_loop(
+    requests: list[Request],
+    client: _Client,
+    rps: float,
+    duration_sec: float,
+    max_in_flight: int = 100
+) -> Stats:
+    """Sends requests at a fixed rate
+
+    Requests due while all `max_in_flight` connections are busy wait for a
+    free one, their latency includes the wait
+    """
+    stats = Stats()
+
+    def send(request: Request, due: float) -> None:
+        code = client.send(request)
+        stats.record(request.method, time.perf_counter() - due, code)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        start = time.perf_counter()
+        total = int(rps * duration_sec)
+        for i, request in enumerate(itertools.islice(
+            itertools.cycle(requests), total
+        )):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, request, due)
+    return stats
+
+
+def run_closed_loop(
+    requests: list[Request],
+    client: _Client,
+    concurrency: int,
+    duration_sec: float
+) -> Stats:
+    """Sends requests from `concurrency` clients, each waits for response"""
+    stats = Stats()
+    cycle = itertools.cycle(requests)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_sec
+
+    def run() -> None:
+        while time.perf_counter() < deadline:
+            with lock:
+                request = next(cycle)
+            start = time.perf_counter()
+            code = client.send(request)
+            stats.record(request.method, time.perf_counter() - start, code)
+        client.close()
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def format_summary(summary: dict[str, dict]) -> str:
+    columns = ['p50', 'p90', 'p99', 'p99.9']
+    lines = [
+        f'{"method":<20} {"count":>8} {"rps":>9} {"errors":>7} '
+        + ' '.join(f'{column + " ms":>9}' for column in columns)
+        + f' {"max ms":>9}  codes'
+    ]
+    for method, row in summary.items():
+        codes = ' '.join(
+            f'{code}:{count}' for code, count in row['codes'].items()
+        )
+        lines.append(
+            f'{method:<20} {row["count"]:>8} {row["rps"]:>9.1f} '
+            f'{row["errors"]:>7} '
+            + ' '.join(f'{row[column + "_ms"]:>9.2f}' for column in columns)
+            + f' {row["max_ms"]:>9.2f}  {codes}'
+        )
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    op = OptionParser(
+        usage='python -m benchmarks.load [options] file [file ...]',
+        description='Replays request bodies or access log entries, reads '
+                    'stdin when file is -'
+    )
+    op.add_option('-g', '--host', action='store', type=str, default='localhost')
+    op.add_option('-p', '--port', action='store', type=int, default=8080)
+    op.add_option(
+        '-r', '--rps', action='store', type=float, default=None,
+        help='target requests per second of open loop mode'
+    )
+    op.add_option(
+        '-c', '--concurrency', action='store', type=int, default=10,
+        help='number of clients of closed loop mode, max requests in '
+             'flight of open loop mode'
+    )
+    op.add_option(
+        '-d', '--duration', action='store', type=float, default=10.,
+        help='seconds of sending requests'
+    )
+    op.add_option(
+        '--timeout', action='store', type=float, default=5.,
+        help='seconds to wait for response'
+    )
+    op.add_option(
+        '--save', action='store', default=None,
+        help='save summary to JSON file'
+    )
+    (opts, args) = op.parse_args()
+    if not args:
+        op.error('expected files with requests')
+    requests = load_requests(args)
+    if not requests:
+        op.error('no requests to replay')
+
+    client = _Client(opts.host, opts.port, opts.timeout)
+    start = time.perf_counter()
+    if opts.rps:
+        stats = run_open_loop(
+            requests, client, opts.rps, opts.duration, opts.concurrency
+        )
+    else:
+        stats = run_closed_loop(
+            requests, client, opts.concurrency, opts.duration
+        )
+    summary = stats.summary(time.perf_counter() - start)
+    print(format_summary(summary))
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
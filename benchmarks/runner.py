@@ -0,0 +1,180 @@
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+
+class Benchmark:
+    """Benchmark case
+
+    Args:
+        name: unique name of the case
+        func: function to measure, called without arguments
+        setup: optional function called once before measuring
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], object],
+        setup: Callable[[], None] | None = None
+    ):
+        self.name = name
+        self.func = func
+        self.setup = setup
+
+
+def _calibrate(func: Callable[[], object], sample_time_sec: float) -> int:
+    """Finds number of calls per sample taking at least `sample_time_sec`"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= sample_time_sec:
+            return number
+        number *= 2
+
+
+def run_benchmark(
+    benchmark: Benchmark,
+    min_time_sec: float = 0.5,
+    sample_time_sec: float = 0.001
+) -> dict:
+    """Measures benchmark case
+
+    Calls are grouped into samples of the same size, percentiles are
+    calculated over per call time of samples
+
+    Returns:
+        ops per second, mean and percentiles of a call time in nanoseconds
+    """
+    if benchmark.setup is not None:
+        benchmark.setup()
+    func = benchmark.func
+    number = _calibrate(func, sample_time_sec)
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        deadline = time.perf_counter() + min_time_sec
+        while time.perf_counter() < deadline or len(samples) < 10:
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter_ns() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return dict(
+        ops_per_sec=1e9 / mean,
+        mean_ns=mean,
+        p50_ns=_percentile(samples, 50),
+        p90_ns=_percentile(samples, 90),
+        p99_ns=_percentile(samples, 99),
+        samples=len(samples),
+        calls_per_sample=number,
+    )
+
+
+def _percentile(sorted_samples: list[float], percent: float) -> float:
+    """Linearly interpolates percentile between the closest ranks"""
+    position = percent / 100 * (len(sorted_samples) - 1)
+    index = min(int(position), len(sorted_samples) - 1)
+    if index == len(sorted_samples) - 1:
+        return sorted_samples[index]
+    fraction = position - index
+    return (
+        sorted_samples[index] * (1 - fraction)
+        + sorted_samples[index + 1] * fraction
+    )
+
+
+def run_benchmarks(
+    benchmarks: list[Benchmark],
+    min_time_sec: float = 0.5,
+    report: Callable[[str, dict], None] | None = None
+) -> dict:
+    """Runs benchmark cases
+
+    Returns:
+        results in format of saved baseline
+    """
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = run_benchmark(benchmark, min_time_sec)
+        if report is not None:
+            report(benchmark.name, results[benchmark.name])
+    return dict(
+        meta=dict(
+            python=sys.version.split()[0],
+            implementation=platform.python_implementation(),
+            machine=platform.machine(),
+            created=datetime.now().isoformat(timespec='seconds'),
+        ),
+        results=results,
+    )
+
+
+def save_results(results: dict, path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> dict:
+    """Loads results saved with `save_results`"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+REGRESSION = 'regression'
+IMPROVEMENT = 'improvement'
+
+
+def compare_results(
+    results: dict,
+    baseline: dict,
+    threshold: float = 0.1
+) -> list[tuple[str, float, str | None]]:
+    """Compares throughput of cases present in both runs
+
+    Cases present in only one of the runs are skipped
+
+    Args:
+        results: results of the current run
+        baseline: saved results to compare with
+        threshold: relative throughput change considered as regression or
+            improvement
+
+    Returns:
+        case name, relative throughput change, `REGRESSION`, `IMPROVEMENT`
+        or None when the change is within threshold
+    """
+    comparison = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        change = result['ops_per_sec'] / base['ops_per_sec'] - 1
+        verdict = None
+        if change < -threshold:
+            verdict = REGRESSION
+        elif change > threshold:
+            verdict = IMPROVEMENT
+        comparison.append((name, change, verdict))
+    return comparison
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f'{name:<40} {result["ops_per_sec"]:>14,.0f} ops/s'
+        f'  p50 {result["p50_ns"] / 1000:>9.2f}us'
+        f'  p90 {result["p90_ns"] / 1000:>9.2f}us'
+        f'  p99 {result["p99_ns"] / 1000:>9.2f}us'
+    )
@@ -0,0 +1,212 @@
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from scoring_api.api import codec
+from scoring_api.api.constants import BAD_REQUEST
+from scoring_api.api.metrics import REGISTRY, Gauge
+
+logger = logging.getLogger('scoring_api.access')
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats access log records as JSON lines"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = record.msg
+        if not isinstance(entry, dict):
+            entry = dict(message=record.getMessage())
+        entry = dict(
+            ts=datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            **entry
+        )
+        for field in ('request', 'response'):
+            if isinstance(entry.get(field), bytes):
+                entry[field] = entry[field].decode('utf-8', 'replace')
+        return codec.dumps(entry).decode()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Passes records to the queue as is, drops them if the queue is full
+
+    Records are formatted by the listener thread instead of the request
+    thread
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # waits for a free slot instead of failing when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class AccessLogger:
+    """Sampled access log written by a background thread
+
+    Successful requests are logged with a sample rate chosen by response
+    code, then by route, then the default one. Error requests are always
+    logged. Request and response payloads are truncated to
+    `max_payload_bytes`
+    """
+
+    def __init__(self):
+        self.sample_rate = 1.
+        self.route_sample_rates: dict[str, float] = {}
+        self.code_sample_rates: dict[int, float] = {}
+        self.max_payload_bytes = 1024
+        self._handler: logging.Handler | None = None
+        self._queue_size = 10000
+        self._queue_handler: _NonBlockingQueueHandler | None = None
+        self._listener: _Listener | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        handler: logging.Handler | None = None,
+        sample_rate: float = 1.,
+        route_sample_rates: dict[str, float] | None = None,
+        code_sample_rates: dict[int, float] | None = None,
+        max_payload_bytes: int = 1024,
+        queue_size: int = 10000
+    ) -> None:
+        """Sets up access log
+
+        Args:
+            handler: handler writing log records in background thread, log
+                records are passed to `scoring_api.access` logger
+                synchronously when not set
+            sample_rate: default share of successful requests to log
+            route_sample_rates: sample rates by route
+            code_sample_rates: sample rates by response code
+            max_payload_bytes: max logged size of request and response
+            queue_size: max number of records waiting to be written, new
+                records are dropped when the queue is full
+        """
+        self.stop()
+        self.sample_rate = sample_rate
+        self.route_sample_rates = dict(route_sample_rates or {})
+        self.code_sample_rates = dict(code_sample_rates or {})
+        self.max_payload_bytes = max_payload_bytes
+        self._queue_size = queue_size
+        self._handler = handler
+
+    @property
+    def dropped(self) -> int:
+        """Number of records dropped due to the full queue"""
+        return self._queue_handler.dropped if self._queue_handler else 0
+
+    def should_log(self, route: str, code: int) -> bool:
+        if code >= BAD_REQUEST:
+            return True
+        rate = self.code_sample_rates.get(code)
+        if rate is None:
+            rate = self.route_sample_rates.get(route, self.sample_rate)
+        return rate >= 1 or random.random() < rate
+
+    def log(
+        self,
+        route: str,
+        code: int,
+        context: dict,
+        request: bytes | None,
+        response: bytes | None,
+        duration_sec: float
+    ) -> None:
+        """Logs request if it is sampled
+
+        Payloads are only sliced here, formatting is done by the writer
+        """
+        if not self.should_log(route, code):
+            return
+        entry = dict(
+            route=route,
+            code=code,
+            duration_ms=round(duration_sec * 1000, 3),
+            **context
+        )
+        truncated = False
+        for field, payload in (('request', request), ('response', response)):
+            if payload is None:
+                continue
+            if len(payload) > self.max_payload_bytes:
+                payload = payload[:self.max_payload_bytes]
+                truncated = True
+            entry[field] = payload
+        if truncated:
+            entry['truncated'] = True
+        if self._handler is not None and self._pid != os.getpid():
+            self._start()
+        if self._queue_handler is not None:
+            self._queue_handler.handle(
+                logger.makeRecord(
+                    logger.name, logging.INFO, '', 0, entry, None, None
+                )
+            )
+        else:
+            logger.info(entry)
+
+    def stop(self) -> None:
+        """Writes records left in the queue and stops the writer thread"""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._queue_handler = None
+            self._pid = None
+
+    def _start(self) -> None:
+        # writer thread is started lazily in each process, as threads do not
+        # survive worker fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            log_queue = queue.Queue(maxsize=self._queue_size)
+            self._queue_handler = _NonBlockingQueueHandler(log_queue)
+            self._listener = _Listener(log_queue, self._handler)
+            self._listener.start()
+            self._pid = os.getpid()
+
+
+ACCESS_LOG = AccessLogger()
+
+REGISTRY.register(Gauge(
+    'scoring_access_log_dropped',
+    'Access log records dropped due to the full queue',
+    lambda: ACCESS_LOG.dropped
+))
+
+
+def setup_access_log(
+    filename: str | None = None,
+    **kwargs
+) -> None:
+    """Writes access log as JSON lines to the file or stderr
+
+    Args:
+        filename: path to the log file, stderr is used when not set
+        kwargs: keyword arguments of `AccessLogger.configure`
+    """
+    if filename:
+        handler = logging.FileHandler(filename)
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonLinesFormatter())
+    ACCESS_LOG.configure(handler=handler, **kwargs)
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 import re
 from datetime import date
-from typing import Any
+from typing import Any, Callable
 
 from scoring_api.api.constants import ADMIN_LOGIN, GENDERS
 
@@ -16,7 +16,11 @@ MISSING = Missing()
 
 
 class Field:
-    """Descriptor class for describing data field"""
+    """Descriptor class for describing data field
+
+    Field value is stored in a slot of the schema instance, so instances of
+    the same schema do not share values
+    """
 
     def __init__(
         self,
@@ -26,7 +30,7 @@ class Field:
     ):
         self._required = required
         self._nullable = nullable
-        self._value = None
+        self._slot = None
         if not isinstance(target_type, tuple):
             target_type = target_type,
         else:
@@ -34,25 +38,42 @@ class Field:
                 raise ValueError('Specify at least one field type')
         self._target_types = target_type
 
+    def __set_name__(self, owner, name):
+        self._slot = self.slot_name(name)
+
     def __get__(self, instance, owner):
-        return self._value
+        if instance is None:
+            return self
+        return getattr(instance, self._slot, None)
 
     def __set__(self, instance, value):
-        if value == MISSING and self._required:
-            raise ValueError('required field')
-        if value is None and not self._nullable:
-            raise ValueError('cannot be null')
-        if value == MISSING:
-            value = None
-        elif value is not None:
-            if not any(
-                isinstance(value, target_type)
-                for target_type in self._target_types
-            ):
-                raise ValueError(self._build_type_error_msg(value))
-            self.validate(value)
+        value = self.clean(value)
+        if instance is not None:
+            setattr(instance, self._slot, value)
 
-        self._value = value
+    @staticmethod
+    def slot_name(name: str) -> str:
+        """Name of the schema slot storing the field value"""
+        return f'_field_{name}'
+
+    def clean(self, value: Any) -> Any:
+        """Checks value and converts missing value to None
+
+        Raises:
+            ValueError: raised if value is invalid
+        """
+        if value is MISSING:
+            if self._required:
+                raise ValueError('required field')
+            return None
+        if value is None:
+            if not self._nullable:
+                raise ValueError('cannot be null')
+            return None
+        if not isinstance(value, self._target_types):
+            raise ValueError(self._build_type_error_msg(value))
+        self.validate(value)
+        return value
 
     def validate(self, value: Any) -> None:
         """Extra validation for field
@@ -85,25 +106,75 @@ class Field:
             )
 
 
-class Schema:
-    """Set of data fields"""
+def _compile_fields_validator(
+    schema: type,
+    fields: tuple[tuple[str, Field], ...]
+) -> Callable[[Any, dict], None]:
+    """Builds function validating kwargs and storing values in schema slots
+
+    Field lookups are resolved once here instead of on each instantiation
+    """
+    plan = tuple(
+        (
+            name,
+            f'Invalid `{name}` field: ',
+            field.clean,
+            getattr(schema, Field.slot_name(name)).__set__,
+        )
+        for name, field in fields
+    )
 
-    def __init__(self, **kwargs):
-        fields = []
+    def validate_fields(instance: Any, kwargs: dict) -> None:
         errors = []
-        for key, value in self.__class__.__dict__.items():
-            if isinstance(value, Field):
-                fields.append((key, value))
-        if not len(fields):
-            raise ValueError('Set at least one field for schema')
-        for key, field in fields:
-            value = kwargs.get(key, MISSING)
+        get = kwargs.get
+        for name, error_prefix, clean, store in plan:
             try:
-                field.__set__(self, value)
+                store(instance, clean(get(name, MISSING)))
             except ValueError as e:
-                errors.append(f'Invalid `{key}` field: {e}')
+                errors.append(error_prefix + str(e))
         if errors:
             raise ValueError('\n'.join(errors))
+
+    return validate_fields
+
+
+class SchemaMeta(type):
+    """Collects schema fields once at class creation
+
+    Each field gets a slot for its value, so schema instances have no
+    `__dict__`
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        fields = {}
+        for base in reversed(bases):
+            fields.update(getattr(base, '_fields', ()))
+        own_fields = {
+            key: value
+            for key, value in namespace.items()
+            if isinstance(value, Field)
+        }
+        fields.update(own_fields)
+        namespace.setdefault(
+            '__slots__',
+            tuple(Field.slot_name(key) for key in own_fields)
+        )
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        cls._fields = tuple(fields.items())
+        cls._validate_fields = staticmethod(
+            _compile_fields_validator(cls, cls._fields)
+        )
+        return cls
+
+
+class Schema(metaclass=SchemaMeta):
+    """Set of data fields"""
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        if not self._fields:
+            raise ValueError('Set at least one field for schema')
+        self._validate_fields(self, kwargs)
         self.validate()
 
     def validate(self) -> None:
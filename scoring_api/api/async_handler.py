@@ -0,0 +1,203 @@
+from typing import Any, Optional
+
+from scoring_api.api.api import (
+    ClientsInterestsRequest,
+    MethodRequest,
+    OnlineScoreRequest,
+)
+from scoring_api.api.async_store import AsyncKeyValueStore
+from scoring_api.api.constants import (
+    FORBIDDEN,
+    INVALID_REQUEST,
+    NOT_FOUND,
+    OK,
+)
+from scoring_api.api.handler import check_auth
+from scoring_api.api.interests_format import (
+    DICTIONARY_KEY,
+    INTERESTS_DICTIONARY,
+    UnknownInterestError,
+)
+from scoring_api.api.metrics import (
+    INTERESTS_CLIENTS,
+    SCORE_CACHE,
+    SCORE_COALESCED,
+)
+from scoring_api.api.scoring import (
+    INTERESTS_CHUNK_SIZE,
+    SCORE_CACHE_TTL_SEC,
+    calculate_score,
+    decode_interests,
+    get_interests_key,
+    get_score_key,
+)
+from scoring_api.api.singleflight import AsyncSingleFlight
+from scoring_api.api.timing import stage
+
+_score_flight = AsyncSingleFlight()
+
+
+async def get_score(
+    store: AsyncKeyValueStore,
+    phone: Optional[str | int],
+    email: Optional[str],
+    birthday: Optional[str] = None,
+    gender: Optional[int] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None
+) -> float:
+    """Asynchronous counterpart of `scoring.get_score`"""
+    key = get_score_key(
+        phone=phone,
+        birthday=birthday,
+        first_name=first_name,
+        last_name=last_name
+    )
+    with stage('store'):
+        score = await store.cache_get(key) or 0
+    if score:
+        SCORE_CACHE.inc('hit')
+        return float(score)
+    SCORE_CACHE.inc('miss')
+
+    async def calculate_and_cache() -> float:
+        result = calculate_score(
+            phone=phone,
+            email=email,
+            birthday=birthday,
+            gender=gender,
+            first_name=first_name,
+            last_name=last_name
+        )
+        with stage('store'):
+            await store.cache_set(key, result, SCORE_CACHE_TTL_SEC)
+        return result
+
+    score, coalesced = await _score_flight.do(key, calculate_and_cache)
+    if coalesced:
+        SCORE_COALESCED.inc()
+    return score
+
+
+async def get_interests(
+    store: AsyncKeyValueStore,
+    cid: int | float
+) -> list[str]:
+    """Asynchronous counterpart of `scoring.get_interests`"""
+    with stage('store'):
+        raw = await store.get(get_interests_key(cid))
+    return await _decode_interests(store, raw)
+
+
+async def get_interests_many(
+    store: AsyncKeyValueStore,
+    cids: list[int | float],
+    chunk_size: int = INTERESTS_CHUNK_SIZE
+) -> dict[int | float, list[str]]:
+    """Asynchronous counterpart of `scoring.get_interests_many`"""
+    cids = list(dict.fromkeys(cids))
+    raw = []
+    for start in range(0, len(cids), chunk_size):
+        with stage('store'):
+            raw.extend(await store.get_many([
+                get_interests_key(cid)
+                for cid in cids[start:start + chunk_size]
+            ]))
+    return {cid: await _decode_interests(store, r) for cid, r in zip(cids, raw)}
+
+
+async def _decode_interests(store: AsyncKeyValueStore, raw: Any) -> list[str]:
+    try:
+        return decode_interests(raw)
+    except UnknownInterestError:
+        INTERESTS_DICTIONARY.load(await store.get(DICTIONARY_KEY))
+    return decode_interests(raw)
+
+
+async def method_handler(
+    request: dict,
+    ctx: dict,
+    store: AsyncKeyValueStore
+) -> tuple[dict | str, int]:
+    """Dispatches request processing to specific handlers"""
+    response, code = None, OK
+    try:
+        with stage('request'):
+            method_request = MethodRequest(**request['body'])
+    except ValueError as e:
+        response, code = str(e), INVALID_REQUEST
+    else:
+        with stage('auth'):
+            authorized = check_auth(method_request)
+        if authorized:
+            if method_request.method == 'online_score':
+                ctx.update(method=method_request.method)
+                response, code = await online_score_handler(
+                    method_request, ctx, store
+                )
+            elif method_request.method == 'clients_interests':
+                ctx.update(method=method_request.method)
+                response, code = await clients_interests_handler(
+                    method_request, ctx, store
+                )
+            else:
+                code = NOT_FOUND
+        else:
+            code = FORBIDDEN
+    return response, code
+
+
+async def online_score_handler(
+    method_request: MethodRequest,
+    ctx: dict,
+    store: AsyncKeyValueStore
+) -> tuple[dict | str, int]:
+    """Processes client scoring request"""
+    response, code = None, OK
+    try:
+        with stage('arguments'):
+            request = OnlineScoreRequest(**method_request.arguments)
+    except ValueError as e:
+        response, code = str(e), INVALID_REQUEST
+    else:
+        ctx.update(
+            has=list(method_request.arguments.keys())
+        )
+        if method_request.is_admin:
+            response = dict(
+                score=42
+            )
+        else:
+            response = dict(
+                score=await get_score(
+                    store=store,
+                    phone=request.phone,
+                    email=request.email,
+                    birthday=request.birthday,
+                    gender=request.gender,
+                    first_name=request.first_name,
+                    last_name=request.last_name
+                )
+            )
+    return response, code
+
+
+async def clients_interests_handler(
+    method_request: MethodRequest,
+    ctx: dict,
+    store: AsyncKeyValueStore
+) -> tuple[dict | str, int]:
+    """Processes client interests request"""
+    response, code = None, OK
+    try:
+        with stage('arguments'):
+            request = ClientsInterestsRequest(**method_request.arguments)
+    except ValueError as e:
+        response, code = str(e), INVALID_REQUEST
+    else:
+        ctx.update(
+            nclients=len(request.client_ids)
+        )
+        INTERESTS_CLIENTS.observe(len(request.client_ids))
+        response = await get_interests_many(store, request.client_ids)
+    return response, code
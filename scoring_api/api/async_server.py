@@ -0,0 +1,320 @@
+import asyncio
+import logging
+import time
+import uuid
+from http import HTTPStatus
+
+from scoring_api.api import codec
+from scoring_api.api.access_log import ACCESS_LOG
+from scoring_api.api.async_handler import method_handler
+from scoring_api.api.async_store import AsyncKeyValueStore, get_async_store
+from scoring_api.api.constants import (
+    BAD_REQUEST,
+    INTERNAL_ERROR,
+    MAX_HEADERS,
+    MAX_HEADERS_BYTES,
+    NOT_FOUND,
+    OK,
+    REQUEST_HEADER_FIELDS_TOO_LARGE,
+    REQUEST_TIMEOUT,
+)
+from scoring_api.api.handler import BodyLimits, build_response
+from scoring_api.api.metrics import (
+    METRICS_CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_DURATION,
+)
+from scoring_api.api.timing import (
+    format_server_timing,
+    stage,
+    start_timings,
+    stop_timings,
+    timings_ms,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPServer:
+    """HTTP server built on asyncio serving the same routes as
+    `MainHTTPHandler`
+
+    Supports only the subset of HTTP/1.1 used by the api: POST requests with
+    `Content-Length` body and persistent connections
+    """
+    router = {
+        'method': method_handler
+    }
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8080,
+        idle_timeout_sec: float = 60.,
+        body_limits: BodyLimits | None = None,
+        max_requests_per_connection: int = 100,
+        store_options: dict | None = None
+    ):
+        self._host = host
+        self._port = port
+        self._idle_timeout_sec = idle_timeout_sec
+        self._body_limits = body_limits or BodyLimits()
+        self._max_requests = max_requests_per_connection
+        self._store_options = store_options or {}
+        self._store: AsyncKeyValueStore | None = None
+        self._server: asyncio.Server | None = None
+
+    @property
+    def sockets(self) -> tuple:
+        return self._server.sockets if self._server else ()
+
+    async def start(self) -> None:
+        # redis client is bound to the running loop, so it is created here
+        self._store = get_async_store(**self._store_options)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port
+        )
+        logger.info(
+            'Starting asyncio server at http://%s:%s', self._host, self._port
+        )
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._store is not None:
+            await self._store.close()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            keep_alive = True
+            served = 0
+            while keep_alive:
+                try:
+                    request_line = await asyncio.wait_for(
+                        reader.readline(), self._idle_timeout_sec
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                served += 1
+                keep_alive = await self._handle_request(
+                    request_line, reader, writer,
+                    last=served >= self._max_requests
+                )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self,
+        request_line: bytes,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        last: bool = False
+    ) -> bool:
+        """Processes single request, returns whether to keep connection
+
+        Connection is closed after the `last` request
+        """
+        try:
+            command, path, version = request_line.decode('latin-1').split()
+        except ValueError:
+            await self._write(writer, BAD_REQUEST, b'', keep_alive=False)
+            return False
+        try:
+            # headers should be received within idle timeout, so a client
+            # sending them slowly does not keep the connection forever
+            headers, code = await asyncio.wait_for(
+                self._read_headers(reader), self._idle_timeout_sec
+            )
+        except asyncio.TimeoutError:
+            code = REQUEST_TIMEOUT
+        if code != OK:
+            await self._write(
+                writer, code, codec.dumps(build_response(None, code)),
+                keep_alive=False
+            )
+            return False
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+        keep_alive = keep_alive and not last
+
+        if command == 'GET' and path.strip('/') == 'metrics':
+            await self._write(
+                writer, OK, REGISTRY.render().encode(),
+                keep_alive=keep_alive, content_type=METRICS_CONTENT_TYPE
+            )
+            return keep_alive
+        if command != 'POST':
+            await self._write(
+                writer, HTTPStatus.NOT_IMPLEMENTED, b'', keep_alive=False
+            )
+            return False
+
+        started_at = time.perf_counter()
+        timings = start_timings()
+        response = {}
+        context = {
+            'request_id': headers.get('http_x_request_id', uuid.uuid4().hex)
+        }
+        request = None
+        data_string = None
+        route = path.strip('/')
+        length, code = self._body_limits.check(
+            route,
+            headers.get('content-length'),
+            headers.get('transfer-encoding')
+        )
+        if code == OK:
+            try:
+                with stage('read'):
+                    data_string = await asyncio.wait_for(
+                        reader.readexactly(length),
+                        self._body_limits.timeout_sec
+                    )
+            except asyncio.TimeoutError:
+                code = REQUEST_TIMEOUT
+        if code != OK:
+            # body is not read completely, the connection cannot be reused
+            keep_alive = False
+        else:
+            try:
+                with stage('parse'):
+                    request = codec.loads(data_string)
+            except (ValueError, RecursionError):
+                code = BAD_REQUEST
+                keep_alive = False
+
+        if request:
+            if route in self.router:
+                try:
+                    response, code = await self.router[route](
+                        request={'body': request, 'headers': headers},
+                        ctx=context,
+                        store=self._store
+                    )
+                except Exception as e:
+                    logger.exception('Unexpected error: %s', e)
+                    code = INTERNAL_ERROR
+            else:
+                code = NOT_FOUND
+
+        with stage('serialize'):
+            body = codec.dumps(build_response(response, code))
+        await self._write(
+            writer, code, body, keep_alive=keep_alive,
+            server_timing=format_server_timing(timings)
+        )
+        stop_timings()
+        context.update(timings=timings_ms(timings))
+        duration = time.perf_counter() - started_at
+        route = route if route in self.router else 'unknown'
+        REQUEST_DURATION.observe(
+            duration, route, context.get('method', ''), code
+        )
+        ACCESS_LOG.log(route, code, context, data_string, body, duration)
+        return keep_alive
+
+    @staticmethod
+    async def _read_headers(
+        reader: asyncio.StreamReader
+    ) -> tuple[dict[str, str], int]:
+        """Reads request headers
+
+        Returns:
+            headers by lower case names and `OK` or error code if headers
+            exceed `MAX_HEADERS` or `MAX_HEADERS_BYTES`
+        """
+        headers = {}
+        size = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # line does not fit into the reader buffer
+                return headers, REQUEST_HEADER_FIELDS_TOO_LARGE
+            if line in (b'\r\n', b'\n', b''):
+                return headers, OK
+            size += len(line)
+            if len(headers) >= MAX_HEADERS or size > MAX_HEADERS_BYTES:
+                return headers, REQUEST_HEADER_FIELDS_TOO_LARGE
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _write(
+        writer: asyncio.StreamWriter,
+        code: int,
+        body: bytes,
+        keep_alive: bool,
+        content_type: str = 'application/json',
+        server_timing: str | None = None
+    ) -> None:
+        try:
+            reason = HTTPStatus(code).phrase
+        except ValueError:
+            reason = ''
+        head = [
+            f'HTTP/1.1 {int(code)} {reason}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}',
+            'Connection: ' + ('keep-alive' if keep_alive else 'close'),
+        ]
+        if server_timing:
+            head.append(f'Server-Timing: {server_timing}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+def run_async_server(
+    host: str = 'localhost',
+    port: int = 8080,
+    idle_timeout_sec: float = 60.,
+    body_limits: BodyLimits | None = None,
+    max_requests_per_connection: int = 100,
+    store_options: dict | None = None
+) -> None:
+    """Serves scoring api with asyncio engine
+
+    Args:
+        host: host to listen
+        port: port to listen
+        idle_timeout_sec: max time to wait for the next request over
+            persistent connection
+        body_limits: limits of request bodies, default ones when not set
+        max_requests_per_connection: max number of requests served over
+            persistent connection
+        store_options: keyword arguments of `get_async_store`
+    """
+    server = AsyncHTTPServer(
+        host=host,
+        port=port,
+        idle_timeout_sec=idle_timeout_sec,
+        body_limits=body_limits,
+        max_requests_per_connection=max_requests_per_connection,
+        store_options=store_options
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ACCESS_LOG.stop()
@@ -0,0 +1,237 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio.client import Redis
+from redis.asyncio.connection import (
+    BlockingConnectionPool,
+    Connection,
+    UnixDomainSocketConnection,
+)
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+
+from scoring_api.api.breaker import CircuitBreaker
+from scoring_api.api.store import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncKeyValueStore:
+    """Asynchronous counterpart of `KeyValueStore`"""
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, mapping: dict[str, Any]) -> None:
+        for key, value in mapping.items():
+            await self.set(key, value)
+
+    async def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        raise NotImplementedError
+
+    async def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncRedisStorage(AsyncKeyValueStore):
+    """Asynchronous counterpart of `RedisStorage` with the same options"""
+
+    def __init__(
+        self,
+        host: str = 'redis',
+        port: int = 6379,
+        unix_socket_path: str | None = None,
+        max_connections: int = 50,
+        pool_timeout_sec: float | None = 5.,
+        socket_timeout_sec: float | None = 5.,
+        socket_connect_timeout_sec: float | None = 5.,
+        health_check_interval_sec: int = 0,
+        socket_keepalive: bool = False,
+        breaker_failures: int = 5,
+        breaker_reset_sec: float = 5.,
+        breaker_slow_call_sec: float | None = None
+    ):
+        connection_kwargs = dict(
+            decode_responses=True,
+            socket_connect_timeout=socket_connect_timeout_sec,
+            socket_timeout=socket_timeout_sec,
+            health_check_interval=health_check_interval_sec,
+            retry=Retry(ExponentialBackoff(), 3),
+            retry_on_error=[ConnectionError],
+        )
+        if unix_socket_path:
+            connection_kwargs.update(
+                connection_class=UnixDomainSocketConnection,
+                path=unix_socket_path
+            )
+        else:
+            connection_kwargs.update(
+                connection_class=Connection,
+                host=host,
+                port=port,
+                socket_keepalive=socket_keepalive
+            )
+        self._pool = BlockingConnectionPool(
+            max_connections=max_connections,
+            timeout=pool_timeout_sec,
+            **connection_kwargs
+        )
+        self._redis = Redis(connection_pool=self._pool)
+        self._breaker = CircuitBreaker(
+            failure_threshold=breaker_failures,
+            reset_timeout_sec=breaker_reset_sec,
+            slow_call_sec=breaker_slow_call_sec,
+            name='redis_cache'
+        ) if breaker_failures else None
+
+    async def get(self, key) -> Any:
+        try:
+            return await self._redis.get(key)
+        except ConnectionError as e:
+            logger.exception('Unable to get due to connection error')
+            raise e
+
+    async def set(self, key: str, value: Any) -> None:
+        try:
+            await self._redis.set(key, value)
+        except ConnectionError as e:
+            logger.exception('Unable to set key due to connection error')
+            raise e
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        if not keys:
+            return []
+        try:
+            return await self._redis.mget(keys)
+        except ConnectionError as e:
+            logger.exception('Unable to get keys due to connection error')
+            raise e
+
+    async def set_many(self, mapping: dict[str, Any]) -> None:
+        if not mapping:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, value)
+                await pipe.execute()
+        except ConnectionError as e:
+            logger.exception('Unable to set keys due to connection error')
+            raise e
+
+    async def cache_get(self, key, timeout_sec: int | float = 5) -> Any:
+        return await self._cache_call(
+            lambda: self._redis.get(key),
+            None,
+            'Unable to get cache due to connection error'
+        )
+
+    async def cache_set(self, key, value: Any, ttl: int | float) -> None:
+        await self._cache_call(
+            lambda: self._redis.setex(key, ttl, value),
+            None,
+            'Unable to set cache due to connection error'
+        )
+
+    async def _cache_call(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        default: Any,
+        error_message: str
+    ) -> Any:
+        # the same rules as in `RedisStorage._cache_call`
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            return default
+        started_at = time.perf_counter()
+        try:
+            result = await func()
+        except (ConnectionError, TimeoutError):
+            if breaker is not None:
+                breaker.record_failure()
+            logger.exception(error_message)
+            return default
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success(time.perf_counter() - started_at)
+        return result
+
+    async def flush(self) -> None:
+        await self._redis.flushdb()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+        await self._pool.disconnect()
+
+
+class AsyncMemoryStorage(AsyncKeyValueStore):
+    """Asynchronous interface of in-process `MemoryStorage`"""
+
+    def __init__(
+        self,
+        max_keys: int = 1_000_000,
+        max_bytes: int | None = None
+    ):
+        self._store = MemoryStorage(max_keys=max_keys, max_bytes=max_bytes)
+
+    async def get(self, key: str) -> Any:
+        return self._store.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self._store.set(key, value)
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.get_many(keys)
+
+    async def set_many(self, mapping: dict[str, Any]) -> None:
+        self._store.set_many(mapping)
+
+    async def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        return self._store.cache_get(key, timeout_sec)
+
+    async def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        self._store.cache_set(key, value, ttl)
+
+    async def flush(self) -> None:
+        self._store.flush()
+
+
+def get_async_store(
+    backend: str = 'redis',
+    memory_max_keys: int = 1_000_000,
+    memory_max_bytes: int | None = None,
+    **redis_options
+) -> AsyncKeyValueStore:
+    """Creates asynchronous key value store
+
+    Args:
+        backend: `redis` or in-process `memory` store
+        memory_max_keys: max number of keys of in-process store
+        memory_max_bytes: max approximate size of in-process store
+        redis_options: keyword arguments of `AsyncRedisStorage`
+    """
+    if backend == 'memory':
+        return AsyncMemoryStorage(
+            max_keys=memory_max_keys,
+            max_bytes=memory_max_bytes
+        )
+    if backend != 'redis':
+        raise ValueError(f'unknown store backend {backend}')
+    return AsyncRedisStorage(**redis_options)
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+
+from scoring_api.api.metrics import BREAKER_REJECTED, BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Stops calling failing dependency for a while
+
+    Breaker is closed while calls succeed. It opens after
+    `failure_threshold` consecutive failures, calls slower than
+    `slow_call_sec` are counted as failures too. Open breaker rejects calls
+    for `reset_timeout_sec`, then becomes half-open and lets a single probe
+    call through: breaker closes if the probe succeeds and opens again
+    otherwise
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_sec: float = 5.,
+        slow_call_sec: float | None = None,
+        name: str = 'store'
+    ):
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold should be positive')
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.slow_call_sec = slow_call_sec
+        self.name = name
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Checks if the call should be made
+
+        Caller should report result of an allowed call with `record_success`
+        or `record_failure`
+        """
+        if self._state == self.CLOSED:
+            return True
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at
+                >= self.reset_timeout_sec
+            ):
+                self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            if self._state == self.CLOSED:
+                return True
+        BREAKER_REJECTED.inc(self.name)
+        return False
+
+    def record_success(self, duration_sec: float = 0.) -> None:
+        if self.slow_call_sec is not None and duration_sec > self.slow_call_sec:
+            self.record_failure()
+            return
+        if self._state == self.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def release(self) -> None:
+        """Reports allowed call failed not due to unavailable dependency
+
+        Call result does not change the state, half-open breaker lets the
+        next probe through
+        """
+        if self._probing:
+            with self._lock:
+                self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._state == self.CLOSED
+                and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning('Circuit breaker %s is %s', self.name, state)
+        self._state = state
+        BREAKER_TRANSITIONS.inc(self.name, state)
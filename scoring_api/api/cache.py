@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from scoring_api.api.api import MISSING
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with per entry ttl
+
+    Cache is bounded by number of entries and optionally by approximate size
+    of keys and values in bytes. Least recently used entries are evicted
+    first when any of the bounds is exceeded
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        if max_entries < 1:
+            raise ValueError('max_entries should be positive')
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        # key -> (value, expiration monotonic time, size in bytes)
+        self._entries: OrderedDict[str, tuple[Any, float, int]] = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Gets cached value
+
+        Returns:
+            cached value or `MISSING` if key is not cached or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: int | float) -> None:
+        if ttl <= 0:
+            self.delete(key)
+            return
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while (
+                len(self._entries) > self._max_entries
+                or (
+                    self._max_bytes is not None
+                    and self._bytes > self._max_bytes
+                    and self._entries
+                )
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Returns cache counters"""
+        with self._lock:
+            return dict(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
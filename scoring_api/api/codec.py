@@ -0,0 +1,115 @@
+"""JSON codec working with bytes
+
+Uses orjson when it is installed, falls back to stdlib json otherwise.
+Both backends produce the same data:
+
+- non string dict keys (client ids) are converted to strings
+- non finite floats are encoded as null
+- integers beyond 64 bits are encoded as is
+- documents are decoded strictly: `NaN`, `Infinity` and numbers beyond
+  double range are invalid, integers beyond 64 bits are decoded as floats
+"""
+import json
+import math
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# integers in this range are decoded as integers by orjson
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 64 - 1
+
+
+def _parse_int(value: str) -> int | float:
+    number = int(value)
+    if _INT_MIN <= number <= _INT_MAX:
+        return number
+    try:
+        return float(number)
+    except OverflowError:
+        raise ValueError(f'number {value} is out of range') from None
+
+
+def _parse_float(value: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'number {value} is out of range')
+    return number
+
+
+def _parse_constant(value: str) -> None:
+    raise ValueError(f'{value} is not a valid JSON value')
+
+
+def _finite(obj: Any) -> Any:
+    """Replaces non finite floats with None"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def json_loads(data: bytes | str) -> Any:
+    """Decodes JSON document with stdlib json
+
+    Raises:
+        ValueError: raised if data is not a valid JSON document
+    """
+    return json.loads(
+        data,
+        parse_int=_parse_int,
+        parse_float=_parse_float,
+        parse_constant=_parse_constant
+    )
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encodes object to JSON document with stdlib json
+
+    Raises:
+        TypeError: raised if object is not serializable
+    """
+    try:
+        return json.dumps(obj, allow_nan=False).encode()
+    except ValueError:
+        # non finite floats are rare, so they are replaced only on failure
+        return json.dumps(_finite(obj)).encode()
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def orjson_loads(data: bytes | str) -> Any:
+        """Decodes JSON document with orjson
+
+        Raises:
+            ValueError: raised if data is not a valid JSON document
+        """
+        return orjson.loads(data)
+
+    def orjson_dumps(obj: Any) -> bytes:
+        """Encodes object to JSON document with orjson
+
+        Raises:
+            TypeError: raised if object is not serializable
+        """
+        try:
+            return orjson.dumps(obj, option=_OPTIONS)
+        except TypeError:
+            # integers beyond 64 bits are not supported by orjson
+            return json_dumps(obj)
+
+BACKENDS: dict[str, tuple[Callable[..., Any], Callable[[Any], bytes]]] = {
+    'json': (json_loads, json_dumps),
+}
+if orjson is not None:
+    BACKENDS['orjson'] = (orjson_loads, orjson_dumps)
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+loads, dumps = BACKENDS[BACKEND]
@@ -1,17 +1,36 @@
 SALT = 'Otus'
 ADMIN_LOGIN = 'admin'
 ADMIN_SALT = '42'
+ADMIN_TOKEN_GRACE_SEC = 60
+AUTH_CACHE_SIZE = 100_000
+BATCH_MAX_SIZE = 1000
+INTERESTS_KEY_PREFIX = 'i:'
+# clients interests of larger requests are streamed with chunked encoding
+INTERESTS_STREAM_MIN_CLIENTS = 1000
+MAX_BODY_BYTES = 1024 * 1024
+BODY_TIMEOUT_SEC = 10
+# limits of request headers of asyncio engine, the same as of http.server
+MAX_HEADERS = 100
+MAX_HEADERS_BYTES = 64 * 1024
 OK = 200
 BAD_REQUEST = 400
 FORBIDDEN = 403
 NOT_FOUND = 404
+REQUEST_TIMEOUT = 408
+LENGTH_REQUIRED = 411
+PAYLOAD_TOO_LARGE = 413
 INVALID_REQUEST = 422
+REQUEST_HEADER_FIELDS_TOO_LARGE = 431
 INTERNAL_ERROR = 500
 ERRORS = {
     BAD_REQUEST: 'Bad Request',
     FORBIDDEN: 'Forbidden',
     NOT_FOUND: 'Not Found',
+    REQUEST_TIMEOUT: 'Request Timeout',
+    LENGTH_REQUIRED: 'Length Required',
+    PAYLOAD_TOO_LARGE: 'Payload Too Large',
     INVALID_REQUEST: 'Invalid Request',
+    REQUEST_HEADER_FIELDS_TOO_LARGE: 'Request Header Fields Too Large',
     INTERNAL_ERROR: 'Internal Server Error',
 }
 UNKNOWN = 0
@@ -1,10 +1,14 @@
 import datetime
 import hashlib
-import json
 import logging
+import time
 import uuid
+from functools import partial
 from http.server import BaseHTTPRequestHandler
+from typing import Iterator
 
+from scoring_api.api import codec
+from scoring_api.api.access_log import ACCESS_LOG
 from scoring_api.api.api import (
     ClientsInterestsRequest,
     MethodRequest,
@@ -12,33 +16,120 @@ from scoring_api.api.api import (
 )
 from scoring_api.api.constants import (
     ADMIN_SALT,
+    ADMIN_TOKEN_GRACE_SEC,
+    AUTH_CACHE_SIZE,
     BAD_REQUEST,
+    BATCH_MAX_SIZE,
+    BODY_TIMEOUT_SEC,
     ERRORS,
     FORBIDDEN,
+    INTERESTS_STREAM_MIN_CLIENTS,
     INTERNAL_ERROR,
     INVALID_REQUEST,
+    LENGTH_REQUIRED,
+    MAX_BODY_BYTES,
     NOT_FOUND,
     OK,
+    PAYLOAD_TOO_LARGE,
+    REQUEST_TIMEOUT,
     SALT,
 )
-from scoring_api.api.scoring import get_interests, get_score
-from scoring_api.api.store import KeyValueStore, get_store
+from scoring_api.api.metrics import (
+    INTERESTS_CLIENTS,
+    METRICS_CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_DURATION,
+)
+from scoring_api.api.profiling import PROFILER
+from scoring_api.api.scoring import (
+    decode_interests,
+    get_interests_key,
+    get_interests_many,
+    get_score,
+    get_score_key,
+    iter_interests,
+)
+from scoring_api.api.store import STORE, BatchStore, KeyValueStore
+from scoring_api.api.timing import (
+    format_server_timing,
+    stage,
+    start_timings,
+    stop_timings,
+    timings_ms,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _digest(msg: str) -> str:
+    return hashlib.sha512(msg.encode()).hexdigest()
+
+
+def admin_tokens(now: float) -> tuple[float, frozenset[str]]:
+    """Calculates admin tokens valid at the moment
+
+    Admin token changes every hour. Tokens of the previous and of the next
+    hour are valid too within `ADMIN_TOKEN_GRACE_SEC` around the hour
+    boundary
+
+    Args:
+        now: timestamp
+
+    Returns:
+        timestamp until which the tokens stay the same, valid tokens
+    """
+    hour = datetime.datetime.fromtimestamp(now).replace(
+        minute=0, second=0, microsecond=0
+    )
+    hour_start = hour.timestamp()
+    tokens = {_digest(hour.strftime('%Y%m%d%H') + ADMIN_SALT)}
+    if now < hour_start + ADMIN_TOKEN_GRACE_SEC:
+        previous_hour = hour - datetime.timedelta(hours=1)
+        tokens.add(_digest(previous_hour.strftime('%Y%m%d%H') + ADMIN_SALT))
+        valid_until = hour_start + ADMIN_TOKEN_GRACE_SEC
+    elif now < hour_start + 3600 - ADMIN_TOKEN_GRACE_SEC:
+        valid_until = hour_start + 3600 - ADMIN_TOKEN_GRACE_SEC
+    else:
+        next_hour = hour + datetime.timedelta(hours=1)
+        tokens.add(_digest(next_hour.strftime('%Y%m%d%H') + ADMIN_SALT))
+        valid_until = hour_start + 3600
+    return valid_until, frozenset(tokens)
+
+
+# (timestamp until which the tokens are valid, valid admin tokens),
+# replaced as a whole, so readers never see a partial update
+_admin_tokens = (0., frozenset())
+# verified (account, login, token) triples in order of verification
+_verified_users: dict[tuple[str, str, str], None] = {}
+
+
 def check_auth(request: MethodRequest) -> bool:
+    """Checks request token
+
+    Verified user tokens and admin tokens of the current hour are cached,
+    so the digest is calculated only for the first request of a user
+    """
+    global _admin_tokens
     if request.is_admin:
-        digest = hashlib.sha512(
-            (datetime.datetime.now().strftime('%Y%m%d%H') + ADMIN_SALT).encode()
-        ).hexdigest()
-    else:
-        digest = hashlib.sha512(
-            (request.account + request.login + SALT).encode()
-        ).hexdigest()
-    if digest == request.token:
+        now = time.time()
+        valid_until, tokens = _admin_tokens
+        if now >= valid_until:
+            valid_until, tokens = _admin_tokens = admin_tokens(now)
+        return request.token in tokens
+
+    key = (request.account, request.login, request.token)
+    if key in _verified_users:
         return True
-    return False
+    if _digest(request.account + request.login + SALT) != request.token:
+        return False
+    if len(_verified_users) >= AUTH_CACHE_SIZE:
+        try:
+            del _verified_users[next(iter(_verified_users))]
+        except (KeyError, RuntimeError, StopIteration):
+            # evicted concurrently by another thread
+            pass
+    _verified_users[key] = None
+    return True
 
 
 def method_handler(
@@ -46,38 +137,78 @@ def method_handler(
     ctx: dict,
     store: KeyValueStore
 ) -> tuple[dict | str, int]:
-    """Dispatches request processing to specific handlers"""
-    response, code = None, OK
+    """Dispatches request processing to specific handlers
+
+    Large responses are returned as `StreamedDict` when request allows
+    streaming with `stream` flag
+    """
+    method_request, response, code = _authorize(request['body'])
+    if method_request is None:
+        return response, code
+    return _dispatch(
+        method_request, ctx, store, stream=request.get('stream', False)
+    )
+
+
+def _authorize(body: dict) -> tuple[MethodRequest | None, str | None, int]:
+    """Parses and authenticates method request
+
+    Returns:
+        authorized request or None, error response and code
+    """
     try:
-        method_request = MethodRequest(**request['body'])
+        with stage('request'):
+            method_request = MethodRequest(**body)
     except ValueError as e:
-        response, code = str(e), INVALID_REQUEST
-    else:
-        if check_auth(method_request):
-            if method_request.method == 'online_score':
-                response, code = online_score_handler(
-                    method_request, ctx, store
-                )
-            elif method_request.method == 'clients_interests':
-                response, code = clients_interests_handler(
-                    method_request, ctx, store
-                )
-            else:
-                code = NOT_FOUND
-        else:
-            code = FORBIDDEN
-    return response, code
+        return None, str(e), INVALID_REQUEST
+    with stage('auth'):
+        authorized = check_auth(method_request)
+    if not authorized:
+        return None, None, FORBIDDEN
+    return method_request, None, OK
+
+
+def _dispatch(
+    method_request: MethodRequest,
+    ctx: dict,
+    store: KeyValueStore,
+    stream: bool = False,
+    arguments: OnlineScoreRequest | ClientsInterestsRequest | None = None
+) -> tuple[dict | str, int]:
+    """Processes authorized request with the handler of its method
+
+    Args:
+        arguments: validated arguments of the method, parsed by the handler
+            when not set
+    """
+    if method_request.method == 'online_score':
+        ctx.update(method=method_request.method)
+        return online_score_handler(method_request, ctx, store, arguments)
+    if method_request.method == 'clients_interests':
+        ctx.update(method=method_request.method)
+        return clients_interests_handler(
+            method_request, ctx, store, stream=stream, arguments=arguments
+        )
+    return None, NOT_FOUND
 
 
 def online_score_handler(
     method_request: MethodRequest,
     ctx: dict,
-    store: KeyValueStore
+    store: KeyValueStore,
+    arguments: OnlineScoreRequest | None = None
 ) -> tuple[dict | str, int]:
-    """Processes client scoring request"""
+    """Processes client scoring request
+
+    Arguments of the request are validated unless already validated ones
+    are passed
+    """
     response, code = None, OK
     try:
-        request = OnlineScoreRequest(**method_request.arguments)
+        with stage('arguments'):
+            request = arguments or OnlineScoreRequest(
+                **method_request.arguments
+            )
     except ValueError as e:
         response, code = str(e), INVALID_REQUEST
     else:
@@ -106,77 +237,481 @@ def online_score_handler(
 def clients_interests_handler(
     method_request: MethodRequest,
     ctx: dict,
-    store: KeyValueStore
+    store: KeyValueStore,
+    stream: bool = False,
+    arguments: ClientsInterestsRequest | None = None
 ) -> tuple[dict | str, int]:
-    """Processes client interests request"""
+    """Processes client interests request
+
+    Interests of at least `INTERESTS_STREAM_MIN_CLIENTS` clients are fetched
+    lazily chunk by chunk when `stream` is set. Arguments of the request are
+    validated unless already validated ones are passed
+    """
     response, code = None, OK
     try:
-        request = ClientsInterestsRequest(**method_request.arguments)
+        with stage('arguments'):
+            request = arguments or ClientsInterestsRequest(
+                **method_request.arguments
+            )
     except ValueError as e:
         response, code = str(e), INVALID_REQUEST
     else:
         ctx.update(
             nclients=len(request.client_ids)
         )
-        response = {
-            client_id: get_interests(store, client_id)
-            for client_id in request.client_ids
-        }
+        INTERESTS_CLIENTS.observe(len(request.client_ids))
+        if stream and len(request.client_ids) >= INTERESTS_STREAM_MIN_CLIENTS:
+            response = StreamedDict(iter_interests(store, request.client_ids))
+        else:
+            response = get_interests_many(store, request.client_ids)
     return response, code
 
 
+def _prepare_batch_item(
+    body: dict
+) -> tuple[
+    MethodRequest | None,
+    OnlineScoreRequest | ClientsInterestsRequest | None,
+    str | None,
+    int
+]:
+    """Parses, authenticates and validates batch item once
+
+    The result is used both to plan store reads and to process the item
+
+    Returns:
+        authorized request or None, its validated arguments or None when
+        they are invalid and reported by the handler, error response and
+        code
+    """
+    method_request, response, code = _authorize(body)
+    if method_request is None:
+        return method_request, None, response, code
+    arguments_cls = {
+        'online_score': OnlineScoreRequest,
+        'clients_interests': ClientsInterestsRequest,
+    }.get(method_request.method)
+    arguments = None
+    if arguments_cls is not None:
+        try:
+            with stage('arguments'):
+                arguments = arguments_cls(**method_request.arguments)
+        except ValueError:
+            pass
+    return method_request, arguments, response, code
+
+
+def _plan_store_keys(
+    method_request: MethodRequest | None,
+    arguments: OnlineScoreRequest | ClientsInterestsRequest | None
+) -> tuple[list[str], list[str]]:
+    """Lists store keys and cache keys the method request is going to read
+
+    Invalid requests do not read the store, so no keys are returned for them
+    """
+    if arguments is None:
+        return [], []
+    if method_request.method == 'online_score':
+        if method_request.is_admin:
+            return [], []
+        return [], [get_score_key(
+            phone=arguments.phone,
+            birthday=arguments.birthday,
+            first_name=arguments.first_name,
+            last_name=arguments.last_name
+        )]
+    return [get_interests_key(cid) for cid in arguments.client_ids], []
+
+
+def batch_handler(
+    request: dict,
+    ctx: dict,
+    store: KeyValueStore
+) -> tuple[list | str, int]:
+    """Processes list of method requests
+
+    Each request is authenticated and processed as a separate method request.
+    Store reads of all requests are fetched in advance and cache writes are
+    buffered, so the whole batch costs a few bulk store calls
+    """
+    body = request['body']
+    if not isinstance(body, list):
+        return 'batch should be a list of method requests', INVALID_REQUEST
+    if len(body) > BATCH_MAX_SIZE:
+        return (
+            f'batch should have at most {BATCH_MAX_SIZE} requests, '
+            f'got {len(body)}'
+        ), INVALID_REQUEST
+    ctx.update(nrequests=len(body))
+
+    batch_store = BatchStore(store)
+    # items are parsed once, the same objects are processed after prefetch
+    items = []
+    keys, cache_keys = [], []
+    for item in body:
+        if not isinstance(item, dict):
+            items.append((
+                None, None, 'method request should be an object',
+                INVALID_REQUEST
+            ))
+            continue
+        try:
+            items.append(_prepare_batch_item(item))
+        except Exception as e:
+            logger.exception('Unexpected error: %s', e)
+            items.append((None, None, None, INTERNAL_ERROR))
+            continue
+        item_keys, item_cache_keys = _plan_store_keys(*items[-1][:2])
+        keys.extend(item_keys)
+        cache_keys.extend(item_cache_keys)
+    with stage('store'):
+        # interests are prefetched decoded, so the interests cache of the
+        # store is used
+        batch_store.prefetch(
+            keys, cache_keys, partial(decode_interests, store=store)
+        )
+
+    results = []
+    for method_request, arguments, response, code in items:
+        if method_request is not None:
+            try:
+                response, code = _dispatch(
+                    method_request, {}, batch_store, arguments=arguments
+                )
+            except Exception as e:
+                logger.exception('Unexpected error: %s', e)
+                response, code = None, INTERNAL_ERROR
+        results.append(build_response(response, code))
+    with stage('store'):
+        batch_store.commit()
+    return results, OK
+
+
+class StreamedDict:
+    """Response dict produced part by part
+
+    The first part is produced right away, so errors of producing it are
+    raised by the handler and reported with error response code
+    """
+
+    def __init__(self, parts: Iterator[dict]):
+        self._parts = parts
+        self._first = next(parts, {})
+
+    def __iter__(self) -> Iterator[dict]:
+        yield self._first
+        yield from self._parts
+
+
+def encode_streamed_response(
+    response: StreamedDict,
+    code: int
+) -> Iterator[bytes]:
+    """Encodes body of `build_response` with streamed response part by part"""
+    # the first chunk opens the body, the next ones start with separator
+    prefix = b'{"response": {'
+    for part in response:
+        # dict without braces
+        encoded = codec.dumps(part)[1:-1]
+        if encoded:
+            yield prefix + encoded
+            prefix = b','
+    if prefix == b',':
+        prefix = b''
+    yield prefix + b'}, "code": %d}' % code
+
+
+def build_response(response: dict | str | None, code: int) -> dict:
+    """Wraps handler result into response body"""
+    if code not in ERRORS:
+        return dict(
+            response=response,
+            code=code
+        )
+    return dict(
+        error=response or ERRORS.get(code, 'Unknown Error'),
+        code=code
+    )
+
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+
+class BodyLimits:
+    """Limits of request bodies
+
+    Body length declared by `Content-Length` is checked before reading the
+    body: it should not exceed the route limit from `route_max_bytes` or
+    `max_bytes` for other routes. Whole body should be received within
+    `timeout_sec`
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_BODY_BYTES,
+        route_max_bytes: dict[str, int] | None = None,
+        timeout_sec: float = BODY_TIMEOUT_SEC
+    ):
+        self.max_bytes = max_bytes
+        self.route_max_bytes = dict(route_max_bytes or {})
+        self.timeout_sec = timeout_sec
+
+    def check(
+        self,
+        route: str,
+        content_length: str | None,
+        transfer_encoding: str | None = None
+    ) -> tuple[int, int]:
+        """Validates declared body length
+
+        Returns:
+            body length and `OK` or error code if body should not be read
+        """
+        if (
+            transfer_encoding is not None
+            and transfer_encoding.strip().lower() != 'identity'
+        ):
+            # chunked request bodies are not supported
+            return 0, LENGTH_REQUIRED
+        if content_length is None:
+            return 0, LENGTH_REQUIRED
+        content_length = content_length.strip()
+        if not (content_length.isascii() and content_length.isdigit()):
+            return 0, BAD_REQUEST
+        length = int(content_length)
+        if length > self.route_max_bytes.get(route, self.max_bytes):
+            return length, PAYLOAD_TOO_LARGE
+        return length, OK
+
+
+_DEFAULT_BODY_LIMITS = BodyLimits()
+
+
 class MainHTTPHandler(BaseHTTPRequestHandler):
+    """Handler of api requests
+
+    Persistent HTTP/1.1 connections are kept open while the server allows:
+    server `max_requests_per_connection` limits number of requests served
+    over a single connection and `idle_timeout_sec` limits time of waiting
+    for the next request
+    """
+    protocol_version = 'HTTP/1.1'
     router = {
-        'method': method_handler
+        'method': method_handler,
+        'batch': batch_handler,
     }
-    store = get_store()
+
+    @property
+    def store(self) -> KeyValueStore:
+        # created on first request in each worker process
+        return STORE.get()
+
+    def setup(self) -> None:
+        self.timeout = getattr(self.server, 'idle_timeout_sec', None)
+        self._body_limits = getattr(
+            self.server, 'body_limits', _DEFAULT_BODY_LIMITS
+        )
+        self._max_requests = getattr(
+            self.server, 'max_requests_per_connection', 1
+        )
+        self._requests_served = 0
+        super().setup()
+
+    def log_request(self, code='-', size='-') -> None:
+        # requests are written to access log instead
+        pass
 
     def get_request_id(self, headers) -> str:
         return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
+    def do_GET(self) -> None:
+        if self.path.strip('/') == 'metrics':
+            self._send(OK, REGISTRY.render().encode(), METRICS_CONTENT_TYPE)
+        else:
+            body = codec.dumps(build_response(None, NOT_FOUND))
+            self._send(NOT_FOUND, body)
+
     def do_POST(self) -> None:
-        response, code = {}, OK
+        started_at = time.perf_counter()
+        timings = start_timings()
+        response = {}
         context = {'request_id': self.get_request_id(self.headers)}
         request = None
-        try:
-            data_string = self.rfile.read(int(self.headers['Content-Length']))
-            request = json.loads(data_string)
-        except:
-            code = BAD_REQUEST
+        data_string = None
+        route = self.path.strip('/')
+        length, code = self._body_limits.check(
+            route,
+            self.headers.get('Content-Length'),
+            self.headers.get('Transfer-Encoding')
+        )
+        if code == OK:
+            with stage('read'):
+                data_string, code = self._read_body(
+                    length, self._body_limits.timeout_sec
+                )
+        if code != OK:
+            # body is not read completely, the connection cannot be reused
+            self.close_connection = True
+        else:
+            try:
+                with stage('parse'):
+                    request = codec.loads(data_string)
+            except (ValueError, RecursionError):
+                code = BAD_REQUEST
 
         if request:
-            path = self.path.strip('/')
-            logger.info(
-                '%s: %s %s',
-                self.path, data_string, context['request_id']
-            )
-            if path in self.router:
+            if route in self.router:
+                kwargs = dict(
+                    request={
+                        'body': request,
+                        'headers': self.headers,
+                        # chunked encoding is supported since HTTP/1.1
+                        'stream': self.request_version == 'HTTP/1.1',
+                    },
+                    ctx=context,
+                    store=self.store
+                )
                 try:
-                    response, code = self.router[path](
-                        request={'body': request, 'headers': self.headers},
-                        ctx=context,
-                        store=self.store
-                    )
+                    if (
+                        PROFILER.enabled
+                        and PROFILER.should_profile(self.headers)
+                    ):
+                        (response, code), profile = PROFILER.run(
+                            context['request_id'],
+                            self.router[route],
+                            **kwargs
+                        )
+                        if profile:
+                            context.update(profile=profile)
+                    else:
+                        response, code = self.router[route](**kwargs)
                 except Exception as e:
                     logger.exception('Unexpected error: %s', e)
                     code = INTERNAL_ERROR
             else:
                 code = NOT_FOUND
 
-        self.send_response(code)
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
-        if code not in ERRORS:
-            r = dict(
-                response=response,
-                code=code
+        if isinstance(response, StreamedDict):
+            context.update(streamed=True)
+            # interests fetched while streaming are not in the header
+            body = self._send_chunked(
+                code,
+                encode_streamed_response(response, code),
+                server_timing=format_server_timing(timings)
             )
+            if body is None:
+                code = INTERNAL_ERROR
         else:
-            r = dict(
-                error=response or ERRORS.get(code, 'Unknown Error'),
-                code=code
-            )
-        context.update(r)
-        logger.info(context)
-        self.wfile.write(json.dumps(r).encode())
-        return
+            with stage('serialize'):
+                body = codec.dumps(build_response(response, code))
+            self._send(code, body, server_timing=format_server_timing(timings))
+        stop_timings()
+        context.update(timings=timings_ms(timings))
+        duration = time.perf_counter() - started_at
+        route = route if route in self.router else 'unknown'
+        REQUEST_DURATION.observe(
+            duration, route, context.get('method', ''), code
+        )
+        ACCESS_LOG.log(route, code, context, data_string, body, duration)
+
+    def _read_body(
+        self,
+        length: int,
+        timeout_sec: float
+    ) -> tuple[bytes | None, int]:
+        """Reads body of the declared length
+
+        Returns:
+            body and `OK`, or None and error code if body was cut off or not
+            received within timeout
+        """
+        chunks = []
+        remaining = length
+        deadline = time.monotonic() + timeout_sec
+        try:
+            while remaining:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    return None, REQUEST_TIMEOUT
+                # socket timeout bounds each read, deadline bounds the body
+                self.connection.settimeout(timeout)
+                chunk = self.rfile.read1(min(remaining, _READ_CHUNK_BYTES))
+                if not chunk:
+                    return None, BAD_REQUEST
+                chunks.append(chunk)
+                remaining -= len(chunk)
+        except TimeoutError:
+            return None, REQUEST_TIMEOUT
+        except OSError:
+            return None, BAD_REQUEST
+        finally:
+            if length:
+                self.connection.settimeout(self.timeout)
+        return b''.join(chunks), OK
+
+    def _send(
+        self,
+        code: int,
+        body: bytes,
+        content_type: str = 'application/json',
+        server_timing: str | None = None
+    ) -> None:
+        self._requests_served += 1
+        if (
+            self._requests_served >= self._max_requests
+            or getattr(self.server, 'stopping', False)
+        ):
+            self.close_connection = True
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+        self.send_header(
+            'Connection', 'close' if self.close_connection else 'keep-alive'
+        )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(
+        self,
+        code: int,
+        chunks: Iterator[bytes],
+        content_type: str = 'application/json',
+        server_timing: str | None = None
+    ) -> bytes | None:
+        """Sends body with chunked transfer encoding
+
+        Returns:
+            the first chunk of body for logging, None if body could not be
+            produced or sent completely
+        """
+        self._requests_served += 1
+        if (
+            self._requests_served >= self._max_requests
+            or getattr(self.server, 'stopping', False)
+        ):
+            self.close_connection = True
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+        self.send_header(
+            'Connection', 'close' if self.close_connection else 'keep-alive'
+        )
+        self.end_headers()
+        first = None
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = chunk
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            # status is already sent, so the response is cut off and the
+            # client sees incomplete body
+            logger.exception('Unable to stream response: %s', e)
+            self.close_connection = True
+            return None
+        return first
@@ -0,0 +1,91 @@
+"""Storage formats of clients interests
+
+Interests were stored as JSON lists of names (version 1). Compact format
+(version 2) stores ids of interned interest names joined by comma after
+`v2:` marker, e.g. `v2:0,5,17`. Names of ids are kept as JSON list under
+`DICTIONARY_KEY`, ids are never reassigned, so the list is only appended
+to. Readers accept both versions
+"""
+import threading
+from typing import Any
+
+from scoring_api.api import codec
+
+COMPACT_PREFIX = 'v2:'
+DICTIONARY_KEY = 'interests:dictionary'
+
+
+class UnknownInterestError(LookupError):
+    """Raised when compact interests refer to id missing in dictionary"""
+    pass
+
+
+class InterestsDictionary:
+    """In-process copy of interned interest names
+
+    Dictionary is reloaded from store when an unknown id is met. It is
+    extended by a single writer, e.g. migration tool, as concurrent writers
+    would assign the same id to different names
+    """
+
+    def __init__(self):
+        self._names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def load(self, raw: Any) -> None:
+        """Replaces dictionary with the stored one"""
+        names = codec.loads(raw) if raw else []
+        with self._lock:
+            self._names = names
+            self._ids = {name: i for i, name in enumerate(names)}
+
+    def dump(self) -> str:
+        return codec.dumps(self._names).decode()
+
+    def clear(self) -> None:
+        self.load(None)
+
+    def decode(self, raw: str) -> list[str]:
+        """Decodes interests in compact format
+
+        Raises:
+            UnknownInterestError: raised if id is not in dictionary
+        """
+        body = raw[len(COMPACT_PREFIX):]
+        if not body:
+            return []
+        names = self._names
+        try:
+            return [names[int(i)] for i in body.split(',')]
+        except IndexError:
+            raise UnknownInterestError(raw) from None
+
+    def encode(self, interests: list[str]) -> tuple[str, bool]:
+        """Encodes interests in compact format, unknown names are interned
+
+        Returns:
+            encoded interests and whether dictionary was extended, extended
+            dictionary should be stored before encoded interests
+        """
+        extended = False
+        ids = []
+        with self._lock:
+            for name in interests:
+                i = self._ids.get(name)
+                if i is None:
+                    i = self._ids[name] = len(self._names)
+                    self._names.append(name)
+                    extended = True
+                ids.append(str(i))
+        return COMPACT_PREFIX + ','.join(ids), extended
+
+
+def is_compact(raw: Any) -> bool:
+    return isinstance(raw, str) and raw.startswith(COMPACT_PREFIX)
+
+
+INTERESTS_DICTIONARY = InterestsDictionary()
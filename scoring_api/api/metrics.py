@@ -0,0 +1,464 @@
+import bisect
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# how often workers sharing metrics write their snapshots
+SNAPSHOT_INTERVAL_SEC = 1.
+# snapshot of metrics of exited workers
+_RETIRED = 'retired'
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    """Base class of metrics recorded without locks
+
+    Each thread records into its own shard, shards are merged on rendering.
+    The lock is taken only when a thread records for the first time
+    """
+    type_name = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def values(self) -> dict[tuple, Any]:
+        raise NotImplementedError
+
+    @staticmethod
+    def add(value: Any, other: Any) -> Any:
+        """Merges values of the same labels recorded by different workers"""
+        raise NotImplementedError
+
+    def render(
+        self,
+        values: dict[tuple, Any] | None = None,
+        labelnames: tuple[str, ...] | None = None
+    ) -> list[str]:
+        """Renders samples of the metric
+
+        Args:
+            values: values by label values to render instead of recorded
+                ones, e.g. merged values of several workers
+            labelnames: names of label values, the ones of the metric when
+                not set
+        """
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} {self.type_name}',
+        ] + self._render_samples(
+            self.values() if values is None else values,
+            self.labelnames if labelnames is None else labelnames
+        )
+
+    def _render_samples(
+        self,
+        values: dict[tuple, Any],
+        labelnames: tuple[str, ...]
+    ) -> list[str]:
+        return [
+            f'{self.name}{_format_labels(labelnames, labelvalues)} {value}'
+            for labelvalues, value in sorted(values.items())
+        ]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, *labelvalues, amount: int | float = 1) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def values(self) -> dict[tuple, int | float]:
+        """Returns totals by label values"""
+        totals = {}
+        for snapshot in self._snapshots():
+            for labelvalues, value in snapshot.items():
+                totals[labelvalues] = totals.get(labelvalues, 0) + value
+        return totals
+
+    @staticmethod
+    def add(value: int | float, other: int | float) -> int | float:
+        return value + other
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+    DEFAULT_BUCKETS = (
+        .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5.
+    )
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: int | float, *labelvalues) -> None:
+        shard = self._shard()
+        series = shard.get(labelvalues)
+        if series is None:
+            # counts of buckets and +Inf bucket, sum of values
+            series = shard[labelvalues] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def values(self) -> dict[tuple, tuple[list[int], int | float]]:
+        """Returns not cumulative bucket counts and sum by label values"""
+        totals = {}
+        for snapshot in self._snapshots():
+            for labelvalues, (counts, total) in snapshot.items():
+                merged = totals.setdefault(
+                    labelvalues, [[0] * (len(self.buckets) + 1), 0]
+                )
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        return {key: (value[0], value[1]) for key, value in totals.items()}
+
+    @staticmethod
+    def add(
+        value: tuple[list[int], int | float],
+        other: tuple[list[int], int | float]
+    ) -> tuple[list[int], int | float]:
+        return [a + b for a, b in zip(value[0], other[0])], value[1] + other[1]
+
+    def _render_samples(
+        self,
+        values: dict[tuple, tuple[list[int], int | float]],
+        labelnames: tuple[str, ...]
+    ) -> list[str]:
+        lines = []
+        bucket_labelnames = labelnames + ('le',)
+        for labelvalues, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(
+                    bucket_labelnames, labelvalues + (bound,)
+                )
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _Computed(_Metric):
+    """Metric calculated on rendering
+
+    Without labels `func` returns the value, with labels it returns values by
+    label values. Nothing is rendered when it returns None
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        func: Callable[[], int | float | dict[tuple, int | float] | None],
+        labelnames: tuple = ()
+    ):
+        super().__init__(name, help_text, labelnames)
+        self._func = func
+
+    def values(self) -> dict[tuple, int | float]:
+        value = self._func()
+        if value is None:
+            return {}
+        return value if self.labelnames else {(): value}
+
+
+class Gauge(_Computed):
+    """Gauge calculated on rendering
+
+    Gauges of workers sharing metrics are not merged, each worker value is
+    rendered with `worker` label
+    """
+    type_name = 'gauge'
+
+
+class ComputedCounter(_Computed):
+    """Counter calculated on rendering, e.g. from counters of a cache
+
+    Values of workers sharing metrics are summed up like of `Counter`
+    """
+    type_name = 'counter'
+    add = staticmethod(Counter.add)
+
+
+class Registry:
+    """Metrics of the process
+
+    Pre-forked workers share metrics through a directory, so any worker
+    renders metrics of all of them. Each worker writes snapshot of its
+    metrics to `<directory>/<pid>.json` every `SNAPSHOT_INTERVAL_SEC` and
+    before rendering. Counters and histograms of all workers are summed up,
+    the ones of exited workers are kept in `retired.json`, so totals do not
+    drop when a worker is restarted
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._directory: str | None = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Registers metric, metric with the same name is replaced"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def share(
+        self,
+        directory: str,
+        interval_sec: float | None = SNAPSHOT_INTERVAL_SEC
+    ) -> None:
+        """Shares metrics of the process through the directory
+
+        Args:
+            directory: existing directory shared by workers
+            interval_sec: how often snapshot of metrics is written, only
+                before rendering when None
+        """
+        self._directory = directory
+        if interval_sec is None:
+            return
+        threading.Thread(
+            target=self._write_snapshots,
+            args=(interval_sec,),
+            name='metrics-snapshot',
+            daemon=True
+        ).start()
+
+    def write_snapshot(self) -> None:
+        """Writes snapshot of metrics when they are shared"""
+        if self._directory is None:
+            return
+        snapshot = {
+            metric.name: list(metric.values().items())
+            for metric in list(self._metrics.values())
+        }
+        _write_json(
+            os.path.join(self._directory, f'{os.getpid()}.json'), snapshot
+        )
+
+    def retire(self, directory: str, pid: int) -> None:
+        """Moves counters and histograms of exited worker to `retired.json`
+
+        Gauges of the worker are dropped
+        """
+        path = os.path.join(directory, f'{pid}.json')
+        with _locked(directory, exclusive=True):
+            snapshot = _read_json(path)
+            if snapshot is None:
+                return
+            retired = _read_json(
+                os.path.join(directory, f'{_RETIRED}.json')
+            ) or {}
+            for metric in list(self._metrics.values()):
+                if isinstance(metric, Gauge):
+                    continue
+                retired[metric.name] = list(self._merge(metric, [
+                    retired.get(metric.name, []),
+                    snapshot.get(metric.name, [])
+                ]).items())
+            _write_json(os.path.join(directory, f'{_RETIRED}.json'), retired)
+            os.remove(path)
+
+    def render(self) -> str:
+        """Renders metrics in Prometheus text format"""
+        lines = []
+        if self._directory is None:
+            for metric in list(self._metrics.values()):
+                lines.extend(metric.render())
+            return '\n'.join(lines) + '\n'
+        self.write_snapshot()
+        snapshots = self._read_snapshots()
+        for metric in list(self._metrics.values()):
+            if isinstance(metric, Gauge):
+                lines.extend(metric.render({
+                    (worker, *labelvalues): value
+                    for worker, snapshot in sorted(snapshots.items())
+                    for labelvalues, value in snapshot.get(metric.name, [])
+                }, ('worker',) + metric.labelnames))
+            else:
+                lines.extend(metric.render(self._merge(metric, [
+                    snapshot.get(metric.name, [])
+                    for snapshot in snapshots.values()
+                ])))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _merge(metric: _Metric, samples: list[list]) -> dict[tuple, Any]:
+        merged = {}
+        for worker_samples in samples:
+            for labelvalues, value in worker_samples:
+                labelvalues = tuple(labelvalues)
+                merged[labelvalues] = (
+                    metric.add(merged[labelvalues], value)
+                    if labelvalues in merged else value
+                )
+        return merged
+
+    def _read_snapshots(self) -> dict[str, dict]:
+        snapshots = {}
+        with _locked(self._directory, exclusive=False):
+            for name in os.listdir(self._directory):
+                if not name.endswith('.json'):
+                    continue
+                snapshot = _read_json(os.path.join(self._directory, name))
+                if snapshot is not None:
+                    snapshots[name[:-len('.json')]] = snapshot
+        return snapshots
+
+    def _write_snapshots(self, interval_sec: float) -> None:
+        while True:
+            time.sleep(interval_sec)
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                logger.warning('Unable to write metrics snapshot: %s', e)
+
+
+@contextlib.contextmanager
+def _locked(directory: str, exclusive: bool) -> Iterator[None]:
+    """Keeps snapshots from being retired while they are read"""
+    with open(os.path.join(directory, '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json(path: str) -> Any:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, value: Any) -> None:
+    # replaced atomically, so readers never see partially written file
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+_process_started_at = time.time()
+
+
+def _reset_process_start_time() -> None:
+    global _process_started_at
+    _process_started_at = time.time()
+
+
+# forked workers report their own start time
+os.register_at_fork(after_in_child=_reset_process_start_time)
+
+REGISTRY.register(Gauge(
+    'scoring_process_start_time_seconds',
+    'Start time of the process since unix epoch in seconds',
+    lambda: _process_started_at
+))
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'scoring_request_duration_seconds',
+    'Time of processing requests',
+    labelnames=('route', 'method', 'code')
+))
+SCORE_CACHE = REGISTRY.register(Counter(
+    'scoring_score_cache_total',
+    'Score cache lookups',
+    labelnames=('result',)
+))
+SCORE_COALESCED = REGISTRY.register(Counter(
+    'scoring_score_coalesced_total',
+    'Score cache misses served by concurrent calculation of the same score'
+))
+INTERESTS_CLIENTS = REGISTRY.register(Histogram(
+    'scoring_interests_clients',
+    'Number of client ids in clients interests requests',
+    buckets=(1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+))
+STORE_POOL_WAIT = REGISTRY.register(Histogram(
+    'scoring_store_pool_wait_seconds',
+    'Time of waiting for a store connection from pool'
+))
+BREAKER_TRANSITIONS = REGISTRY.register(Counter(
+    'scoring_breaker_transitions_total',
+    'Circuit breaker state changes',
+    labelnames=('breaker', 'state')
+))
+BREAKER_REJECTED = REGISTRY.register(Counter(
+    'scoring_breaker_rejected_total',
+    'Calls rejected by open circuit breaker',
+    labelnames=('breaker',)
+))
+WRITE_BEHIND_DROPPED = REGISTRY.register(Counter(
+    'scoring_cache_write_behind_dropped_total',
+    'Cached values dropped due to the full write behind queue'
+))
+
+
+def _score_cache_hit_ratio() -> float | None:
+    values = SCORE_CACHE.values()
+    hits = values.get(('hit',), 0)
+    total = hits + values.get(('miss',), 0)
+    return hits / total if total else None
+
+
+REGISTRY.register(Gauge(
+    'scoring_score_cache_hit_ratio',
+    'Ratio of score cache hits to all score cache lookups',
+    _score_cache_hit_ratio
+))
@@ -0,0 +1,142 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Mapping
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+# top allocation sites written to memory profile
+MEMORY_TOP_LINES = 25
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class RequestProfiler:
+    """Profiles handling of sampled requests
+
+    Requests are profiled with `sample_rate` probability or when they have
+    `X-Profile` header with the configured token. Call stats are written to
+    `<directory>/<time>-<request id>.prof` and can be read with `pstats`,
+    with `memory` enabled allocations made by the request are written next
+    to them as `.mem.txt`. Only one request is profiled at a time, requests
+    sampled meanwhile are handled as usual
+    """
+
+    def __init__(self):
+        self.directory: str | None = None
+        self.sample_rate = 0.
+        self.token: str | None = None
+        self.memory = False
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        directory: str | None = None,
+        sample_rate: float = 0.,
+        token: str | None = None,
+        memory: bool = False
+    ) -> None:
+        """Sets up profiling, disabled when directory is not set
+
+        Args:
+            directory: directory to write profiles to, created if missing
+            sample_rate: share of requests to profile
+            token: value of `X-Profile` header requesting profiling
+            memory: also trace memory allocations with tracemalloc
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token or None
+        self.memory = memory
+        self.enabled = bool(directory) and (sample_rate > 0 or bool(token))
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, headers: Mapping[str, str]) -> bool:
+        header = headers.get(PROFILE_HEADER)
+        if header is not None and self.token is not None:
+            return hmac.compare_digest(header.encode(), self.token.encode())
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def run(
+        self,
+        request_id: str,
+        func: Callable[..., Any],
+        **kwargs
+    ) -> tuple[Any, str | None]:
+        """Calls function under profiler
+
+        Returns:
+            result of the function and path of written call stats, None if
+            the request was not profiled, e.g. another one is being
+            profiled
+        """
+        if not self._lock.acquire(blocking=False):
+            return func(**kwargs), None
+        try:
+            profiler = cProfile.Profile()
+            # tracing started elsewhere, e.g. with PYTHONTRACEMALLOC, is
+            # kept running
+            started = self.memory and not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            snapshot = tracemalloc.take_snapshot() if self.memory else None
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # another profiler is active, e.g. coverage
+                logger.warning('Unable to profile request: %s', e)
+                if started:
+                    tracemalloc.stop()
+                return func(**kwargs), None
+            try:
+                result = func(**kwargs)
+            finally:
+                profiler.disable()
+                path = self._dump(request_id, profiler, snapshot, started)
+        finally:
+            self._lock.release()
+        return result, path
+
+    def _dump(
+        self,
+        request_id: str,
+        profiler: cProfile.Profile,
+        snapshot: tracemalloc.Snapshot | None,
+        stop_tracing: bool
+    ) -> str | None:
+        path = os.path.join(
+            self.directory,
+            '{}-{}'.format(
+                time.strftime('%Y%m%d%H%M%S'),
+                _UNSAFE_CHARS.sub('_', request_id)[:64]
+            )
+        )
+        try:
+            if snapshot is not None:
+                try:
+                    stats = tracemalloc.take_snapshot().compare_to(
+                        snapshot, 'lineno'
+                    )
+                finally:
+                    if stop_tracing:
+                        tracemalloc.stop()
+                with open(path + '.mem.txt', 'w') as f:
+                    for stat in stats[:MEMORY_TOP_LINES]:
+                        f.write(f'{stat}\n')
+            profiler.dump_stats(path + '.prof')
+        except OSError as e:
+            logger.warning('Unable to write profile %s: %s', path, e)
+            return None
+        return path + '.prof'
+
+
+PROFILER = RequestProfiler()
@@ -1,33 +1,56 @@
 import hashlib
-import json
-from typing import Optional
+from functools import partial
+from typing import Any, Iterator, Optional
 
+from scoring_api.api import codec
+from scoring_api.api.constants import INTERESTS_KEY_PREFIX
+from scoring_api.api.interests_format import (
+    DICTIONARY_KEY,
+    INTERESTS_DICTIONARY,
+    UnknownInterestError,
+    is_compact,
+)
+from scoring_api.api.metrics import SCORE_CACHE, SCORE_COALESCED
+from scoring_api.api.singleflight import SingleFlight
 from scoring_api.api.store import KeyValueStore
+from scoring_api.api.timing import stage
 
+SCORE_CACHE_TTL_SEC = 60 * 60
+# max number of keys fetched from store in a single call
+INTERESTS_CHUNK_SIZE = 1000
 
-def get_score(
-    store: KeyValueStore,
+# concurrent misses of the same score wait for a single calculation
+_score_flight = SingleFlight()
+
+
+def get_score_key(
     phone: Optional[str | int],
-    email: Optional[str],
     birthday: Optional[str] = None,
-    gender: Optional[int] = None,
     first_name: Optional[str] = None,
     last_name: Optional[str] = None
-) -> float:
+) -> str:
+    """Builds cache key of the score of the person"""
     key_parts = [
         first_name or '',
         last_name or '',
         phone or '',
         birthday or '',
     ]
-    key = 'uid:' + hashlib.md5(
+    return 'uid:' + hashlib.md5(
         ''.join(map(str, key_parts)).encode('utf-8')
     ).hexdigest()
-    # try get from cache,
-    # fallback to heavy calculation in case of cache miss
-    score = store.cache_get(key) or 0
-    if score:
-        return float(score)
+
+
+def calculate_score(
+    phone: Optional[str | int],
+    email: Optional[str],
+    birthday: Optional[str] = None,
+    gender: Optional[int] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None
+) -> float:
+    """Heavy score calculation used in case of cache miss"""
+    score = 0
     if phone:
         score += 1.5
     if email:
@@ -36,14 +59,130 @@ def get_score(
         score += 1.5
     if first_name and last_name:
         score += 0.5
-    # cache for 60 minutes
-    store.cache_set(key, score, 60 * 60)
     return score
 
 
+def get_score(
+    store: KeyValueStore,
+    phone: Optional[str | int],
+    email: Optional[str],
+    birthday: Optional[str] = None,
+    gender: Optional[int] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None
+) -> float:
+    key = get_score_key(
+        phone=phone,
+        birthday=birthday,
+        first_name=first_name,
+        last_name=last_name
+    )
+    # try get from cache,
+    # fallback to heavy calculation in case of cache miss
+    with stage('store'):
+        score = store.cache_get(key) or 0
+    if score:
+        SCORE_CACHE.inc('hit')
+        return float(score)
+    SCORE_CACHE.inc('miss')
+
+    def calculate_and_cache() -> float:
+        result = calculate_score(
+            phone=phone,
+            email=email,
+            birthday=birthday,
+            gender=gender,
+            first_name=first_name,
+            last_name=last_name
+        )
+        # cache for 60 minutes
+        with stage('store'):
+            store.cache_set(key, result, SCORE_CACHE_TTL_SEC)
+        return result
+
+    score, coalesced = _score_flight.do(key, calculate_and_cache)
+    if coalesced:
+        SCORE_COALESCED.inc()
+    return score
+
+
+def get_interests_key(cid: int | float) -> str:
+    return f'{INTERESTS_KEY_PREFIX}{cid}'
+
+
+def decode_interests(
+    raw: Any,
+    store: Optional[KeyValueStore] = None
+) -> list[str]:
+    """Decodes interests stored in JSON or compact format
+
+    Args:
+        raw: stored interests
+        store: store to reload interests dictionary from when compact
+            interests refer to unknown ids
+    """
+    if not raw:
+        return []
+    if not is_compact(raw):
+        return codec.loads(raw)
+    try:
+        return INTERESTS_DICTIONARY.decode(raw)
+    except UnknownInterestError:
+        if store is None:
+            raise
+    INTERESTS_DICTIONARY.load(store.get(DICTIONARY_KEY))
+    return INTERESTS_DICTIONARY.decode(raw)
+
+
 def get_interests(
     store: KeyValueStore,
     cid: int | float
 ) -> list[str]:
-    r = store.get('i:%s' % cid)
-    return json.loads(r) if r else []
+    with stage('store'):
+        return store.get_many_decoded(
+            [get_interests_key(cid)], partial(decode_interests, store=store)
+        )[0]
+
+
+def iter_interests(
+    store: KeyValueStore,
+    cids: list[int | float],
+    chunk_size: int = INTERESTS_CHUNK_SIZE
+) -> Iterator[dict[int | float, list[str]]]:
+    """Gets interests of several clients chunk by chunk
+
+    Each chunk is fetched with a single bulk store request when the next
+    chunk is requested
+
+    Args:
+        store: key value store with interests
+        cids: client ids
+        chunk_size: max number of keys fetched in a single store call
+    """
+    cids = list(dict.fromkeys(cids))
+    decode = partial(decode_interests, store=store)
+    for start in range(0, len(cids), chunk_size):
+        chunk = cids[start:start + chunk_size]
+        with stage('store'):
+            interests = store.get_many_decoded(
+                [get_interests_key(cid) for cid in chunk], decode
+            )
+        yield dict(zip(chunk, interests))
+
+
+def get_interests_many(
+    store: KeyValueStore,
+    cids: list[int | float],
+    chunk_size: int = INTERESTS_CHUNK_SIZE
+) -> dict[int | float, list[str]]:
+    """Gets interests of several clients with bulk store requests
+
+    Args:
+        store: key value store with interests
+        cids: client ids
+        chunk_size: max number of keys fetched in a single store call
+    """
+    interests = {}
+    for chunk in iter_interests(store, cids, chunk_size):
+        interests.update(chunk)
+    return interests
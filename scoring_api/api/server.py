@@ -1,16 +1,294 @@
 import logging
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer
 
-from scoring_api.api.handler import MainHTTPHandler
+from scoring_api.api.access_log import ACCESS_LOG
+from scoring_api.api.handler import BodyLimits, MainHTTPHandler
+from scoring_api.api.metrics import REGISTRY
+from scoring_api.api.store import STORE
 
 logger = logging.getLogger(__name__)
 
 
-def run_server(host: str = 'localhost', port: int = 8080) -> None:
-    server = HTTPServer((host, port), MainHTTPHandler)
-    logger.info('Starting server at http://%s:%s', host, port)
+class ScoringHTTPServer(HTTPServer):
+    """Single threaded HTTP server
+
+    Connections are not kept alive as a single persistent connection would
+    block all other clients
+    """
+    max_requests_per_connection = 1
+    idle_timeout_sec: float | None = None
+    body_limits = BodyLimits()
+    # set on graceful stop, connections are closed after the response
+    stopping = False
+
+
+class ThreadPoolHTTPServer(ScoringHTTPServer):
+    """HTTP server processing requests in a bounded pool of threads
+
+    Each persistent connection occupies a thread until it is closed by the
+    client, idle for `idle_timeout_sec` or served
+    `max_requests_per_connection` requests
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        handler_class: type,
+        threads: int,
+        bind_and_activate: bool = True,
+        idle_timeout_sec: float | None = 5.,
+        max_requests_per_connection: int = 100
+    ):
+        super().__init__(server_address, handler_class, bind_and_activate)
+        self._threads = threads
+        self.idle_timeout_sec = idle_timeout_sec
+        self.max_requests_per_connection = max_requests_per_connection
+        self._executor = None
+
+    def process_request(self, request, client_address) -> None:
+        # executor is created lazily, so no threads exist before worker fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._threads,
+                thread_name_prefix='http-worker'
+            )
+        self._executor.submit(
+            self._process_request_thread, request, client_address
+        )
+
+    def _process_request_thread(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+class _Shutdown(BaseException):
+    """Raised in supervisor process to stop watching workers
+
+    It is not an `Exception`, so it is not swallowed by error handling on
+    its way to the supervisor loop
+    """
+    pass
+
+
+def _raise_shutdown(signum, frame) -> None:
+    raise _Shutdown()
+
+
+def _shutdown_on_signal(server: HTTPServer):
+    """Builds signal handler stopping the server gracefully
+
+    Signal may arrive while a request is processed in the main thread, so
+    the handler does not raise: `serve_forever` is stopped from another
+    thread, then requests in progress are finished by `server_close`
+    """
+    def handler(signum, frame) -> None:
+        server.stopping = True
+        threading.Thread(
+            target=server.shutdown, name='shutdown', daemon=True
+        ).start()
+    return handler
+
+
+def build_server(
+    host: str = 'localhost',
+    port: int = 8080,
+    threads: int = 1,
+    idle_timeout_sec: float | None = 5.,
+    max_requests_per_connection: int = 100,
+    body_limits: BodyLimits | None = None
+) -> HTTPServer:
+    """Creates server bound to the address
+
+    Args:
+        host: host to listen
+        port: port to listen
+        threads: number of threads processing requests, single threaded
+            server is built when 1
+        idle_timeout_sec: max time to wait for the next request over
+            persistent connection
+        max_requests_per_connection: max number of requests served over
+            persistent connection
+        body_limits: limits of request bodies, default ones when not set
+    """
+    if threads > 1:
+        server = ThreadPoolHTTPServer(
+            (host, port),
+            MainHTTPHandler,
+            threads,
+            idle_timeout_sec=idle_timeout_sec,
+            max_requests_per_connection=max_requests_per_connection
+        )
+    else:
+        server = ScoringHTTPServer((host, port), MainHTTPHandler)
+    if body_limits is not None:
+        server.body_limits = body_limits
+    return server
+
+
+def _serve(server: HTTPServer) -> None:
+    signal.signal(signal.SIGTERM, _shutdown_on_signal(server))
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     server.server_close()
+    # pending cache writes are flushed by the store
+    STORE.close()
+    REGISTRY.write_snapshot()
+    ACCESS_LOG.stop()
+
+
+class Supervisor:
+    """Pre-forks worker processes sharing the listening socket
+
+    Workers inherit the socket bound by the parent process. The parent only
+    watches workers and restarts the ones that died. Workers share metrics
+    through a temporary directory, see `Registry`
+    """
+    # do not restart worker more often than this to avoid busy loop in case
+    # worker fails right at the start
+    _MIN_RESTART_INTERVAL_SEC = 1.
+    # max time for workers to finish requests in progress on stop, workers
+    # still running after it are killed
+    _STOP_TIMEOUT_SEC = 10.
+
+    def __init__(self, server: HTTPServer, workers: int):
+        self._server = server
+        self._workers = workers
+        self._children: dict[int, float] = {}
+        self._metrics_dir: str | None = None
+
+    def run(self) -> None:
+        previous_handler = signal.signal(signal.SIGTERM, _raise_shutdown)
+        self._metrics_dir = tempfile.mkdtemp(prefix='scoring-metrics-')
+        try:
+            for _ in range(self._workers):
+                self._spawn()
+            self._watch()
+        except (KeyboardInterrupt, _Shutdown):
+            logger.info('Stopping workers')
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            self._stop_children()
+            self._server.server_close()
+            shutil.rmtree(self._metrics_dir, ignore_errors=True)
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # worker finishes requests in progress on SIGTERM
+            code = 0
+            REGISTRY.share(self._metrics_dir)
+            try:
+                _serve(self._server)
+            except BaseException:
+                logger.exception('Worker %s failed', os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+        logger.info('Started worker %s', pid)
+
+    def _watch(self) -> None:
+        while True:
+            pid, status = os.wait()
+            started_at = self._children.pop(pid, None)
+            if started_at is None:
+                continue
+            REGISTRY.retire(self._metrics_dir, pid)
+            logger.warning(
+                'Worker %s exited with status %s, restarting',
+                pid, os.waitstatus_to_exitcode(status)
+            )
+            alive_sec = time.monotonic() - started_at
+            if alive_sec < self._MIN_RESTART_INTERVAL_SEC:
+                time.sleep(self._MIN_RESTART_INTERVAL_SEC - alive_sec)
+            self._spawn()
+
+    def _stop_children(self) -> None:
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self._STOP_TIMEOUT_SEC
+        running = set(self._children)
+        while running and time.monotonic() < deadline:
+            for pid in list(running):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        running.discard(pid)
+                except ChildProcessError:
+                    running.discard(pid)
+            if running:
+                time.sleep(0.05)
+        for pid in running:
+            logger.warning('Worker %s did not stop in time, killing', pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+
+
+def run_server(
+    host: str = 'localhost',
+    port: int = 8080,
+    workers: int = 1,
+    threads: int = 1,
+    idle_timeout_sec: float | None = 5.,
+    max_requests_per_connection: int = 100,
+    store_options: dict | None = None,
+    body_limits: BodyLimits | None = None
+) -> None:
+    """Serves scoring api
+
+    Args:
+        host: host to listen
+        port: port to listen
+        workers: number of pre-forked worker processes, server runs in the
+            current process when 1
+        threads: number of threads processing requests in each worker
+        idle_timeout_sec: max time to wait for the next request over
+            persistent connection
+        max_requests_per_connection: max number of requests served over
+            persistent connection, connections are not kept alive by single
+            threaded server
+        store_options: keyword arguments of `get_store`, store is created
+            lazily in each worker
+        body_limits: limits of request bodies, default ones when not set
+    """
+    STORE.configure(**(store_options or {}))
+    server = build_server(
+        host=host,
+        port=port,
+        threads=threads,
+        idle_timeout_sec=idle_timeout_sec,
+        max_requests_per_connection=max_requests_per_connection,
+        body_limits=body_limits
+    )
+    logger.info(
+        'Starting server at http://%s:%s (workers: %s, threads: %s)',
+        host, port, workers, threads
+    )
+    if workers > 1:
+        Supervisor(server, workers).run()
+    else:
+        _serve(server)
@@ -1,11 +1,34 @@
+import heapq
 import logging
-from typing import Any
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator
 
 from redis.backoff import ExponentialBackoff
 from redis.client import Redis
-from redis.exceptions import ConnectionError
+from redis.connection import (
+    BlockingConnectionPool,
+    Connection,
+    UnixDomainSocketConnection,
+)
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
 from redis.retry import Retry
 
+from scoring_api.api.api import MISSING
+from scoring_api.api.breaker import CircuitBreaker
+from scoring_api.api.cache import LocalCache
+from scoring_api.api.constants import INTERESTS_KEY_PREFIX
+from scoring_api.api.metrics import (
+    REGISTRY,
+    STORE_POOL_WAIT,
+    WRITE_BEHIND_DROPPED,
+    ComputedCounter,
+    Gauge,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,27 +39,242 @@ class KeyValueStore:
     def set(self, key: str, value: Any) -> None:
         raise NotImplementedError
 
+    def get_many(self, keys: list[str]) -> list[Any]:
+        """Gets values of several keys at once
+
+        Returns:
+            values in order of keys, None for missing keys
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        """Sets several keys at once"""
+        for key, value in mapping.items():
+            self.set(key, value)
+
     def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
         raise NotImplementedError
 
     def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
         raise NotImplementedError
 
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        """Gets several cached values at once
+
+        Returns:
+            values in order of keys, None for missing keys
+        """
+        return [self.cache_get(key) for key in keys]
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        """Caches several values with the same ttl at once"""
+        for key, value in mapping.items():
+            self.cache_set(key, value, ttl)
+
     def flush(self) -> None:
         raise NotImplementedError
 
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        """Iterates over keys with the prefix
+
+        Keys set while iterating may be skipped, keys may be repeated
+
+        Args:
+            prefix: prefix of keys
+            count: number of keys fetched at once
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Releases connections and background threads of the store"""
+        pass
+
+    def get_many_decoded(
+        self,
+        keys: list[str],
+        decode: Callable[[Any], Any]
+    ) -> list[Any]:
+        """Gets values of several keys decoded with `decode`
+
+        Decoded values may be cached by store, so the same `decode` should
+        be used for the key
+        """
+        return [decode(value) for value in self.get_many(keys)]
+
+    def watch(
+        self,
+        prefix: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ) -> bool:
+        """Notifies about changes of keys with the prefix made by any client
+
+        Args:
+            prefix: prefix of watched keys
+            on_change: called with the changed key
+            on_reset: called when notifications could have been lost
+
+        Returns:
+            whether notifications are delivered for all changes
+        """
+        return False
+
+    def pool_stats(self) -> dict[str, int | float] | None:
+        """Returns connection pool counters, None for stores without pool"""
+        return None
+
+    def write_behind_stats(self) -> dict[str, int] | None:
+        """Returns write behind queue depth and number of dropped writes
+
+        None is returned for stores writing cache synchronously
+        """
+        return None
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        """Returns counters of in-process caches of the store by cache name"""
+        return {}
+
+
+class _InstrumentedConnectionPool(BlockingConnectionPool):
+    """Blocking connection pool recording time of waiting for connection"""
+
+    def get_connection(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return super().get_connection(*args, **kwargs)
+        finally:
+            STORE_POOL_WAIT.observe(time.perf_counter() - started_at)
+
+    def stats(self) -> dict[str, int]:
+        # not created connections are kept in the queue as None
+        idle = sum(
+            connection is not None for connection in list(self.pool.queue)
+        )
+        created = len(self._connections)
+        return dict(
+            max_connections=self.max_connections,
+            created=created,
+            in_use=created - idle,
+        )
+
+
+class _KeyspaceWatcher(threading.Thread):
+    """Listens to redis keyspace notifications in background
+
+    Subscription is restored after connection errors, `on_reset` is called
+    on each subscription as changes made meanwhile are unknown
+    """
+    _POLL_INTERVAL_SEC = 1.
+    _RETRY_INTERVAL_SEC = 1.
+
+    def __init__(
+        self,
+        redis: Redis,
+        pattern: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ):
+        super().__init__(name='keyspace-watcher', daemon=True)
+        self._redis = redis
+        self._pattern = pattern
+        self._on_change = on_change
+        self._on_reset = on_reset
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self._pattern)
+                self._on_reset()
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(
+                        timeout=self._POLL_INTERVAL_SEC
+                    )
+                    if message is not None:
+                        # channel is `__keyspace@<db>__:<key>`
+                        self._on_change(message['channel'].partition(':')[2])
+            except (ConnectionError, TimeoutError):
+                logger.warning('Keyspace notifications are lost, retrying')
+                self._on_reset()
+                self._stopped.wait(self._RETRY_INTERVAL_SEC)
+            finally:
+                pubsub.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
 
 class RedisStorage(KeyValueStore):
-    def __init__(self, host: str = 'redis', port: int = 6379):
-        self._redis = Redis(
-            host=host,
-            port=port,
+    """Redis store with bounded pool of connections
+
+    Connections are taken from a blocking pool: when all `max_connections`
+    are in use, request waits for a free one up to `pool_timeout_sec` (or
+    forever when None) and fails with connection error after. Connections
+    idle for longer than `health_check_interval_sec` are checked with PING
+    before use. `unix_socket_path` is used instead of host and port when
+    set. Pool is not shared between processes, so the store should be
+    created after worker fork
+
+    Cache operations are guarded by a circuit breaker: after
+    `breaker_failures` consecutive errors or calls slower than
+    `breaker_slow_call_sec` they return no value without calling redis for
+    `breaker_reset_sec`. Breaker is disabled when `breaker_failures` is 0
+    """
+
+    def __init__(
+        self,
+        host: str = 'redis',
+        port: int = 6379,
+        unix_socket_path: str | None = None,
+        max_connections: int = 50,
+        pool_timeout_sec: float | None = 5.,
+        socket_timeout_sec: float | None = 5.,
+        socket_connect_timeout_sec: float | None = 5.,
+        health_check_interval_sec: int = 0,
+        socket_keepalive: bool = False,
+        breaker_failures: int = 5,
+        breaker_reset_sec: float = 5.,
+        breaker_slow_call_sec: float | None = None
+    ):
+        connection_kwargs = dict(
             decode_responses=True,
-            socket_connect_timeout=5,
-            socket_timeout=5,
+            socket_connect_timeout=socket_connect_timeout_sec,
+            socket_timeout=socket_timeout_sec,
+            health_check_interval=health_check_interval_sec,
             retry=Retry(ExponentialBackoff(), 3),
-            retry_on_error=[ConnectionError]
+            retry_on_error=[ConnectionError],
         )
+        if unix_socket_path:
+            connection_kwargs.update(
+                connection_class=UnixDomainSocketConnection,
+                path=unix_socket_path
+            )
+        else:
+            connection_kwargs.update(
+                connection_class=Connection,
+                host=host,
+                port=port,
+                socket_keepalive=socket_keepalive
+            )
+        self._pool = _InstrumentedConnectionPool(
+            max_connections=max_connections,
+            timeout=pool_timeout_sec,
+            **connection_kwargs
+        )
+        self._redis = Redis(connection_pool=self._pool)
+        self._breaker = CircuitBreaker(
+            failure_threshold=breaker_failures,
+            reset_timeout_sec=breaker_reset_sec,
+            slow_call_sec=breaker_slow_call_sec,
+            name='redis_cache'
+        ) if breaker_failures else None
+        self._watchers: list[_KeyspaceWatcher] = []
 
     def get(self, key) -> Any:
         try:
@@ -52,23 +290,961 @@ class RedisStorage(KeyValueStore):
             logger.exception('Unable to set key due to connection error')
             raise e
 
-    def cache_get(self, key, timeout_sec: int | float = 5) -> Any:
+    def get_many(self, keys: list[str]) -> list[Any]:
+        if not keys:
+            return []
         try:
-            result = self._redis.get(key)
-        except ConnectionError:
-            logger.exception('Unable to get cache due to connection error')
-            result = None
-        return result
+            return self._redis.mget(keys)
+        except ConnectionError as e:
+            logger.exception('Unable to get keys due to connection error')
+            raise e
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        if not mapping:
+            return
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, value)
+                pipe.execute()
+        except ConnectionError as e:
+            logger.exception('Unable to set keys due to connection error')
+            raise e
+
+    def cache_get(self, key, timeout_sec: int | float = 5) -> Any:
+        return self._cache_call(
+            lambda: self._redis.get(key),
+            None,
+            'Unable to get cache due to connection error'
+        )
 
     def cache_set(self, key, value: Any, ttl: int | float) -> None:
+        self._cache_call(
+            lambda: self._redis.setex(key, ttl, value),
+            None,
+            'Unable to set cache due to connection error'
+        )
+
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        if not keys:
+            return []
+        return self._cache_call(
+            lambda: self._redis.mget(keys),
+            [None] * len(keys),
+            'Unable to get cache due to connection error'
+        )
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        if not mapping:
+            return
+
+        def set_many() -> None:
+            with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.setex(key, ttl, value)
+                pipe.execute()
+
+        self._cache_call(
+            set_many,
+            None,
+            'Unable to set cache due to connection error'
+        )
+
+    def _cache_call(
+        self,
+        func: Callable[[], Any],
+        default: Any,
+        error_message: str
+    ) -> Any:
+        # cache is optional: errors are logged and default is returned,
+        # open breaker returns default without calling redis
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            return default
+        started_at = time.perf_counter()
         try:
-            self._redis.setex(key, ttl, value)
-        except ConnectionError:
-            logger.exception('Unable to set cache due to connection error')
+            result = func()
+        except (ConnectionError, TimeoutError):
+            if breaker is not None:
+                breaker.record_failure()
+            logger.exception(error_message)
+            return default
+        except BaseException:
+            # errors of a responding redis, e.g. wrong key type, do not
+            # tell whether it is available
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success(time.perf_counter() - started_at)
+        return result
 
     def flush(self) -> None:
         self._redis.flushdb()
 
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        return self._redis.scan_iter(match=f'{prefix}*', count=count)
+
+    def watch(
+        self,
+        prefix: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ) -> bool:
+        # notifications are published by redis only when enabled with
+        # `notify-keyspace-events` option
+        db = self._pool.connection_kwargs.get('db', 0)
+        watcher = _KeyspaceWatcher(
+            self._redis, f'__keyspace@{db}__:{prefix}*', on_change, on_reset
+        )
+        watcher.start()
+        self._watchers.append(watcher)
+        try:
+            events = self._redis.config_get('notify-keyspace-events')
+        except RedisError:
+            logger.warning('Unable to check keyspace notifications config')
+            return False
+        flags = events.get('notify-keyspace-events', '')
+        enabled = 'K' in flags and (
+            'A' in flags or all(flag in flags for flag in 'g$x')
+        )
+        if not enabled:
+            logger.warning(
+                'Keyspace notifications are disabled, enable them with '
+                '`notify-keyspace-events K$gx`'
+            )
+        return enabled
+
+    def close(self) -> None:
+        for watcher in self._watchers:
+            watcher.stop()
+        self._watchers.clear()
+        self._pool.disconnect()
+
+    def pool_stats(self) -> dict[str, int]:
+        return self._pool.stats()
+
+
+class MemoryStorage(KeyValueStore):
+    """In-process key value store
+
+    Keys set with `cache_set` expire after ttl. Expired keys are purged in
+    order of expiration on each read and write. Store is bounded by number
+    of keys and optionally by approximate size of keys and values in bytes,
+    least recently written keys are evicted when any of the bounds is
+    exceeded
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 1_000_000,
+        max_bytes: int | None = None
+    ):
+        if max_keys < 1:
+            raise ValueError('max_keys should be positive')
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError('max_bytes should be positive')
+        self._max_keys = max_keys
+        self._max_bytes = max_bytes
+        self._data: dict[str, Any] = {}
+        self._expires: dict[str, float] = {}
+        self._sizes: dict[str, int] = {}
+        self._bytes = 0
+        # (expiration monotonic time, key), entries of keys rewritten since
+        # are stale and skipped on purge
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        """Approximate size of stored keys and values"""
+        return self._bytes
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            return self._get(key, now)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._set(key, value, None, time.monotonic())
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired(now)
+            return [self._get(key, now) for key in keys]
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for key, value in mapping.items():
+                self._set(key, value, None, now)
+
+    def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        return self.get(key)
+
+    def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        with self._lock:
+            self._set(key, value, ttl, time.monotonic())
+
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        return self.get_many(keys)
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for key, value in mapping.items():
+                self._set(key, value, ttl, now)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._expiry_heap.clear()
+
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+    def _get(self, key: str, now: float) -> Any:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= now:
+            self._delete(key)
+            return None
+        return self._data.get(key)
+
+    def _set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | float | None,
+        now: float
+    ) -> None:
+        self._purge_expired(now)
+        if key in self._data:
+            # reinsert to keep dict order by last write
+            self._delete(key)
+        # values are kept as strings like redis returns them
+        if isinstance(value, (int, float)):
+            value = str(value)
+        self._data[key] = value
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        self._sizes[key] = size
+        self._bytes += size
+        if ttl is not None:
+            expires_at = now + ttl
+            self._expires[key] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            if len(self._expiry_heap) > 2 * len(self._expires) + 64:
+                self._rebuild_expiry_heap()
+        while (
+            len(self._data) > self._max_keys
+            or (self._max_bytes is not None and self._bytes > self._max_bytes)
+        ):
+            self._delete(next(iter(self._data)))
+
+    def _delete(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            if self._expires.get(key) == expires_at:
+                self._delete(key)
+
+    def _rebuild_expiry_heap(self) -> None:
+        self._expiry_heap = [
+            (expires_at, key) for key, expires_at in self._expires.items()
+        ]
+        heapq.heapify(self._expiry_heap)
+
+
+class LocalCacheStore(KeyValueStore):
+    """In-process cache tier in front of another store
+
+    Only cache operations are served from local cache, plain keys are always
+    read from the wrapped store. Values set with `cache_set` are kept locally
+    for the passed ttl, values found in the wrapped store are kept locally
+    for `default_ttl_sec` as their remaining ttl is unknown
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        max_entries: int,
+        max_bytes: int | None = None,
+        default_ttl_sec: int | float = 60
+    ):
+        self._store = store
+        self._cache = LocalCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._default_ttl_sec = default_ttl_sec
+
+    def get(self, key: str) -> Any:
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._cache.delete(key)
+        self._store.set(key, value)
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.get_many(keys)
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        for key in mapping:
+            self._cache.delete(key)
+        self._store.set_many(mapping)
+
+    def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        result = self._cache.get(key)
+        if result is not MISSING:
+            return result
+        result = self._store.cache_get(key, timeout_sec)
+        if result is not None:
+            self._cache.set(key, result, self._default_ttl_sec)
+        return result
+
+    def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        self._cache.set(key, value, ttl)
+        self._store.cache_set(key, value, ttl)
+
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        result = [self._cache.get(key) for key in keys]
+        missed = [key for key, value in zip(keys, result) if value is MISSING]
+        if missed:
+            fetched = dict(zip(missed, self._store.cache_get_many(missed)))
+            for key, value in fetched.items():
+                if value is not None:
+                    self._cache.set(key, value, self._default_ttl_sec)
+            result = [
+                fetched[key] if value is MISSING else value
+                for key, value in zip(keys, result)
+            ]
+        return result
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        for key, value in mapping.items():
+            self._cache.set(key, value, ttl)
+        self._store.cache_set_many(mapping, ttl)
+
+    def flush(self) -> None:
+        self._cache.clear()
+        self._store.flush()
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        return {**self._store.cache_stats(), 'scores': self._cache.stats()}
+
+    def watch(
+        self,
+        prefix: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ) -> bool:
+        return self._store.watch(prefix, on_change, on_reset)
+
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        return self._store.scan_keys(prefix, count)
+
+    def close(self) -> None:
+        self._store.close()
+
+    def pool_stats(self) -> dict[str, int | float] | None:
+        return self._store.pool_stats()
+
+    def write_behind_stats(self) -> dict[str, int] | None:
+        return self._store.write_behind_stats()
+
+
+class KeyCacheStore(KeyValueStore):
+    """In-process cache of decoded values of plain keys with the prefix
+
+    Values read with `get_many_decoded` are kept decoded for `ttl_sec` and
+    dropped as soon as the wrapped store notifies about the key change. Ttl
+    bounds staleness in case notifications are lost, `fallback_ttl_sec` is
+    used when the wrapped store can not notify about all changes. Cached
+    values are shared between callers and should not be modified
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        prefix: str,
+        max_entries: int,
+        ttl_sec: int | float = 300,
+        fallback_ttl_sec: int | float = 5
+    ):
+        self._store = store
+        self._prefix = prefix
+        self._cache = LocalCache(max_entries=max_entries)
+        # changes on each invalidation, values read before invalidation are
+        # not cached as they could be already stale
+        self._version = 0
+        # makes version check and caching atomic with invalidations made by
+        # watcher thread
+        self._lock = threading.Lock()
+        watched = store.watch(prefix, self._invalidate, self._reset)
+        self._ttl_sec = ttl_sec if watched else fallback_ttl_sec
+
+    def get(self, key: str) -> Any:
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._invalidate(key)
+        self._store.set(key, value)
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.get_many(keys)
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        for key in mapping:
+            self._invalidate(key)
+        self._store.set_many(mapping)
+
+    def get_many_decoded(
+        self,
+        keys: list[str],
+        decode: Callable[[Any], Any]
+    ) -> list[Any]:
+        result = [
+            self._cache.get(key) if key.startswith(self._prefix) else MISSING
+            for key in keys
+        ]
+        missed = [key for key, value in zip(keys, result) if value is MISSING]
+        if missed:
+            version = self._version
+            fetched = dict(
+                zip(missed, self._store.get_many_decoded(missed, decode))
+            )
+            with self._lock:
+                if version == self._version:
+                    for key, value in fetched.items():
+                        if key.startswith(self._prefix):
+                            self._cache.set(key, value, self._ttl_sec)
+            result = [
+                fetched[key] if value is MISSING else value
+                for key, value in zip(keys, result)
+            ]
+        return result
+
+    def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        return self._store.cache_get(key, timeout_sec)
+
+    def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        self._store.cache_set(key, value, ttl)
+
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.cache_get_many(keys)
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        self._store.cache_set_many(mapping, ttl)
+
+    def flush(self) -> None:
+        self._reset()
+        self._store.flush()
+
+    def watch(
+        self,
+        prefix: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ) -> bool:
+        return self._store.watch(prefix, on_change, on_reset)
+
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        return self._store.scan_keys(prefix, count)
+
+    def close(self) -> None:
+        self._store.close()
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        return {**self._store.cache_stats(), 'interests': self._cache.stats()}
+
+    def pool_stats(self) -> dict[str, int | float] | None:
+        return self._store.pool_stats()
+
+    def write_behind_stats(self) -> dict[str, int] | None:
+        return self._store.write_behind_stats()
+
+    def _invalidate(self, key: str) -> None:
+        with self._lock:
+            self._version += 1
+            self._cache.delete(key)
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._cache.clear()
+
+
+class WriteBehindStore(KeyValueStore):
+    """Caches values in the wrapped store in background
+
+    Values passed to `cache_set` are put to a bounded queue and the caller
+    does not wait for the wrapped store. Worker thread takes up to
+    `batch_size` queued values at once and writes them with a single
+    `cache_set_many` call per ttl. Values are dropped when the queue is
+    full, as well as values not written before the process exits, so a
+    cached value may be calculated again. Other operations are delegated
+    to the wrapped store
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        queue_size: int = 10000,
+        batch_size: int = 100
+    ):
+        self._store = store
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._dropped = 0
+        self._worker: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._store.set(key, value)
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.get_many(keys)
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        self._store.set_many(mapping)
+
+    def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        return self._store.cache_get(key, timeout_sec)
+
+    def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait((key, value, ttl))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            WRITE_BEHIND_DROPPED.inc()
+
+    def cache_get_many(self, keys: list[str]) -> list[Any]:
+        return self._store.cache_get_many(keys)
+
+    def cache_set_many(
+        self,
+        mapping: dict[str, Any],
+        ttl: int | float
+    ) -> None:
+        for key, value in mapping.items():
+            self.cache_set(key, value, ttl)
+
+    def flush(self) -> None:
+        """Discards queued values and flushes the wrapped store"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        self._store.flush()
+
+    def join(self) -> None:
+        """Waits until queued values are written"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def watch(
+        self,
+        prefix: str,
+        on_change: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ) -> bool:
+        return self._store.watch(prefix, on_change, on_reset)
+
+    def scan_keys(self, prefix: str, count: int = 1000) -> Iterator[str]:
+        return self._store.scan_keys(prefix, count)
+
+    def close(self) -> None:
+        """Writes queued values, stops the worker and closes the store"""
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid():
+                self._queue.put(self._STOP)
+                self._worker.join()
+            self._worker = None
+            self._pid = None
+        self._store.close()
+
+    def pool_stats(self) -> dict[str, int | float] | None:
+        return self._store.pool_stats()
+
+    def write_behind_stats(self) -> dict[str, int] | None:
+        return dict(depth=self._queue.qsize(), dropped=self._dropped)
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        return self._store.cache_stats()
+
+    def _start(self) -> None:
+        # worker is started lazily in each process, as threads do not
+        # survive worker fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name='cache-write-behind', daemon=True
+            )
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self._batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._STOP in items
+            batches: dict[int | float, dict[str, Any]] = {}
+            for item in items:
+                if item is not self._STOP:
+                    key, value, ttl = item
+                    batches.setdefault(ttl, {})[key] = value
+            try:
+                for ttl, mapping in batches.items():
+                    self._store.cache_set_many(mapping, ttl)
+            except Exception as e:
+                logger.exception('Unable to write cache: %s', e)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                return
+
+
+class BatchStore(KeyValueStore):
+    """Coalesces store access of several requests into bulk operations
+
+    Keys passed to `prefetch` are fetched with a single bulk call and
+    served from memory afterwards. Cache writes are buffered until `commit`
+    and written with a single bulk call per ttl
+    """
+
+    def __init__(self, store: KeyValueStore):
+        self._store = store
+        self._values: dict[str, Any] = {}
+        self._decoded: dict[str, Any] = {}
+        self._cached: dict[str, Any] = {}
+        self._pending: dict[int | float, dict[str, Any]] = {}
+
+    def prefetch(
+        self,
+        keys: list[str],
+        cache_keys: list[str],
+        decode: Callable[[Any], Any] | None = None
+    ) -> None:
+        """Fetches values of keys and cached values with bulk calls
+
+        Args:
+            keys: keys to fetch values of
+            cache_keys: keys to fetch cached values of
+            decode: values of keys are fetched with `get_many_decoded` of
+                the wrapped store when set, so its cache of decoded values
+                is used, and served by `get_many_decoded`
+        """
+        if decode is None:
+            keys = [
+                key for key in dict.fromkeys(keys) if key not in self._values
+            ]
+            self._values.update(zip(keys, self._store.get_many(keys)))
+        else:
+            self.get_many_decoded(keys, decode)
+        cache_keys = [
+            key for key in dict.fromkeys(cache_keys)
+            if key not in self._cached
+        ]
+        self._cached.update(
+            zip(cache_keys, self._store.cache_get_many(cache_keys))
+        )
+
+    def commit(self) -> None:
+        """Writes buffered cache values"""
+        pending, self._pending = self._pending, {}
+        for ttl, mapping in pending.items():
+            self._store.cache_set_many(mapping, ttl)
+
+    def get(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._store.set(key, value)
+        self._values[key] = value
+        self._decoded.pop(key, None)
+
+    def get_many(self, keys: list[str]) -> list[Any]:
+        missed = [key for key in keys if key not in self._values]
+        if missed:
+            self._values.update(zip(missed, self._store.get_many(missed)))
+        return [self._values[key] for key in keys]
+
+    def set_many(self, mapping: dict[str, Any]) -> None:
+        self._store.set_many(mapping)
+        self._values.update(mapping)
+        for key in mapping:
+            self._decoded.pop(key, None)
+
+    def get_many_decoded(
+        self,
+        keys: list[str],
+        decode: Callable[[Any], Any]
+    ) -> list[Any]:
+        missed = [
+            key for key in dict.fromkeys(keys) if key not in self._decoded
+        ]
+        if missed:
+            self._decoded.update(
+                zip(missed, self._store.get_many_decoded(missed, decode))
+            )
+        return [self._decoded[key] for key in keys]
+
+    def cache_get(self, key: str, timeout_sec: int | float = 5) -> Any:
+        if key in self._cached:
+            return self._cached[key]
+        return self._store.cache_get(key, timeout_sec)
+
+    def cache_set(self, key: str, value: Any, ttl: int | float) -> None:
+        self._pending.setdefault(ttl, {})[key] = value
+        self._cached[key] = value
+
+    def flush(self) -> None:
+        self._values.clear()
+        self._decoded.clear()
+        self._cached.clear()
+        self._pending.clear()
+        self._store.flush()
+
+
+STORE_BACKENDS = ('redis', 'memory')
+
+
+def get_store(
+    backend: str = 'redis',
+    memory_max_keys: int = 1_000_000,
+    memory_max_bytes: int | None = None,
+    local_cache_size: int = 0,
+    local_cache_bytes: int | None = None,
+    interests_cache_size: int = 0,
+    interests_cache_ttl_sec: int | float = 300,
+    write_behind_queue_size: int = 0,
+    write_behind_batch_size: int = 100,
+    **redis_options
+) -> KeyValueStore:
+    """Creates key value store
+
+    Args:
+        backend: `redis` or in-process `memory` store
+        memory_max_keys: max number of keys of in-process store
+        memory_max_bytes: max approximate size of in-process store
+        local_cache_size: max number of entries in in-process cache tier,
+            local cache is disabled when 0
+        local_cache_bytes: max approximate size of in-process cache tier
+        interests_cache_size: max number of clients interests kept decoded
+            in process, interests cache is disabled when 0
+        interests_cache_ttl_sec: max time of keeping interests in process
+        write_behind_queue_size: max number of cached values waiting to be
+            written to redis in background, values are written
+            synchronously when 0
+        write_behind_batch_size: max number of cached values written to
+            redis at once in background
+        redis_options: keyword arguments of `RedisStorage`
+    """
+    if backend == 'memory':
+        return MemoryStorage(
+            max_keys=memory_max_keys,
+            max_bytes=memory_max_bytes
+        )
+    if backend != 'redis':
+        raise ValueError(f'unknown store backend {backend}')
+    store = RedisStorage(**redis_options)
+    if write_behind_queue_size:
+        store = WriteBehindStore(
+            store,
+            queue_size=write_behind_queue_size,
+            batch_size=write_behind_batch_size
+        )
+    if local_cache_size:
+        store = LocalCacheStore(
+            store,
+            max_entries=local_cache_size,
+            max_bytes=local_cache_bytes
+        )
+    if interests_cache_size:
+        store = KeyCacheStore(
+            store,
+            prefix=INTERESTS_KEY_PREFIX,
+            max_entries=interests_cache_size,
+            ttl_sec=interests_cache_ttl_sec
+        )
+    return store
+
+
+class LazyStore:
+    """Creates store on first use in each process
+
+    Store is not created at import or in the parent process, so connection
+    pools are never shared between forked workers
+    """
+
+    def __init__(self):
+        self._options: dict[str, Any] = {}
+        self._store: KeyValueStore | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def configure(self, **options) -> None:
+        """Sets keyword arguments of `get_store`, store is recreated"""
+        with self._lock:
+            self._options = options
+            self._store = None
+            self._pid = None
+
+    def get(self) -> KeyValueStore:
+        store = self._store
+        if store is not None and self._pid == os.getpid():
+            return store
+        with self._lock:
+            if self._store is None or self._pid != os.getpid():
+                self._store = get_store(**self._options)
+                self._pid = os.getpid()
+            return self._store
+
+    def pool_stats(self) -> dict[str, int | float] | None:
+        """Returns pool counters of the store created in this process"""
+        if self._store is None or self._pid != os.getpid():
+            return None
+        return self._store.pool_stats()
+
+    def close(self) -> None:
+        """Closes the store of this process, next use creates it again"""
+        with self._lock:
+            store = self._store if self._pid == os.getpid() else None
+            self._store = None
+            self._pid = None
+        if store is not None:
+            store.close()
+
+    def write_behind_stats(self) -> dict[str, int] | None:
+        """Returns write behind counters of the store of this process"""
+        if self._store is None or self._pid != os.getpid():
+            return None
+        return self._store.write_behind_stats()
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        """Returns in-process cache counters of the store of this process"""
+        if self._store is None or self._pid != os.getpid():
+            return {}
+        return self._store.cache_stats()
+
+
+STORE = LazyStore()
+
+
+def _pool_stat(name: str):
+    def value() -> int | None:
+        stats = STORE.pool_stats()
+        return stats[name] if stats else None
+    return value
+
+
+REGISTRY.register(Gauge(
+    'scoring_store_pool_max_connections',
+    'Max number of store connections in pool',
+    _pool_stat('max_connections')
+))
+REGISTRY.register(Gauge(
+    'scoring_store_pool_connections',
+    'Number of store connections created by pool',
+    _pool_stat('created')
+))
+REGISTRY.register(Gauge(
+    'scoring_store_pool_connections_in_use',
+    'Number of store connections taken from pool',
+    _pool_stat('in_use')
+))
+REGISTRY.register(Gauge(
+    'scoring_cache_write_behind_queue_depth',
+    'Number of cached values waiting to be written to store',
+    lambda: (STORE.write_behind_stats() or {}).get('depth')
+))
+
+
+def _cache_stat(name: str):
+    def values() -> dict[tuple, int]:
+        return {
+            (cache,): stats[name]
+            for cache, stats in STORE.cache_stats().items()
+        }
+    return values
+
+
+def _cache_lookups() -> dict[tuple, int]:
+    values = {}
+    for cache, stats in STORE.cache_stats().items():
+        values[(cache, 'hit')] = stats['hits']
+        values[(cache, 'miss')] = stats['misses']
+    return values
+
 
-def get_store() -> KeyValueStore:
-    return RedisStorage()
+REGISTRY.register(ComputedCounter(
+    'scoring_local_cache_lookups_total',
+    'Lookups in in-process caches',
+    _cache_lookups,
+    labelnames=('cache', 'result')
+))
+REGISTRY.register(ComputedCounter(
+    'scoring_local_cache_evictions_total',
+    'Entries evicted from in-process caches to fit their bounds',
+    _cache_stat('evictions'),
+    labelnames=('cache',)
+))
+REGISTRY.register(Gauge(
+    'scoring_local_cache_entries',
+    'Number of entries in in-process caches',
+    _cache_stat('entries'),
+    labelnames=('cache',)
+))
+REGISTRY.register(Gauge(
+    'scoring_local_cache_bytes',
+    'Approximate size of entries in in-process caches',
+    _cache_stat('bytes'),
+    labelnames=('cache',)
+))
@@ -0,0 +1,72 @@
+"""Timing of request processing stages
+
+Handlers start timings of each request, code measuring a stage adds its
+duration to timings of the current request kept in a context variable, so
+they are collected across function calls in both threaded and asyncio
+engines. Durations of repeated stages, e.g. several store calls, are
+summed up. Stages are not measured outside of requests
+"""
+import time
+from contextvars import ContextVar
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    'stage_timings', default=None
+)
+
+
+class _Stage:
+    __slots__ = ('_name', '_timings', '_started_at')
+
+    def __init__(self, name: str):
+        self._name = name
+        self._timings = None
+        self._started_at = 0.
+
+    def __enter__(self) -> None:
+        self._timings = _timings.get()
+        if self._timings is not None:
+            self._started_at = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        timings = self._timings
+        if timings is not None:
+            timings[self._name] = (
+                timings.get(self._name, 0.)
+                + time.perf_counter() - self._started_at
+            )
+
+
+def stage(name: str) -> _Stage:
+    """Measures the block as the stage of the current request"""
+    return _Stage(name)
+
+
+def start_timings() -> dict[str, float]:
+    """Starts collecting stage timings of a new request
+
+    Returns:
+        durations of stages in seconds by name filled while the request is
+        processed
+    """
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def stop_timings() -> None:
+    _timings.set(None)
+
+
+def format_server_timing(timings: dict[str, float]) -> str:
+    """Formats timings as `Server-Timing` header value in milliseconds"""
+    return ', '.join(
+        f'{name};dur={duration * 1000:.3f}'
+        for name, duration in timings.items()
+    )
+
+
+def timings_ms(timings: dict[str, float]) -> dict[str, float]:
+    """Converts timings to milliseconds for access log"""
+    return {
+        name: round(duration * 1000, 3) for name, duration in timings.items()
+    }
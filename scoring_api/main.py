@@ -1,22 +1,281 @@
 import logging
+import sys
 from optparse import OptionParser
 
+from scoring_api.api.access_log import setup_access_log
+from scoring_api.api.async_server import run_async_server
+from scoring_api.api.constants import BODY_TIMEOUT_SEC, MAX_BODY_BYTES
+from scoring_api.api.handler import BodyLimits
+from scoring_api.api.profiling import PROFILER
 from scoring_api.api.server import run_server
+from scoring_api.api.store import STORE_BACKENDS
+from scoring_api.score_file import main as score_file_main
+
+
+def parse_rates(option, opt, value, parser) -> None:
+    """Parses sample rates in `key=rate,key=rate` format"""
+    rates = {}
+    for item in filter(None, value.split(',')):
+        key, _, rate = item.partition('=')
+        rates[key.strip()] = float(rate)
+    setattr(parser.values, option.dest, rates)
+
+
+def parse_sizes(option, opt, value, parser) -> None:
+    """Parses sizes in `key=bytes,key=bytes` format"""
+    sizes = {}
+    for item in filter(None, value.split(',')):
+        key, _, size = item.partition('=')
+        sizes[key.strip()] = int(size)
+    setattr(parser.values, option.dest, sizes)
 
 
 def main():
-    op = OptionParser()
+    if sys.argv[1:2] == ['score-file']:
+        score_file_main(sys.argv[2:])
+        return
+    op = OptionParser(usage='%prog [options] | %prog score-file [options]')
     op.add_option('-g', '--host', action='store', type=str, default='localhost')
     op.add_option('-p', '--port', action='store', type=int, default=8080)
     op.add_option('-l', '--log', action='store', default=None)
+    op.add_option(
+        '-e', '--engine', action='store', type='choice',
+        choices=['sync', 'asyncio'], default='sync'
+    )
+    op.add_option('-w', '--workers', action='store', type=int, default=1)
+    op.add_option('-t', '--threads', action='store', type=int, default=1)
+    op.add_option(
+        '--idle-timeout', action='store', type=float, default=5.,
+        help='max seconds to wait for the next request over keep-alive '
+             'connection'
+    )
+    op.add_option(
+        '--max-requests-per-connection', action='store', type=int,
+        default=100
+    )
+    op.add_option(
+        '--max-body-size', action='store', type=int, default=MAX_BODY_BYTES,
+        help='max bytes of request body, larger requests are rejected with '
+             '413 before reading the body'
+    )
+    op.add_option(
+        '--route-max-body-sizes', action='callback', type=str,
+        callback=parse_sizes, default={},
+        help='max bytes of request body by route, e.g. batch=4194304'
+    )
+    op.add_option(
+        '--body-timeout', action='store', type=float,
+        default=BODY_TIMEOUT_SEC,
+        help='max seconds of receiving request body'
+    )
+    op.add_option(
+        '-s', '--store', action='store', type='choice',
+        choices=list(STORE_BACKENDS), default='redis',
+        help='key value store backend, in-process `memory` store is not '
+             'shared between workers'
+    )
+    op.add_option(
+        '--memory-max-keys', action='store', type=int, default=1_000_000,
+        help='max number of keys of in-process `memory` store'
+    )
+    op.add_option(
+        '--memory-max-bytes', action='store', type=int, default=None,
+        help='max approximate size of in-process `memory` store'
+    )
+    op.add_option(
+        '--local-cache-size', action='store', type=int, default=0,
+        help='max entries of in-process score cache, disabled when 0'
+    )
+    op.add_option(
+        '--local-cache-bytes', action='store', type=int, default=None,
+        help='max approximate size of in-process score cache'
+    )
+    op.add_option(
+        '--interests-cache-size', action='store', type=int, default=0,
+        help='max clients interests kept in process, disabled when 0'
+    )
+    op.add_option(
+        '--interests-cache-ttl', action='store', type=float, default=300.,
+        help='max seconds of keeping interests in process, entries are '
+             'dropped earlier on redis keyspace notifications'
+    )
+    op.add_option(
+        '--write-behind-queue', action='store', type=int, default=0,
+        help='max cached scores waiting to be written to redis in '
+             'background, cache is written synchronously when 0'
+    )
+    op.add_option(
+        '--write-behind-batch', action='store', type=int, default=100,
+        help='max cached scores written to redis at once in background'
+    )
+    op.add_option('--redis-host', action='store', type=str, default='redis')
+    op.add_option('--redis-port', action='store', type=int, default=6379)
+    op.add_option(
+        '--redis-socket', action='store', type=str, default=None,
+        help='redis unix socket path, used instead of host and port'
+    )
+    op.add_option(
+        '--redis-max-connections', action='store', type=int, default=50,
+        help='max redis connections in each worker'
+    )
+    op.add_option(
+        '--redis-pool-timeout', action='store', type=float, default=5.,
+        help='max seconds to wait for a free redis connection'
+    )
+    op.add_option(
+        '--redis-health-check-interval', action='store', type=int,
+        default=0,
+        help='seconds after which idle redis connection is checked before '
+             'use, disabled when 0'
+    )
+    op.add_option(
+        '--redis-keepalive', action='store_true', default=False,
+        help='enable TCP keepalive of redis connections'
+    )
+    op.add_option(
+        '--redis-breaker-failures', action='store', type=int, default=5,
+        help='consecutive redis cache errors opening circuit breaker, '
+             'disabled when 0'
+    )
+    op.add_option(
+        '--redis-breaker-reset', action='store', type=float, default=5.,
+        help='seconds open breaker skips redis cache before probing'
+    )
+    op.add_option(
+        '--redis-breaker-slow-call', action='store', type=float,
+        default=None,
+        help='seconds after which redis cache call is counted as failure'
+    )
+    op.add_option(
+        '--access-log', action='store', default=None,
+        help='access log file, the same as --log when not set'
+    )
+    op.add_option(
+        '--access-log-sample-rate', action='store', type=float, default=1.,
+        help='share of successful requests written to access log'
+    )
+    op.add_option(
+        '--access-log-route-rates', action='callback', type=str,
+        callback=parse_rates, default={},
+        help='sample rates by route, e.g. method=0.1,batch=1'
+    )
+    op.add_option(
+        '--access-log-code-rates', action='callback', type=str,
+        callback=parse_rates, default={},
+        help='sample rates by response code, e.g. 200=0.01'
+    )
+    op.add_option(
+        '--access-log-max-payload', action='store', type=int, default=1024,
+        help='max logged bytes of request and response'
+    )
+    op.add_option(
+        '--profile-dir', action='store', default=None,
+        help='directory to write profiles of sampled requests to, '
+             'profiling is disabled when not set'
+    )
+    op.add_option(
+        '--profile-sample-rate', action='store', type=float, default=0.,
+        help='share of requests to profile'
+    )
+    op.add_option(
+        '--profile-token', action='store', default=None,
+        help='requests with X-Profile header of this value are profiled'
+    )
+    op.add_option(
+        '--profile-memory', action='store_true', default=False,
+        help='also trace memory allocations of profiled requests'
+    )
     (opts, args) = op.parse_args()
+    if opts.engine == 'asyncio':
+        unsupported = [
+            option for option, is_set in (
+                ('--workers', opts.workers > 1),
+                ('--threads', opts.threads > 1),
+                ('--local-cache-size', opts.local_cache_size > 0),
+                ('--interests-cache-size', opts.interests_cache_size > 0),
+                ('--write-behind-queue', opts.write_behind_queue > 0),
+                ('--profile-dir', opts.profile_dir is not None),
+            ) if is_set
+        ]
+        if unsupported:
+            op.error(
+                f'{", ".join(unsupported)} not supported by asyncio engine'
+            )
     logging.basicConfig(
         filename=opts.log,
         level=logging.INFO,
         format='[%(asctime)s] %(levelname).1s %(message)s',
         datefmt='%Y.%m.%d %H:%M:%S'
     )
-    run_server(host=opts.host, port=opts.port)
+    setup_access_log(
+        filename=opts.access_log or opts.log,
+        sample_rate=opts.access_log_sample_rate,
+        route_sample_rates=opts.access_log_route_rates,
+        code_sample_rates={
+            int(code): rate
+            for code, rate in opts.access_log_code_rates.items()
+        },
+        max_payload_bytes=opts.access_log_max_payload
+    )
+    PROFILER.configure(
+        directory=opts.profile_dir,
+        sample_rate=opts.profile_sample_rate,
+        token=opts.profile_token,
+        memory=opts.profile_memory
+    )
+    body_limits = BodyLimits(
+        max_bytes=opts.max_body_size,
+        route_max_bytes=opts.route_max_body_sizes,
+        timeout_sec=opts.body_timeout
+    )
+    redis_options = dict(
+        host=opts.redis_host,
+        port=opts.redis_port,
+        unix_socket_path=opts.redis_socket,
+        max_connections=opts.redis_max_connections,
+        pool_timeout_sec=opts.redis_pool_timeout,
+        health_check_interval_sec=opts.redis_health_check_interval,
+        socket_keepalive=opts.redis_keepalive,
+        breaker_failures=opts.redis_breaker_failures,
+        breaker_reset_sec=opts.redis_breaker_reset,
+        breaker_slow_call_sec=opts.redis_breaker_slow_call
+    )
+    if opts.engine == 'asyncio':
+        run_async_server(
+            host=opts.host,
+            port=opts.port,
+            idle_timeout_sec=opts.idle_timeout,
+            body_limits=body_limits,
+            max_requests_per_connection=opts.max_requests_per_connection,
+            store_options=dict(
+                backend=opts.store,
+                memory_max_keys=opts.memory_max_keys,
+                memory_max_bytes=opts.memory_max_bytes,
+                **redis_options
+            )
+        )
+    else:
+        run_server(
+            host=opts.host,
+            port=opts.port,
+            workers=opts.workers,
+            threads=opts.threads,
+            idle_timeout_sec=opts.idle_timeout,
+            max_requests_per_connection=opts.max_requests_per_connection,
+            body_limits=body_limits,
+            store_options=dict(
+                backend=opts.store,
+                memory_max_keys=opts.memory_max_keys,
+                memory_max_bytes=opts.memory_max_bytes,
+                local_cache_size=opts.local_cache_size,
+                local_cache_bytes=opts.local_cache_bytes,
+                interests_cache_size=opts.interests_cache_size,
+                interests_cache_ttl_sec=opts.interests_cache_ttl,
+                write_behind_queue_size=opts.write_behind_queue,
+                write_behind_batch_size=opts.write_behind_batch,
+                **redis_options
+            )
+        )
 
 
 if __name__ == '__main__':
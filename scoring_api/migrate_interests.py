@@ -0,0 +1,135 @@
+"""Converts stored clients interests between JSON and compact formats
+
+Keys are converted in place in batches: each batch is read with a single
+bulk call and written back with another one. Interests written by other
+clients between the two calls are overwritten, so writers should be
+stopped or write the target format while migrating
+"""
+import itertools
+import logging
+from optparse import OptionParser
+
+from scoring_api.api import codec
+from scoring_api.api.constants import INTERESTS_KEY_PREFIX
+from scoring_api.api.interests_format import (
+    DICTIONARY_KEY,
+    InterestsDictionary,
+    is_compact,
+)
+from scoring_api.api.store import KeyValueStore, get_store
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('compact', 'json')
+
+
+def migrate_interests(
+    store: KeyValueStore,
+    target_format: str = 'compact',
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> dict[str, int]:
+    """Converts all clients interests to the target format
+
+    Args:
+        store: key value store with interests
+        target_format: `compact` or `json`
+        batch_size: max number of keys converted at once
+        dry_run: counts keys to convert without writing them
+
+    Returns:
+        numbers of scanned, converted, skipped and invalid keys
+    """
+    if target_format not in FORMATS:
+        raise ValueError(f'unknown interests format {target_format}')
+    dictionary = InterestsDictionary()
+    dictionary.load(store.get(DICTIONARY_KEY))
+    stats = dict(scanned=0, converted=0, skipped=0, invalid=0)
+    keys = store.scan_keys(INTERESTS_KEY_PREFIX, count=batch_size)
+    while batch := list(itertools.islice(keys, batch_size)):
+        _migrate_batch(
+            store, dictionary, batch, target_format, dry_run, stats
+        )
+    return stats
+
+
+def _migrate_batch(
+    store: KeyValueStore,
+    dictionary: InterestsDictionary,
+    keys: list[str],
+    target_format: str,
+    dry_run: bool,
+    stats: dict[str, int]
+) -> None:
+    converted = {}
+    extended = False
+    for key, raw in zip(keys, store.get_many(keys)):
+        stats['scanned'] += 1
+        if not raw or is_compact(raw) == (target_format == 'compact'):
+            stats['skipped'] += 1
+            continue
+        try:
+            if target_format == 'compact':
+                converted[key], added = dictionary.encode(codec.loads(raw))
+                extended = extended or added
+            else:
+                converted[key] = codec.dumps(dictionary.decode(raw)).decode()
+        except (ValueError, TypeError, LookupError):
+            logger.warning('Unable to convert interests of %s', key)
+            stats['invalid'] += 1
+    stats['converted'] += len(converted)
+    if dry_run:
+        return
+    # ids should be resolvable before interests referring them are written
+    if extended:
+        store.set(DICTIONARY_KEY, dictionary.dump())
+    store.set_many(converted)
+    logger.info('Converted %s of %s keys', stats['converted'], stats['scanned'])
+
+
+def main():
+    op = OptionParser(usage='%prog [options]', description=__doc__)
+    op.add_option(
+        '-f', '--format', action='store', type='choice',
+        choices=list(FORMATS), default='compact',
+        help='target format of interests'
+    )
+    op.add_option('-b', '--batch-size', action='store', type=int, default=1000)
+    op.add_option(
+        '--dry-run', action='store_true', default=False,
+        help='count keys to convert without writing them'
+    )
+    op.add_option('--redis-host', action='store', type=str, default='redis')
+    op.add_option('--redis-port', action='store', type=int, default=6379)
+    op.add_option(
+        '--redis-socket', action='store', type=str, default=None,
+        help='redis unix socket path, used instead of host and port'
+    )
+    op.add_option('-l', '--log', action='store', default=None)
+    (opts, args) = op.parse_args()
+    logging.basicConfig(
+        filename=opts.log,
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S'
+    )
+    store = get_store(
+        host=opts.redis_host,
+        port=opts.redis_port,
+        unix_socket_path=opts.redis_socket,
+        breaker_failures=0
+    )
+    try:
+        stats = migrate_interests(
+            store,
+            target_format=opts.format,
+            batch_size=opts.batch_size,
+            dry_run=opts.dry_run
+        )
+    finally:
+        store.close()
+    logger.info('Migration finished: %s', stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Offline scoring of person records
+
+Records are read as JSON lines with fields of `OnlineScoreRequest` and an
+optional `id`. For each record a JSON line with its `id` (line number when
+not set) and `score` or `error` is written in input order. Records are
+processed in batches: cached scores of a batch are fetched with a single
+bulk call and missing ones are cached with another one. Batches are spread
+across a pool of processes, each with its own store connection
+"""
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import logging
+import sys
+from optparse import OptionParser
+from typing import IO, Any, Iterable, Iterator
+
+from scoring_api.api import codec
+from scoring_api.api.api import OnlineScoreRequest
+from scoring_api.api.metrics import SCORE_CACHE
+from scoring_api.api.scoring import (
+    SCORE_CACHE_TTL_SEC,
+    calculate_score,
+    get_score_key,
+)
+from scoring_api.api.store import STORE_BACKENDS, KeyValueStore, get_store
+
+BATCH_SIZE = 1000
+
+# store of the worker process
+_store: KeyValueStore | None = None
+
+
+def score_batch(
+    store: KeyValueStore,
+    lines: list[tuple[int, bytes]]
+) -> bytes:
+    """Scores batch of records
+
+    Args:
+        store: key value store with score cache
+        lines: line numbers and JSON lines of records
+
+    Returns:
+        JSON lines of results
+    """
+    results = []
+    requests = []
+    for number, line in lines:
+        result = {}
+        try:
+            record = codec.loads(line)
+            result['id'] = record.get('id', number)
+            requests.append((result, OnlineScoreRequest(**record)))
+        except (ValueError, TypeError, AttributeError) as e:
+            result.setdefault('id', number)
+            result['error'] = str(e)
+        results.append(result)
+
+    keys = [
+        get_score_key(
+            phone=request.phone,
+            birthday=request.birthday,
+            first_name=request.first_name,
+            last_name=request.last_name
+        )
+        for _, request in requests
+    ]
+    calculated = {}
+    for key, (result, request), cached in zip(
+        keys, requests, store.cache_get_many(keys)
+    ):
+        # the same rules as in `get_score`: empty and zero scores are
+        # calculated again
+        if cached and float(cached):
+            SCORE_CACHE.inc('hit')
+            result['score'] = float(cached)
+            continue
+        SCORE_CACHE.inc('miss')
+        result['score'] = calculated[key] = calculate_score(
+            phone=request.phone,
+            email=request.email,
+            birthday=request.birthday,
+            gender=request.gender,
+            first_name=request.first_name,
+            last_name=request.last_name
+        )
+    if calculated:
+        store.cache_set_many(calculated, SCORE_CACHE_TTL_SEC)
+    return b''.join(codec.dumps(result) + b'\n' for result in results)
+
+
+def _init_worker(store_options: dict) -> None:
+    global _store
+    _store = get_store(**store_options)
+
+
+def _score_batch_in_worker(lines: list[tuple[int, bytes]]) -> bytes:
+    return score_batch(_store, lines)
+
+
+def _batches(
+    lines: Iterable[bytes],
+    batch_size: int
+) -> Iterator[list[tuple[int, bytes]]]:
+    numbered = (
+        (number, line)
+        for number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while batch := list(itertools.islice(numbered, batch_size)):
+        yield batch
+
+
+def score_lines(
+    lines: Iterable[bytes],
+    store_options: dict[str, Any] | None = None,
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE
+) -> Iterator[bytes]:
+    """Scores JSON lines of records
+
+    Only a few batches per worker are in flight, so memory stays bounded
+    for input of any size
+
+    Args:
+        lines: JSON lines of records, empty lines are skipped
+        store_options: keyword arguments of `get_store`
+        workers: number of worker processes, records are scored in the
+            current process when 1
+        batch_size: number of records in batch
+
+    Returns:
+        JSON lines of results of batches in input order
+    """
+    store_options = store_options or {}
+    batches = _batches(lines, batch_size)
+    if workers <= 1:
+        store = get_store(**store_options)
+        try:
+            for batch in batches:
+                yield score_batch(store, batch)
+        finally:
+            store.close()
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(store_options,)
+    ) as executor:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(executor.submit(_score_batch_in_worker, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(
+    input_file: IO[bytes],
+    output_file: IO[bytes],
+    **kwargs
+) -> None:
+    """Scores records of the input file to the output file
+
+    Args:
+        input_file: binary file with JSON lines of records
+        output_file: binary file to write JSON lines of results to
+        kwargs: keyword arguments of `score_lines`
+    """
+    for chunk in score_lines(input_file, **kwargs):
+        output_file.write(chunk)
+    output_file.flush()
+
+
+def main(argv: list[str] | None = None):
+    op = OptionParser(
+        usage='%prog score-file [options] [input [output]]',
+        description='Scores JSON lines of person records, reads stdin and '
+                    'writes stdout when files are not set'
+    )
+    op.add_option('-w', '--workers', action='store', type=int, default=1)
+    op.add_option(
+        '-b', '--batch-size', action='store', type=int, default=BATCH_SIZE,
+        help='number of records scored with a single cache request'
+    )
+    op.add_option(
+        '-s', '--store', action='store', type='choice',
+        choices=list(STORE_BACKENDS), default='redis'
+    )
+    op.add_option('--redis-host', action='store', type=str, default='redis')
+    op.add_option('--redis-port', action='store', type=int, default=6379)
+    op.add_option(
+        '--redis-socket', action='store', type=str, default=None,
+        help='redis unix socket path, used instead of host and port'
+    )
+    op.add_option('-l', '--log', action='store', default=None)
+    (opts, args) = op.parse_args(argv)
+    if len(args) > 2:
+        op.error('expected at most input and output files')
+    logging.basicConfig(
+        filename=opts.log,
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S'
+    )
+    input_path = args[0] if args else '-'
+    output_path = args[1] if len(args) > 1 else '-'
+    with contextlib.ExitStack() as stack:
+        input_file = (
+            sys.stdin.buffer if input_path == '-'
+            else stack.enter_context(open(input_path, 'rb'))
+        )
+        output_file = (
+            sys.stdout.buffer if output_path == '-'
+            else stack.enter_context(open(output_path, 'wb'))
+        )
+        score_file(
+            input_file,
+            output_file,
+            store_options=dict(
+                backend=opts.store,
+                host=opts.redis_host,
+                port=opts.redis_port,
+                unix_socket_path=opts.redis_socket,
+                breaker_failures=0
+            ),
+            workers=opts.workers,
+            batch_size=opts.batch_size
+        )
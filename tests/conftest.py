@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import json
 from datetime import datetime
@@ -5,11 +6,25 @@ from typing import Callable, Generator
 
 import pytest
 
-from scoring_api.api import constants
+from scoring_api.api import codec, constants
+from scoring_api.api.async_handler import method_handler as async_handler
+from scoring_api.api.async_store import get_async_store
 from scoring_api.api.handler import method_handler
 from scoring_api.api.store import KeyValueStore, get_store
 
 
+@pytest.fixture(params=['json', 'orjson'])
+def codec_backend(request, monkeypatch) -> str:
+    """Switches JSON codec to each backend, orjson is skipped if missing"""
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    loads, dumps = codec.BACKENDS[request.param]
+    monkeypatch.setattr(codec, 'BACKEND', request.param)
+    monkeypatch.setattr(codec, 'loads', loads)
+    monkeypatch.setattr(codec, 'dumps', dumps)
+    return request.param
+
+
 @pytest.fixture
 def context() -> dict:
     return dict()
@@ -92,3 +107,29 @@ def get_response_with_store_preset(
             store=store_with_presets
         )
     return response
+
+
+@pytest.fixture(scope='function')
+def get_async_response(
+    headers: dict,
+    context: dict,
+    store_with_presets: KeyValueStore
+) -> Callable[[dict], tuple[dict | str, int]]:
+    async def async_response(request: dict) -> tuple[dict | str, int]:
+        # async store is bound to the loop, so it is created per call
+        async_store = get_async_store()
+        try:
+            return await async_handler(
+                request=dict(
+                    body=request,
+                    headers=headers
+                ),
+                ctx=context,
+                store=async_store
+            )
+        finally:
+            await async_store.close()
+
+    def response(request: dict) -> tuple[dict | str, int]:
+        return asyncio.run(async_response(request))
+    return response
@@ -0,0 +1,375 @@
+import asyncio
+import json
+import subprocess
+import sys
+from typing import Callable
+
+import pytest
+from fixtures import (
+    auth_invalid_requests,
+    clients_interests_invalid_requests,
+    clients_interests_valid_requests,
+    method_invalid_requests,
+    online_score_invalid_requests,
+    online_score_valid_requests,
+)
+
+from scoring_api.api import constants
+from scoring_api.api.async_server import AsyncHTTPServer
+from scoring_api.api.async_store import AsyncMemoryStorage
+from scoring_api.api.handler import BodyLimits
+
+
+def test_empty_request(get_async_response: Callable):
+    _, code = get_async_response({})
+    assert code == constants.INVALID_REQUEST
+
+
+@pytest.mark.parametrize('request_dict', auth_invalid_requests)
+def test_bad_auth(request_dict: dict, get_async_response: Callable):
+    _, code = get_async_response(request_dict)
+    assert code == constants.FORBIDDEN
+
+
+@pytest.mark.parametrize('request_dict', method_invalid_requests)
+def test_invalid_method_request(
+    request_dict: dict,
+    get_async_response: Callable,
+    set_valid_auth: Callable
+):
+    set_valid_auth(request_dict)
+    response, code = get_async_response(request_dict)
+    assert code == constants.INVALID_REQUEST
+    assert len(response) > 0
+
+
+@pytest.mark.parametrize('arguments', online_score_invalid_requests)
+def test_invalid_score_request(
+    arguments: dict,
+    get_async_response: Callable,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': arguments
+    }
+    set_valid_auth(request)
+    response, code = get_async_response(request)
+    assert code == constants.INVALID_REQUEST
+    assert len(response) > 0
+
+
+@pytest.mark.parametrize('arguments', online_score_valid_requests)
+def test_ok_score_request(
+    arguments: dict,
+    get_async_response: Callable,
+    set_valid_auth: Callable,
+    context: dict
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': arguments
+    }
+    set_valid_auth(request)
+    response, code = get_async_response(request)
+    assert code == constants.OK
+    score = response.get('score')
+    assert isinstance(score, (int, float)) and score >= 0
+    assert sorted(context['has']) == sorted(arguments.keys())
+
+
+@pytest.mark.parametrize('arguments', clients_interests_invalid_requests)
+def test_invalid_interests_request(
+    arguments: dict,
+    get_async_response: Callable,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': arguments
+    }
+    set_valid_auth(request)
+    response, code = get_async_response(request)
+    assert code == constants.INVALID_REQUEST
+    assert len(response) > 0
+
+
+@pytest.mark.parametrize('arguments', clients_interests_valid_requests)
+def test_ok_interests_request(
+    arguments: dict,
+    get_async_response: Callable,
+    set_valid_auth: Callable,
+    context: dict
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': arguments
+    }
+    set_valid_auth(request)
+    response, code = get_async_response(request)
+    assert code == constants.OK, code
+    assert len(arguments['client_ids']) == len(response)
+    assert all(
+        v
+        and isinstance(v, list)
+        and all(isinstance(i, (bytes, str)) for i in v)
+        for v in response.values()
+    )
+    assert context.get('nclients') == len(arguments['client_ids'])
+
+
+def test_async_server_keeps_connection(set_valid_auth: Callable):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'admin',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    body = json.dumps(request).encode()
+
+    async def run() -> list[tuple[int, dict]]:
+        server = AsyncHTTPServer(host='localhost', port=0)
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        results = []
+        try:
+            for _ in range(3):
+                writer.write(
+                    b'POST /method HTTP/1.1\r\n'
+                    + b'Content-Length: %d\r\n\r\n' % len(body)
+                    + body
+                )
+                status_line = await reader.readline()
+                length = 0
+                while (line := await reader.readline()) != b'\r\n':
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                payload = json.loads(await reader.readexactly(length))
+                results.append((int(status_line.split()[1]), payload))
+        finally:
+            writer.close()
+            await server.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert len(results) == 3
+    assert all(code == constants.OK for code, _ in results)
+    assert all(r['response']['score'] == 42 for _, r in results)
+
+
+@pytest.mark.parametrize('head,expected_code', [
+    (b'POST /method HTTP/1.1\r\n\r\n', constants.LENGTH_REQUIRED),
+    (
+        b'POST /method HTTP/1.1\r\nContent-Length: 101\r\n\r\n',
+        constants.PAYLOAD_TOO_LARGE
+    ),
+    (
+        b'POST /method HTTP/1.1\r\nContent-Length: 50\r\n\r\n{}',
+        constants.REQUEST_TIMEOUT
+    ),
+])
+def test_async_server_body_limits(head: bytes, expected_code: int):
+    async def run() -> tuple[bytes, bytes]:
+        server = AsyncHTTPServer(
+            host='localhost',
+            port=0,
+            body_limits=BodyLimits(max_bytes=100, timeout_sec=0.2)
+        )
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(head)
+            return await reader.read()
+        finally:
+            writer.close()
+            await server.stop()
+
+    response = asyncio.run(run())
+    head, _, body = response.partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == expected_code
+    assert b'Connection: close' in head
+    assert json.loads(body)['code'] == expected_code
+
+
+def test_async_server_timing_header(set_valid_auth: Callable):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'admin',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    body = json.dumps(request).encode()
+
+    async def run() -> bytes:
+        server = AsyncHTTPServer(host='localhost', port=0)
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(
+                b'POST /method HTTP/1.1\r\nConnection: close\r\n'
+                + b'Content-Length: %d\r\n\r\n' % len(body)
+                + body
+            )
+            return await reader.read()
+        finally:
+            writer.close()
+            await server.stop()
+
+    head, _, _ = asyncio.run(run()).partition(b'\r\n\r\n')
+    [header] = [
+        line for line in head.decode().split('\r\n')
+        if line.startswith('Server-Timing:')
+    ]
+    stages = [
+        metric.split(';')[0].strip()
+        for metric in header.partition(':')[2].split(',')
+    ]
+    assert stages == [
+        'read', 'parse', 'request', 'auth', 'arguments', 'serialize'
+    ]
+
+
+def test_async_server_empty_body():
+    async def run() -> bytes:
+        server = AsyncHTTPServer(host='localhost', port=0)
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(b'POST /method HTTP/1.1\r\nContent-Length: 0\r\n\r\n')
+            return await reader.read()
+        finally:
+            writer.close()
+            await server.stop()
+
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == constants.BAD_REQUEST
+    assert json.loads(body)['code'] == constants.BAD_REQUEST
+
+
+def test_async_server_memory_store_and_connection_limit(
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    body = json.dumps(request).encode()
+
+    async def run() -> bytes:
+        server = AsyncHTTPServer(
+            host='localhost',
+            port=0,
+            max_requests_per_connection=1,
+            store_options={'backend': 'memory'}
+        )
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            assert isinstance(server._store, AsyncMemoryStorage)
+            writer.write(
+                b'POST /method HTTP/1.1\r\n'
+                + b'Content-Length: %d\r\n\r\n' % len(body)
+                + body
+            )
+            # the connection is closed after the only allowed request
+            return await reader.read()
+        finally:
+            writer.close()
+            await server.stop()
+
+    head, _, payload = asyncio.run(run()).partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == constants.OK
+    assert b'Connection: close' in head
+    assert json.loads(payload)['response']['score'] == 3.0
+
+
+@pytest.mark.parametrize('option', [
+    ['--workers', '2'],
+    ['--threads', '2'],
+    ['--write-behind-queue', '100'],
+])
+def test_asyncio_engine_rejects_unsupported_options(option: list[str]):
+    result = subprocess.run(
+        [sys.executable, '-m', 'scoring_api.main', '--engine', 'asyncio',
+         *option],
+        capture_output=True,
+        timeout=30
+    )
+    assert result.returncode == 2
+    assert b'not supported by asyncio engine' in result.stderr
+
+
+def test_async_server_slow_headers():
+    async def run() -> bytes:
+        server = AsyncHTTPServer(host='localhost', port=0, idle_timeout_sec=0.3)
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+
+        async def trickle() -> None:
+            writer.write(b'POST /method HTTP/1.1\r\n')
+            for i in range(100):
+                await asyncio.sleep(0.05)
+                writer.write(b'X-Header-%d: 1\r\n' % i)
+
+        sender = asyncio.create_task(trickle())
+        try:
+            return await asyncio.wait_for(reader.read(), 5)
+        finally:
+            sender.cancel()
+            writer.close()
+            await server.stop()
+
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == constants.REQUEST_TIMEOUT
+    assert b'Connection: close' in head
+    assert json.loads(body)['code'] == constants.REQUEST_TIMEOUT
+
+
+@pytest.mark.parametrize('headers', [
+    b'X-Large: ' + b'a' * (constants.MAX_HEADERS_BYTES + 1) + b'\r\n',
+    b''.join(
+        b'X-Header-%d: 1\r\n' % i for i in range(constants.MAX_HEADERS + 1)
+    ),
+], ids=['long_header', 'many_headers'])
+def test_async_server_too_large_headers(headers: bytes):
+    async def run() -> bytes:
+        server = AsyncHTTPServer(host='localhost', port=0)
+        await server.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(
+                b'POST /method HTTP/1.1\r\n' + headers
+                + b'Content-Length: 2\r\n\r\n{}'
+            )
+            return await asyncio.wait_for(reader.read(), 5)
+        finally:
+            writer.close()
+            await server.stop()
+
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == constants.REQUEST_HEADER_FIELDS_TOO_LARGE
+    assert b'Connection: close' in head
+    assert json.loads(body)['code'] == (
+        constants.REQUEST_HEADER_FIELDS_TOO_LARGE
+    )
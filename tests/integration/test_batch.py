@@ -0,0 +1,146 @@
+from typing import Callable
+
+import pytest
+
+from scoring_api.api import constants, handler
+from scoring_api.api.handler import batch_handler
+from scoring_api.api.store import KeyValueStore
+
+
+@pytest.fixture
+def get_batch_response(
+    headers: dict,
+    context: dict,
+    store_with_presets: KeyValueStore
+) -> Callable[[list], tuple[list | str, int]]:
+    def response(body: list) -> tuple[list | str, int]:
+        return batch_handler(
+            request=dict(
+                body=body,
+                headers=headers
+            ),
+            ctx=context,
+            store=store_with_presets
+        )
+    return response
+
+
+def test_batch_should_be_list(get_batch_response: Callable):
+    response, code = get_batch_response({'method': 'online_score'})
+    assert code == constants.INVALID_REQUEST
+    assert len(response) > 0
+
+
+def test_batch_too_large(get_batch_response: Callable):
+    _, code = get_batch_response([{}] * (constants.BATCH_MAX_SIZE + 1))
+    assert code == constants.INVALID_REQUEST
+
+
+def test_batch_results_in_order(
+    get_batch_response: Callable,
+    set_valid_auth: Callable,
+    context: dict
+):
+    score_request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    interests_request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': [1, 2]}
+    }
+    set_valid_auth(score_request)
+    set_valid_auth(interests_request)
+    bad_auth_request = dict(score_request, token='invalid')
+
+    response, code = get_batch_response([
+        score_request,
+        interests_request,
+        bad_auth_request,
+        'not a request',
+        score_request,
+    ])
+    assert code == constants.OK
+    assert context['nrequests'] == 5
+    assert [r['code'] for r in response] == [
+        constants.OK,
+        constants.OK,
+        constants.FORBIDDEN,
+        constants.INVALID_REQUEST,
+        constants.OK,
+    ]
+    assert response[0]['response'] == {'score': 3.0}
+    assert response[4]['response'] == {'score': 3.0}
+    assert response[1]['response'] == {1: ['a', 'b'], 2: ['c', 'd']}
+
+
+def test_batch_coalesces_store_access(
+    get_batch_response: Callable,
+    set_valid_auth: Callable,
+    store_with_presets: KeyValueStore,
+    monkeypatch
+):
+    def single_key_access(*args, **kwargs):
+        raise AssertionError('single key store access in batch')
+
+    for method in ('get', 'cache_get', 'cache_set'):
+        monkeypatch.setattr(store_with_presets, method, single_key_access)
+
+    body = []
+    for i in range(10):
+        request = {
+            'account': 'horns&hoofs',
+            'login': 'h&f',
+            'method': 'online_score',
+            'arguments': {'first_name': str(i), 'last_name': 'b'}
+        }
+        set_valid_auth(request)
+        body.append(request)
+    response, code = get_batch_response(body)
+    assert code == constants.OK
+    assert all(r['response'] == {'score': 0.5} for r in response)
+
+
+def test_batch_items_are_parsed_once(
+    get_batch_response: Callable,
+    set_valid_auth: Callable,
+    monkeypatch
+):
+    calls = {'request': 0, 'auth': 0, 'arguments': 0}
+
+    def counted(name: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(
+        handler, 'MethodRequest', counted('request', handler.MethodRequest)
+    )
+    monkeypatch.setattr(
+        handler, 'check_auth', counted('auth', handler.check_auth)
+    )
+    monkeypatch.setattr(
+        handler,
+        'ClientsInterestsRequest',
+        counted('arguments', handler.ClientsInterestsRequest)
+    )
+    interests_request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': [1, 2]}
+    }
+    set_valid_auth(interests_request)
+    invalid_request = dict(interests_request, arguments={'client_ids': []})
+    response, code = get_batch_response([interests_request, invalid_request])
+    assert code == constants.OK
+    assert [r['code'] for r in response] == [
+        constants.OK, constants.INVALID_REQUEST
+    ]
+    # invalid arguments are validated again to report the error
+    assert calls == {'request': 2, 'auth': 2, 'arguments': 3}
@@ -1,12 +1,22 @@
+import json
 from typing import Callable
 
 import pytest
+import redis
 from fixtures import (
     clients_interests_invalid_requests,
     clients_interests_valid_requests,
 )
 
 from scoring_api.api import constants
+from scoring_api.api.handler import (
+    StreamedDict,
+    build_response,
+    encode_streamed_response,
+    method_handler,
+)
+from scoring_api.api.scoring import get_interests_many
+from scoring_api.api.store import KeyValueStore
 
 
 @pytest.mark.parametrize('arguments', clients_interests_invalid_requests)
@@ -51,3 +61,58 @@ def test_ok_interests_request(
         for v in response.values()
     )
     assert context.get('nclients') == len(arguments['client_ids'])
+
+
+def streamed_request(set_valid_auth: Callable, cids: list[int]) -> dict:
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': cids}
+    }
+    set_valid_auth(request)
+    return dict(body=request, headers={}, stream=True)
+
+
+def test_streamed_interests_request(
+    store_with_presets: KeyValueStore,
+    set_valid_auth: Callable
+):
+    cids = list(range(constants.INTERESTS_STREAM_MIN_CLIENTS))
+    response, code = method_handler(
+        request=streamed_request(set_valid_auth, cids),
+        ctx={},
+        store=store_with_presets
+    )
+    assert code == constants.OK
+    assert isinstance(response, StreamedDict)
+    body = b''.join(encode_streamed_response(response, code))
+    expected = get_interests_many(store_with_presets, cids)
+    assert json.loads(body) == json.loads(
+        json.dumps(build_response(expected, code))
+    )
+
+
+def test_streamed_interests_request_fetch_error(
+    monkeypatch,
+    store: KeyValueStore,
+    set_valid_auth: Callable
+):
+    def get_many_with_connection_error(*args, **kwargs):
+        raise redis.exceptions.ConnectionError
+
+    monkeypatch.setattr(redis.Redis, 'mget', get_many_with_connection_error)
+    cids = list(range(constants.INTERESTS_STREAM_MIN_CLIENTS))
+    # the first chunk is fetched by handler
+    with pytest.raises(redis.exceptions.ConnectionError):
+        method_handler(
+            request=streamed_request(set_valid_auth, cids),
+            ctx={},
+            store=store
+        )
+
+
+def test_encode_empty_streamed_response():
+    response = StreamedDict(iter([]))
+    body = b''.join(encode_streamed_response(response, constants.OK))
+    assert json.loads(body) == {'response': {}, 'code': constants.OK}
@@ -1,10 +1,13 @@
+import json
+import time
 from typing import Callable
 
 import pytest
 import redis
 
 from scoring_api.api import constants
-from scoring_api.api.store import KeyValueStore
+from scoring_api.api.scoring import get_interests
+from scoring_api.api.store import KeyCacheStore, KeyValueStore, RedisStorage
 
 
 def test_online_score_with_non_existing_key(
@@ -144,6 +147,7 @@ def test_clients_interests_with_lost_connection(
         raise redis.exceptions.ConnectionError
 
     monkeypatch.setattr(redis.Redis, 'get', redis_get_with_connection_error)
+    monkeypatch.setattr(redis.Redis, 'mget', redis_get_with_connection_error)
 
     request = {
         'account': 'horns&hoofs',
@@ -157,3 +161,42 @@ def test_clients_interests_with_lost_connection(
 
     with pytest.raises(redis.ConnectionError):
         get_response(request)
+
+
+def test_pool_stats():
+    store = RedisStorage(max_connections=2)
+    assert store.pool_stats() == dict(max_connections=2, created=0, in_use=0)
+    store.set('key', '1')
+    assert store.pool_stats() == dict(max_connections=2, created=1, in_use=0)
+    store.flush()
+
+
+def test_pool_timeout():
+    store = RedisStorage(max_connections=1, pool_timeout_sec=0.1)
+    connection = store._pool.get_connection('GET')
+    try:
+        assert store.pool_stats()['in_use'] == 1
+        with pytest.raises(redis.exceptions.ConnectionError):
+            store.get('key')
+        assert store.cache_get('key') is None
+    finally:
+        store._pool.release(connection)
+    assert store.get('key') is None
+
+
+def test_keyspace_notifications_invalidate_interests_cache():
+    store = RedisStorage()
+    store.set('i:1', json.dumps(['a']))
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    try:
+        assert get_interests(cached, 1) == ['a']
+        store.set('i:1', json.dumps(['b']))
+        # notification published by redis with enabled keyspace events
+        deadline = time.monotonic() + 5
+        while get_interests(cached, 1) != ['b']:
+            assert time.monotonic() < deadline
+            store._redis.publish('__keyspace@0__:i:1', 'set')
+            time.sleep(0.05)
+    finally:
+        store.flush()
+        store.close()
@@ -0,0 +1,395 @@
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from typing import Callable, Generator
+
+import pytest
+
+from scoring_api.api import constants
+from scoring_api.api.handler import BodyLimits
+from scoring_api.api.profiling import PROFILER
+from scoring_api.api.server import (
+    ThreadPoolHTTPServer,
+    _serve,
+    build_server,
+)
+from scoring_api.api.store import STORE, KeyValueStore
+
+
+@pytest.fixture
+def server() -> Generator[ThreadPoolHTTPServer, None, None]:
+    http_server = build_server(
+        host='localhost', port=0, threads=4, max_requests_per_connection=3
+    )
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+    thread.join()
+
+
+def post(server: ThreadPoolHTTPServer, body: bytes) -> tuple[dict, int]:
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=body)
+        response = connection.getresponse()
+        return json.loads(response.read()), response.status
+    finally:
+        connection.close()
+
+
+@pytest.mark.usefixtures('codec_backend')
+def test_threaded_server_bad_request(server: ThreadPoolHTTPServer):
+    response, code = post(server, b'not a json')
+    assert code == constants.BAD_REQUEST
+    assert response['code'] == constants.BAD_REQUEST
+
+
+def test_threaded_server_empty_body(server: ThreadPoolHTTPServer):
+    response, code = post(server, b'')
+    assert code == constants.BAD_REQUEST
+    assert response['code'] == constants.BAD_REQUEST
+
+
+@pytest.mark.usefixtures('codec_backend')
+def test_threaded_server_concurrent_requests(
+    server: ThreadPoolHTTPServer,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'admin',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    body = json.dumps(request).encode()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: post(server, body), range(32)))
+    assert all(code == constants.OK for _, code in results)
+    assert all(r['response']['score'] == 42 for r, _ in results)
+
+
+@pytest.mark.usefixtures('codec_backend')
+@pytest.mark.parametrize('body', [b'{"a": NaN}', b'[1e400]'])
+def test_threaded_server_rejects_non_finite_numbers(
+    server: ThreadPoolHTTPServer,
+    body: bytes
+):
+    response, code = post(server, body)
+    assert code == constants.BAD_REQUEST
+    assert response['code'] == constants.BAD_REQUEST
+
+
+@pytest.mark.usefixtures('codec_backend')
+def test_threaded_server_large_client_ids(
+    server: ThreadPoolHTTPServer,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': [1, 2 ** 64]}
+    }
+    set_valid_auth(request)
+    response, code = post(server, json.dumps(request).encode())
+    assert code == constants.OK
+    # ids beyond 64 bits are decoded as floats by both codec backends
+    assert sorted(response['response']) == ['1', '1.8446744073709552e+19']
+
+
+def test_threaded_server_keeps_connection(server: ThreadPoolHTTPServer):
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        headers = []
+        for _ in range(3):
+            connection.request('POST', '/method', body=b'{}')
+            response = connection.getresponse()
+            body = response.read()
+            assert int(response.getheader('Content-Length')) == len(body)
+            headers.append(response.getheader('Connection'))
+            if response.getheader('Connection') == 'keep-alive':
+                # the same socket is reused for the next request
+                assert connection.sock is not None
+    finally:
+        connection.close()
+    assert headers == ['keep-alive', 'keep-alive', 'close']
+
+
+def test_single_threaded_server_closes_connection():
+    http_server = build_server(host='localhost', port=0)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    connection = HTTPConnection(*http_server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=b'{}')
+        response = connection.getresponse()
+        response.read()
+        assert response.getheader('Connection') == 'close'
+    finally:
+        connection.close()
+        http_server.shutdown()
+        http_server.server_close()
+        thread.join()
+
+
+def test_metrics_endpoint(server: ThreadPoolHTTPServer):
+    post(server, b'{}')
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('GET', '/metrics')
+        response = connection.getresponse()
+        body = response.read().decode()
+    finally:
+        connection.close()
+    assert response.status == constants.OK
+    assert response.getheader('Content-Type').startswith('text/plain')
+    assert 'scoring_request_duration_seconds_count{' in body
+    assert 'route="method"' in body
+
+
+def test_large_clients_interests_are_streamed(
+    server: ThreadPoolHTTPServer,
+    set_valid_auth: Callable
+):
+    cids = list(range(constants.INTERESTS_STREAM_MIN_CLIENTS + 500))
+    store = STORE.get()
+    store.set_many({f'i:{cid}': json.dumps([f'i{cid}']) for cid in cids[::2]})
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': cids}
+    }
+    set_valid_auth(request)
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=json.dumps(request))
+        response = connection.getresponse()
+        body = json.loads(response.read())
+        assert response.getheader('Transfer-Encoding') == 'chunked'
+        assert response.getheader('Content-Length') is None
+        # connection is reused after chunked response
+        connection.request('POST', '/method', body=b'{}')
+        assert connection.getresponse().status == constants.OK
+    finally:
+        connection.close()
+        store.flush()
+    assert body['code'] == constants.OK
+    assert body['response'] == {
+        str(cid): [f'i{cid}'] if cid % 2 == 0 else [] for cid in cids
+    }
+
+
+def test_small_clients_interests_are_not_streamed(
+    server: ThreadPoolHTTPServer,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'clients_interests',
+        'arguments': {'client_ids': [1, 2]}
+    }
+    set_valid_auth(request)
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=json.dumps(request))
+        response = connection.getresponse()
+        body = json.loads(response.read())
+    finally:
+        connection.close()
+    assert response.getheader('Transfer-Encoding') is None
+    assert body == {'response': {'1': [], '2': []}, 'code': constants.OK}
+
+
+@pytest.fixture
+def limited_server() -> Generator[ThreadPoolHTTPServer, None, None]:
+    http_server = build_server(
+        host='localhost',
+        port=0,
+        threads=4,
+        body_limits=BodyLimits(
+            max_bytes=100, route_max_bytes={'batch': 200}, timeout_sec=0.2
+        )
+    )
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+    thread.join()
+
+
+def raw_request(server: ThreadPoolHTTPServer, data: bytes) -> tuple[int, dict]:
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(data)
+        response = b''
+        while chunk := sock.recv(65536):
+            response += chunk
+    head, _, body = response.partition(b'\r\n\r\n')
+    assert b'Connection: close' in head
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize('data,expected_code', [
+    (b'POST /method HTTP/1.1\r\n\r\n', constants.LENGTH_REQUIRED),
+    (
+        b'POST /method HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+        b'2\r\n{}\r\n0\r\n\r\n',
+        constants.LENGTH_REQUIRED
+    ),
+    (
+        b'POST /method HTTP/1.1\r\nContent-Length: ten\r\n\r\n{}',
+        constants.BAD_REQUEST
+    ),
+    # body is not sent, oversized request is rejected before reading it
+    (
+        b'POST /method HTTP/1.1\r\nContent-Length: 101\r\n\r\n',
+        constants.PAYLOAD_TOO_LARGE
+    ),
+    (
+        b'POST /batch HTTP/1.1\r\nContent-Length: 201\r\n\r\n',
+        constants.PAYLOAD_TOO_LARGE
+    ),
+    # body is shorter than declared
+    (
+        b'POST /method HTTP/1.1\r\nContent-Length: 50\r\n\r\n{}',
+        constants.REQUEST_TIMEOUT
+    ),
+])
+def test_body_limits(
+    limited_server: ThreadPoolHTTPServer,
+    data: bytes,
+    expected_code: int
+):
+    code, body = raw_request(limited_server, data)
+    assert code == expected_code
+    assert body['code'] == expected_code
+
+
+def test_route_body_limit(limited_server: ThreadPoolHTTPServer):
+    body = b'[1' + b' ' * 150 + b']'
+    connection = HTTPConnection(*limited_server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/batch', body=body)
+        response = connection.getresponse()
+        assert response.status == constants.OK
+        items = json.loads(response.read())['response']
+        assert [item['code'] for item in items] == [constants.INVALID_REQUEST]
+    finally:
+        connection.close()
+
+
+def test_slow_body_is_cut_off(limited_server: ThreadPoolHTTPServer):
+    address = limited_server.server_address
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.sendall(b'POST /method HTTP/1.1\r\nContent-Length: 20\r\n\r\n')
+        started_at = time.monotonic()
+        response = b''
+        try:
+            for _ in range(20):
+                # each byte arrives before socket timeout, whole body does not
+                sock.sendall(b' ')
+                time.sleep(0.05)
+        except OSError:
+            pass
+        while chunk := sock.recv(65536):
+            response += chunk
+    assert time.monotonic() - started_at < 0.9
+    assert int(response.split()[1]) == constants.REQUEST_TIMEOUT
+
+
+@pytest.fixture
+def profiler(tmp_path) -> Generator[str, None, None]:
+    PROFILER.configure(directory=str(tmp_path), token='secret')
+    yield str(tmp_path)
+    PROFILER.configure()
+
+
+def test_request_is_profiled_on_header(
+    server: ThreadPoolHTTPServer,
+    profiler: str,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    body = json.dumps(request).encode()
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=body)
+        assert connection.getresponse().read()
+        assert os.listdir(profiler) == []
+        connection.request(
+            'POST', '/method', body=body,
+            headers={'X-Profile': 'secret', 'HTTP_X_REQUEST_ID': 'abc'}
+        )
+        response = connection.getresponse()
+        assert json.loads(response.read())['code'] == constants.OK
+    finally:
+        connection.close()
+    [profile] = os.listdir(profiler)
+    assert profile.endswith('-abc.prof')
+
+
+def test_server_timing_header(
+    server: ThreadPoolHTTPServer,
+    set_valid_auth: Callable
+):
+    request = {
+        'account': 'horns&hoofs',
+        'login': 'h&f',
+        'method': 'online_score',
+        'arguments': {'phone': '79175002040', 'email': 'stupnikov@otus.ru'}
+    }
+    set_valid_auth(request)
+    connection = HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request('POST', '/method', body=json.dumps(request))
+        response = connection.getresponse()
+        response.read()
+        header = response.getheader('Server-Timing')
+    finally:
+        connection.close()
+    timings = dict(
+        metric.strip().split(';dur=') for metric in header.split(',')
+    )
+    assert list(timings) == [
+        'read', 'parse', 'request', 'auth', 'arguments', 'store', 'serialize'
+    ]
+    assert all(float(duration) >= 0 for duration in timings.values())
+
+
+def test_serve_closes_store_on_stop(store: KeyValueStore, monkeypatch):
+    STORE.configure(write_behind_queue_size=100)
+    closed = []
+    close = STORE.close
+
+    def spy() -> None:
+        closed.append(True)
+        close()
+
+    monkeypatch.setattr(STORE, 'close', spy)
+    http_server = build_server(host='localhost', port=0)
+    previous_handler = signal.getsignal(signal.SIGTERM)
+    STORE.get().cache_set('uid:write-behind', 5, 60)
+    threading.Timer(0.1, http_server.shutdown).start()
+    try:
+        _serve(http_server)
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        STORE.configure()
+    assert closed == [True]
+    assert store.cache_get('uid:write-behind') == '5'
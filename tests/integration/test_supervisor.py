@@ -0,0 +1,168 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+from typing import Callable, Generator
+
+import pytest
+
+from scoring_api.api import constants
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir('/proc'), reason='children are listed from /proc'
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> set[int]:
+    found = set()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # command may contain spaces, fields after it are fixed
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid and fields[0] != 'Z':
+            found.add(int(entry))
+    return found
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def wait_for(condition: Callable[[], bool], timeout_sec: float = 10.) -> bool:
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def supervisor() -> Generator[tuple[subprocess.Popen, int], None, None]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'scoring_api.main',
+        '--port', str(port), '--workers', '2', '--threads', '2',
+        '--store', 'memory'
+    ])
+    try:
+        assert wait_for(lambda: len(children(process.pid)) == 2)
+        assert wait_for(lambda: can_connect(port))
+        yield process, port
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def can_connect(port: int) -> bool:
+    try:
+        socket.create_connection(('localhost', port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def test_sigterm_finishes_request_in_progress(
+    supervisor: tuple[subprocess.Popen, int]
+):
+    process, port = supervisor
+    workers = children(process.pid)
+    body = json.dumps({'account': 'a', 'login': 'b'}).encode()
+    with socket.create_connection(('localhost', port), timeout=5) as sock:
+        sock.sendall(
+            b'POST /method HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body)
+            + body[:5]
+        )
+        # the worker is reading the body when it is asked to stop
+        time.sleep(0.2)
+        process.send_signal(signal.SIGTERM)
+        time.sleep(0.2)
+        sock.sendall(body[5:])
+        response = b''
+        while chunk := sock.recv(65536):
+            response += chunk
+    head, _, payload = response.partition(b'\r\n\r\n')
+    assert int(head.split()[1]) == constants.INVALID_REQUEST
+    assert b'Connection: close' in head
+    assert json.loads(payload)['code'] == constants.INVALID_REQUEST
+    assert process.wait(timeout=10) == 0
+    assert not any(is_alive(pid) for pid in workers)
+
+
+def test_supervisor_restarts_dead_worker_and_reaps_all_on_stop(
+    supervisor: tuple[subprocess.Popen, int]
+):
+    process, port = supervisor
+    workers = children(process.pid)
+    killed = workers.pop()
+    os.kill(killed, signal.SIGKILL)
+    assert wait_for(lambda: (
+        len(children(process.pid)) == 2
+        and killed not in children(process.pid)
+    ))
+    workers = children(process.pid)
+    assert can_connect(port)
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=10) == 0
+    assert not any(is_alive(pid) for pid in workers)
+
+
+def test_metrics_of_all_workers_are_served(
+    supervisor: tuple[subprocess.Popen, int]
+):
+    process, port = supervisor
+    requests = 20
+    for _ in range(requests):
+        # new connections are spread across workers
+        connection = HTTPConnection('localhost', port, timeout=5)
+        try:
+            connection.request('POST', '/method', body=b'{}')
+            connection.getresponse().read()
+        finally:
+            connection.close()
+
+    def scrape() -> str:
+        connection = HTTPConnection('localhost', port, timeout=5)
+        try:
+            connection.request('GET', '/metrics')
+            return connection.getresponse().read().decode()
+        finally:
+            connection.close()
+
+    def served(body: str) -> int:
+        return sum(
+            int(line.rsplit(' ', 1)[1]) for line in body.splitlines()
+            if line.startswith('scoring_request_duration_seconds_count')
+            and 'route="method"' in line
+        )
+
+    # snapshots of other workers are written periodically
+    assert wait_for(lambda: served(scrape()) == requests)
+    body = scrape()
+    workers = {
+        int(line.split('worker="', 1)[1].split('"', 1)[0])
+        for line in body.splitlines()
+        if line.startswith('scoring_process_start_time_seconds{')
+    }
+    assert workers == children(process.pid)
@@ -0,0 +1,103 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from scoring_api.api import constants
+from scoring_api.api.access_log import AccessLogger, JsonLinesFormatter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+        self.setFormatter(JsonLinesFormatter())
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(json.loads(self.format(record)))
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def handler() -> ListHandler:
+    return ListHandler()
+
+
+@pytest.fixture
+def access_log(handler: ListHandler) -> AccessLogger:
+    access_logger = AccessLogger()
+    access_logger.configure(
+        handler=handler,
+        sample_rate=0,
+        route_sample_rates={'batch': 1},
+        code_sample_rates={constants.NOT_FOUND: 0},
+        max_payload_bytes=8
+    )
+    yield access_logger
+    access_logger.stop()
+
+
+def test_should_log(access_log: AccessLogger):
+    assert not access_log.should_log('method', constants.OK)
+    assert access_log.should_log('batch', constants.OK)
+    assert access_log.should_log('method', constants.INVALID_REQUEST)
+    assert access_log.should_log('method', constants.NOT_FOUND)
+
+
+def test_log_in_background(access_log: AccessLogger, handler: ListHandler):
+    access_log.log(
+        'batch', constants.OK, {'request_id': '1'}, b'[]', b'{}', 0.0015
+    )
+    access_log.stop()
+    assert len(handler.lines) == 1
+    line = handler.lines[0]
+    assert line['request_id'] == '1'
+    assert line['route'] == 'batch'
+    assert line['code'] == constants.OK
+    assert line['duration_ms'] == 1.5
+    assert line['request'] == '[]'
+    assert 'truncated' not in line
+    assert threading.get_ident() not in handler.threads
+
+
+def test_log_truncates_payload(
+    access_log: AccessLogger,
+    handler: ListHandler
+):
+    access_log.log(
+        'method', constants.INTERNAL_ERROR, {}, b'0123456789', None, 0
+    )
+    access_log.stop()
+    line = handler.lines[0]
+    assert line['request'] == '01234567'
+    assert line['truncated'] is True
+    assert 'response' not in line
+
+
+def test_not_sampled_request_is_skipped(
+    access_log: AccessLogger,
+    handler: ListHandler
+):
+    access_log.log('method', constants.OK, {}, b'{}', b'{}', 0)
+    access_log.stop()
+    assert handler.lines == []
+
+
+def test_full_queue_drops_records(handler: ListHandler):
+    access_logger = AccessLogger()
+    access_logger.configure(handler=handler, queue_size=1)
+    blocker = threading.Event()
+    original_emit = handler.emit
+
+    def slow_emit(record: logging.LogRecord) -> None:
+        blocker.wait(5)
+        original_emit(record)
+
+    handler.emit = slow_emit
+    for _ in range(10):
+        access_logger.log('method', constants.OK, {}, None, None, 0)
+    assert access_logger.dropped > 0
+    blocker.set()
+    access_logger.stop()
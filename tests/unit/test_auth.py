@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from scoring_api.api import constants
+from scoring_api.api.api import MethodRequest
+from scoring_api.api.handler import admin_tokens, check_auth
+
+
+def admin_token(hour: datetime) -> str:
+    return hashlib.sha512(
+        (hour.strftime('%Y%m%d%H') + constants.ADMIN_SALT).encode()
+    ).hexdigest()
+
+
+def user_request(token: str) -> MethodRequest:
+    return MethodRequest(
+        account='horns&hoofs', login='h&f', token=token,
+        arguments={}, method='online_score'
+    )
+
+
+@pytest.fixture
+def hour() -> datetime:
+    return datetime(2024, 1, 1, 12)
+
+
+def test_admin_tokens_in_the_middle_of_hour(hour: datetime):
+    now = hour + timedelta(minutes=30)
+    valid_until, tokens = admin_tokens(now.timestamp())
+    assert tokens == {admin_token(hour)}
+    assert valid_until == (
+        hour + timedelta(hours=1, seconds=-constants.ADMIN_TOKEN_GRACE_SEC)
+    ).timestamp()
+
+
+def test_admin_tokens_after_hour_boundary(hour: datetime):
+    _, tokens = admin_tokens((hour + timedelta(seconds=1)).timestamp())
+    assert tokens == {admin_token(hour), admin_token(hour - timedelta(hours=1))}
+
+
+def test_admin_tokens_before_hour_boundary(hour: datetime):
+    now = hour + timedelta(hours=1, seconds=-1)
+    valid_until, tokens = admin_tokens(now.timestamp())
+    assert tokens == {admin_token(hour), admin_token(hour + timedelta(hours=1))}
+    assert valid_until == (hour + timedelta(hours=1)).timestamp()
+
+
+def test_check_admin_auth():
+    request = MethodRequest(
+        account='', login=constants.ADMIN_LOGIN,
+        token=admin_token(datetime.now()), arguments={}, method='online_score'
+    )
+    assert check_auth(request)
+    request = MethodRequest(
+        account='', login=constants.ADMIN_LOGIN,
+        token='invalid', arguments={}, method='online_score'
+    )
+    assert not check_auth(request)
+
+
+def test_check_user_auth_is_cached(monkeypatch):
+    token = hashlib.sha512(
+        ('horns&hoofs' + 'h&f' + constants.SALT).encode()
+    ).hexdigest()
+    assert check_auth(user_request(token))
+
+    def sha512(*args, **kwargs):
+        raise AssertionError('digest should not be calculated')
+
+    monkeypatch.setattr(hashlib, 'sha512', sha512)
+    assert check_auth(user_request(token))
+
+
+def test_check_user_auth_invalid_token():
+    assert not check_auth(user_request('invalid'))
+    assert not check_auth(user_request('invalid'))
@@ -0,0 +1,65 @@
+import pytest
+
+from benchmarks.runner import (
+    IMPROVEMENT,
+    REGRESSION,
+    _percentile,
+    compare_results,
+)
+
+
+@pytest.mark.parametrize('percent, expected', [
+    (0, 10.),
+    (25, 17.5),
+    (50, 25.),
+    (90, 37.),
+    (100, 40.),
+])
+def test_percentile_interpolation(percent: float, expected: float):
+    assert _percentile([10., 20., 30., 40.], percent) == pytest.approx(
+        expected
+    )
+
+
+def test_percentile_of_single_sample():
+    assert _percentile([7.], 0) == 7.
+    assert _percentile([7.], 99) == 7.
+
+
+def _results(**ops_per_sec: float) -> dict:
+    return dict(
+        meta={},
+        results={
+            name: dict(ops_per_sec=ops) for name, ops in ops_per_sec.items()
+        }
+    )
+
+
+def test_compare_results_thresholds():
+    baseline = _results(
+        slower=1000, faster=1000, same=1000, border=1000, removed=1000
+    )
+    results = _results(
+        slower=850, faster=1200, same=950, border=900, added=1000
+    )
+    comparison = {
+        name: (change, verdict)
+        for name, change, verdict in compare_results(results, baseline, 0.1)
+    }
+    assert comparison.keys() == {'slower', 'faster', 'same', 'border'}
+    assert comparison['slower'] == (pytest.approx(-0.15), REGRESSION)
+    assert comparison['faster'] == (pytest.approx(0.2), IMPROVEMENT)
+    assert comparison['same'] == (pytest.approx(-0.05), None)
+    # change equal to threshold is not reported
+    assert comparison['border'] == (pytest.approx(-0.1), None)
+
+
+def test_compare_results_custom_threshold():
+    comparison = compare_results(
+        _results(case=940), _results(case=1000), threshold=0.05
+    )
+    assert comparison == [('case', pytest.approx(-0.06), REGRESSION)]
+
+
+def test_compare_results_without_common_cases():
+    assert compare_results(_results(a=1), _results(b=1)) == []
@@ -0,0 +1,31 @@
+import pytest
+
+from scoring_api.api import constants
+from scoring_api.api.handler import BodyLimits
+
+
+@pytest.mark.parametrize('content_length,transfer_encoding,expected', [
+    ('10', None, (10, constants.OK)),
+    (' 0 ', None, (0, constants.OK)),
+    ('100', None, (100, constants.OK)),
+    ('101', None, (101, constants.PAYLOAD_TOO_LARGE)),
+    (None, None, (0, constants.LENGTH_REQUIRED)),
+    ('10', 'chunked', (0, constants.LENGTH_REQUIRED)),
+    ('10', 'identity', (10, constants.OK)),
+    ('ten', None, (0, constants.BAD_REQUEST)),
+    ('-1', None, (0, constants.BAD_REQUEST)),
+    ('1_0', None, (0, constants.BAD_REQUEST)),
+    ('١', None, (0, constants.BAD_REQUEST)),
+])
+def test_check(content_length, transfer_encoding, expected):
+    limits = BodyLimits(max_bytes=100)
+    assert limits.check('method', content_length, transfer_encoding) == (
+        expected
+    )
+
+
+def test_route_limits():
+    limits = BodyLimits(max_bytes=100, route_max_bytes={'batch': 1000})
+    assert limits.check('batch', '1000') == (1000, constants.OK)
+    assert limits.check('batch', '1001')[1] == constants.PAYLOAD_TOO_LARGE
+    assert limits.check('method', '1000')[1] == constants.PAYLOAD_TOO_LARGE
@@ -0,0 +1,90 @@
+import pytest
+
+from scoring_api.api import breaker as breaker_module
+from scoring_api.api.breaker import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    fake_clock = Clock()
+    monkeypatch.setattr(breaker_module.time, 'monotonic', fake_clock)
+    return fake_clock
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_invalid_failure_threshold():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def test_opens_after_consecutive_failures(clock: Clock):
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_slow_calls_are_failures(clock: Clock):
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_sec=0.1)
+    breaker.record_success(0.05)
+    breaker.record_success(0.5)
+    breaker.record_success(0.5)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_closes_breaker(clock: Clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_sec=5)
+    open_breaker(breaker)
+    clock.now += 4.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # only a single probe is let through
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_breaker(clock: Clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_sec=5)
+    open_breaker(breaker)
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 4
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_released_probe_lets_next_probe_through(clock: Clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_sec=5.)
+    open_breaker(breaker)
+    clock.now += 5
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
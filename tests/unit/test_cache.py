@@ -0,0 +1,306 @@
+import json
+import threading
+import time
+
+import pytest
+
+from scoring_api.api.api import MISSING
+from scoring_api.api.cache import LocalCache
+from scoring_api.api.metrics import REGISTRY
+from scoring_api.api.scoring import (
+    decode_interests,
+    get_interests,
+    get_interests_many,
+)
+from scoring_api.api.store import (
+    STORE,
+    BatchStore,
+    KeyCacheStore,
+    KeyValueStore,
+    LocalCacheStore,
+    MemoryStorage,
+    WriteBehindStore,
+    get_store,
+)
+
+
+def test_invalid_max_entries():
+    with pytest.raises(ValueError):
+        LocalCache(max_entries=0)
+
+
+def test_get_missing_key():
+    cache = LocalCache(max_entries=2)
+    assert cache.get('key') is MISSING
+    assert cache.stats()['misses'] == 1
+
+
+def test_set_and_get():
+    cache = LocalCache(max_entries=2)
+    cache.set('key', 1.5, 10)
+    assert cache.get('key') == 1.5
+    assert cache.stats()['hits'] == 1
+
+
+def test_expired_key():
+    cache = LocalCache(max_entries=2)
+    cache.set('key', 1.5, 0.01)
+    time.sleep(0.02)
+    assert cache.get('key') is MISSING
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = LocalCache(max_entries=2)
+    cache.set('a', 1, 10)
+    cache.set('b', 2, 10)
+    cache.get('a')
+    cache.set('c', 3, 10)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_bytes_eviction():
+    cache = LocalCache(max_entries=100, max_bytes=200)
+    for i in range(10):
+        cache.set(f'key{i}', 'x' * 50, 10)
+    stats = cache.stats()
+    assert stats['bytes'] <= 200
+    assert stats['evictions'] > 0
+
+
+def test_local_cache_store_serves_cache_locally(
+    store_with_presets: KeyValueStore,
+    monkeypatch
+):
+    store = LocalCacheStore(store_with_presets, max_entries=10)
+    assert store.cache_get('uid:0') == '666'
+
+    def cache_get_fails(*args, **kwargs):
+        raise AssertionError('wrapped store should not be called')
+
+    monkeypatch.setattr(store_with_presets, 'cache_get', cache_get_fails)
+    assert store.cache_get('uid:0') == '666'
+    store.cache_set('uid:2', 1.5, 10)
+    assert store.cache_get('uid:2') == 1.5
+    assert store.cache_stats()['scores']['hits'] == 2
+
+
+def test_local_cache_store_set_invalidates(store_with_presets: KeyValueStore):
+    store = LocalCacheStore(store_with_presets, max_entries=10)
+    assert store.cache_get('uid:0') == '666'
+    store.set('uid:0', '999')
+    assert store.cache_get('uid:0') == '999'
+
+
+class WatchedStore(MemoryStorage):
+    """Memory store notifying about changes like redis keyspace events"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.on_change = self.on_reset = None
+
+    def get_many(self, keys: list[str]) -> list:
+        self.reads += 1
+        return super().get_many(keys)
+
+    def watch(self, prefix, on_change, on_reset) -> bool:
+        self.on_change, self.on_reset = on_change, on_reset
+        return True
+
+
+def test_key_cache_store_serves_decoded_values_locally():
+    store = WatchedStore()
+    store.set('i:1', json.dumps(['a']))
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    for _ in range(3):
+        assert get_interests_many(cached, [1, 2]) == {1: ['a'], 2: []}
+    assert store.reads == 1
+    assert cached.cache_stats()['interests']['hits'] == 4
+
+
+def test_key_cache_store_skips_other_keys():
+    store = WatchedStore()
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    for _ in range(2):
+        assert cached.get_many_decoded(['uid:1'], str) == ['None']
+    assert store.reads == 2
+
+
+def test_key_cache_store_invalidated_on_change():
+    store = WatchedStore()
+    store.set('i:1', json.dumps(['a']))
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    assert get_interests(cached, 1) == ['a']
+    # changed by another client
+    store.set('i:1', json.dumps(['b']))
+    assert get_interests(cached, 1) == ['a']
+    store.on_change('i:1')
+    assert get_interests(cached, 1) == ['b']
+    cached.set('i:1', json.dumps(['c']))
+    assert get_interests(cached, 1) == ['c']
+
+
+def test_key_cache_store_cleared_on_reset():
+    store = WatchedStore()
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    get_interests_many(cached, [1, 2])
+    store.on_reset()
+    assert cached.cache_stats()['interests']['entries'] == 0
+
+
+def test_key_cache_store_does_not_cache_values_read_before_change():
+    store = WatchedStore()
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    get_many = store.get_many
+
+    def get_many_changed_meanwhile(keys: list[str]) -> list:
+        result = get_many(keys)
+        store.on_change('i:1')
+        return result
+
+    store.get_many = get_many_changed_meanwhile
+    get_interests(cached, 1)
+    assert cached.cache_stats()['interests']['entries'] == 0
+
+
+def test_key_cache_store_fallback_ttl():
+    store = MemoryStorage()
+    cached = KeyCacheStore(
+        store, prefix='i:', max_entries=10, fallback_ttl_sec=0.01
+    )
+    store.set('i:1', json.dumps(['a']))
+    assert get_interests(cached, 1) == ['a']
+    store.set('i:1', json.dumps(['b']))
+    time.sleep(0.02)
+    assert get_interests(cached, 1) == ['b']
+
+
+class _SlowStorage(MemoryStorage):
+    """Memory storage recording bulk cache writes, blocked until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+        self.batches = []
+
+    def cache_set_many(self, mapping: dict, ttl: int | float) -> None:
+        self.released.wait(5)
+        self.batches.append(dict(mapping))
+        super().cache_set_many(mapping, ttl)
+
+
+def test_write_behind_store_writes_in_background():
+    store = _SlowStorage()
+    cached = WriteBehindStore(store, queue_size=100, batch_size=10)
+    for i in range(25):
+        cached.cache_set(f'uid:{i}', float(i), 60)
+    assert store.cache_get('uid:24') is None
+    store.released.set()
+    cached.join()
+    assert cached.cache_get_many(['uid:0', 'uid:24']) == ['0.0', '24.0']
+    assert all(len(batch) <= 10 for batch in store.batches)
+    assert len(store.batches) < 25
+    assert cached.write_behind_stats() == dict(depth=0, dropped=0)
+    cached.close()
+
+
+def test_write_behind_store_drops_values_when_queue_is_full():
+    store = _SlowStorage()
+    cached = WriteBehindStore(store, queue_size=2, batch_size=1)
+    cached.cache_set('uid:0', 1., 60)
+    # the worker is blocked writing the first value
+    for _ in range(100):
+        if not cached.write_behind_stats()['depth']:
+            break
+        time.sleep(0.01)
+    for i in range(1, 5):
+        cached.cache_set(f'uid:{i}', 1., 60)
+    assert cached.write_behind_stats() == dict(depth=2, dropped=2)
+    store.released.set()
+    cached.close()
+    assert store.cache_get_many([f'uid:{i}' for i in range(5)]) == [
+        '1.0', '1.0', '1.0', None, None
+    ]
+
+
+def test_write_behind_store_batch_goes_through_queue():
+    store = _SlowStorage()
+    store.released.set()
+    cached = WriteBehindStore(store, queue_size=100)
+    batch = BatchStore(cached)
+    batch.cache_set('uid:1', 2., 60)
+    batch.commit()
+    cached.close()
+    assert store.cache_get('uid:1') == '2.0'
+
+
+def test_get_store_with_write_behind():
+    store = get_store(write_behind_queue_size=10, local_cache_size=10)
+    assert store.write_behind_stats() == dict(depth=0, dropped=0)
+    assert get_store().write_behind_stats() is None
+
+
+def test_key_cache_store_does_not_cache_values_changed_while_caching():
+    store = WatchedStore()
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    cache_set = cached._cache.set
+    watcher = threading.Thread(target=store.on_change, args=('i:1',))
+
+    def set_changed_meanwhile(*args) -> None:
+        # change notification arrives between version check and caching
+        watcher.start()
+        watcher.join(0.1)
+        cache_set(*args)
+
+    cached._cache.set = set_changed_meanwhile
+    get_interests(cached, 1)
+    watcher.join(5)
+    assert cached.cache_stats()['interests']['entries'] == 0
+
+
+def test_batch_store_prefetches_through_key_cache_store():
+    store = WatchedStore()
+    store.set('i:1', json.dumps(['a']))
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    for _ in range(2):
+        batch = BatchStore(cached)
+        batch.prefetch(['i:1', 'i:2'], [], decode_interests)
+        assert get_interests_many(batch, [1, 2]) == {1: ['a'], 2: []}
+    stats = cached.cache_stats()['interests']
+    assert (stats['misses'], stats['hits']) == (2, 2)
+
+
+def test_get_store_reports_both_local_caches():
+    store = get_store(local_cache_size=10, interests_cache_size=10)
+    store.cache_get('uid:missing')
+    get_interests(store, 1)
+    stats = store.cache_stats()
+    assert sorted(stats) == ['interests', 'scores']
+    assert stats['scores']['misses'] == 1
+    assert stats['interests']['misses'] == 1
+    store.close()
+    assert get_store().cache_stats() == {}
+
+
+def test_local_caches_are_exported_to_metrics():
+    STORE.configure(local_cache_size=10, interests_cache_size=10)
+    try:
+        store = STORE.get()
+        store.cache_get('uid:missing')
+        get_interests(store, 1)
+        get_interests(store, 1)
+        lines = REGISTRY.render().splitlines()
+    finally:
+        STORE.close()
+        STORE.configure()
+    assert (
+        'scoring_local_cache_lookups_total{cache="scores",result="miss"} 1'
+    ) in lines
+    assert (
+        'scoring_local_cache_lookups_total{cache="interests",result="hit"} 1'
+    ) in lines
+    assert 'scoring_local_cache_entries{cache="interests"} 1' in lines
@@ -0,0 +1,61 @@
+import pytest
+
+from scoring_api.api import codec
+
+pytestmark = pytest.mark.usefixtures('codec_backend')
+
+
+@pytest.mark.parametrize('data', [
+    b'{"account": "horns&hoofs", "arguments": {"client_ids": [1, 2]}}',
+    '{"a": null, "b": 1.5}',
+    b'[]',
+])
+def test_loads(data: bytes | str):
+    assert isinstance(codec.loads(data), (dict, list))
+
+
+@pytest.mark.parametrize('data', [
+    b'not a json', b'{', '', b'[NaN]', b'[Infinity]', b'[-Infinity]',
+    b'[1e400]', b'[' + b'1' * 400 + b']',
+])
+def test_loads_invalid(data: bytes | str):
+    with pytest.raises(ValueError):
+        codec.loads(data)
+
+
+@pytest.mark.parametrize('data,expected', [
+    (b'[18446744073709551615]', 2 ** 64 - 1),
+    (b'[-9223372036854775808]', -2 ** 63),
+    (b'[18446744073709551616]', float(2 ** 64)),
+    (b'[-9223372036854775809]', float(-2 ** 63 - 1)),
+])
+def test_loads_large_integers(data: bytes, expected: int | float):
+    [value] = codec.loads(data)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+def test_dumps_returns_bytes():
+    assert codec.loads(codec.dumps({'score': 1.5})) == {'score': 1.5}
+
+
+def test_dumps_non_string_keys():
+    data = {1: ['a', 'b'], 2: []}
+    assert codec.loads(codec.dumps(data)) == {'1': ['a', 'b'], '2': []}
+
+
+def test_dumps_non_finite_floats():
+    data = {'a': float('nan'), 'b': [float('inf'), -float('inf'), 1.5]}
+    assert codec.loads(codec.dumps(data)) == {'a': None, 'b': [None, None, 1.5]}
+
+
+def test_dumps_large_integers():
+    data = {'a': 2 ** 64, 'b': -2 ** 70}
+    assert codec.dumps(data).replace(b' ', b'') == (
+        b'{"a":18446744073709551616,"b":-1180591620717411303424}'
+    )
+
+
+def test_dumps_not_serializable():
+    with pytest.raises(TypeError):
+        codec.dumps({'a': object()})
@@ -0,0 +1,81 @@
+import json
+from typing import Generator
+
+import pytest
+
+from scoring_api.api.interests_format import (
+    DICTIONARY_KEY,
+    INTERESTS_DICTIONARY,
+    InterestsDictionary,
+    UnknownInterestError,
+    is_compact,
+)
+from scoring_api.api.scoring import decode_interests, get_interests_many
+from scoring_api.api.store import KeyCacheStore, MemoryStorage
+
+
+@pytest.fixture(autouse=True)
+def clear_dictionary() -> Generator[None, None, None]:
+    INTERESTS_DICTIONARY.clear()
+    yield
+    INTERESTS_DICTIONARY.clear()
+
+
+def test_encode_interns_names():
+    dictionary = InterestsDictionary()
+    assert dictionary.encode(['books', 'music']) == ('v2:0,1', True)
+    assert dictionary.encode(['music', 'books']) == ('v2:1,0', False)
+    assert dictionary.encode(['travel']) == ('v2:2', True)
+    assert dictionary.encode([]) == ('v2:', False)
+    assert len(dictionary) == 3
+
+
+def test_encoded_interests_are_decoded():
+    dictionary = InterestsDictionary()
+    for interests in (['books', 'music'], [], ['music']):
+        encoded, _ = dictionary.encode(interests)
+        assert is_compact(encoded)
+        assert dictionary.decode(encoded) == interests
+
+
+def test_dictionary_is_loaded_from_dump():
+    dictionary = InterestsDictionary()
+    encoded, _ = dictionary.encode(['books', 'music'])
+    loaded = InterestsDictionary()
+    with pytest.raises(UnknownInterestError):
+        loaded.decode(encoded)
+    loaded.load(dictionary.dump())
+    assert loaded.decode(encoded) == ['books', 'music']
+
+
+@pytest.mark.parametrize('raw,expected', [
+    (None, []),
+    ('', []),
+    ('["a", "b"]', ['a', 'b']),
+    ('v2:', []),
+])
+def test_decode_interests_formats(raw, expected):
+    assert decode_interests(raw) == expected
+
+
+def test_decode_interests_reloads_dictionary():
+    store = MemoryStorage()
+    dictionary = InterestsDictionary()
+    encoded, _ = dictionary.encode(['books', 'music'])
+    store.set(DICTIONARY_KEY, dictionary.dump())
+    with pytest.raises(UnknownInterestError):
+        decode_interests(encoded)
+    assert decode_interests(encoded, store) == ['books', 'music']
+    assert decode_interests(encoded) == ['books', 'music']
+
+
+def test_get_interests_many_reads_both_formats():
+    store = MemoryStorage()
+    dictionary = InterestsDictionary()
+    store.set('i:1', json.dumps(['books']))
+    store.set('i:2', dictionary.encode(['music', 'books'])[0])
+    store.set(DICTIONARY_KEY, dictionary.dump())
+    expected = {1: ['books'], 2: ['music', 'books'], 3: []}
+    assert get_interests_many(store, [1, 2, 3]) == expected
+    cached = KeyCacheStore(store, prefix='i:', max_entries=10)
+    assert get_interests_many(cached, [1, 2, 3]) == expected
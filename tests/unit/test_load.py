@@ -0,0 +1,134 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.load import LatencyHistogram, Request, read_requests, sign
+from scoring_api.api.api import MethodRequest
+from scoring_api.api.handler import check_auth
+
+EXACT_LIMIT_US = 2 * LatencyHistogram.SUB_BUCKETS
+
+
+def test_histogram_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(EXACT_LIMIT_US):
+        assert histogram._value(histogram._index(value)) == value
+
+
+@pytest.mark.parametrize('start', [EXACT_LIMIT_US, 10 ** 4, 10 ** 6, 10 ** 9])
+def test_histogram_large_values_relative_error(start: int):
+    histogram = LatencyHistogram()
+    for value in range(start, start + 5000):
+        bucket_value = histogram._value(histogram._index(value))
+        assert value <= bucket_value <= value * 1.01
+
+
+def test_histogram_buckets_are_ordered():
+    histogram = LatencyHistogram()
+    indexes = [histogram._index(value) for value in range(10 ** 5)]
+    assert indexes == sorted(indexes)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.min_us == 1000
+    assert histogram.max_us == 100000
+    assert histogram.mean() == pytest.approx(0.0505, rel=1e-3)
+    assert histogram.percentile(50) == pytest.approx(0.05, rel=0.01)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.01)
+    # never above the recorded maximum
+    assert histogram.percentile(100) == 0.1
+    assert histogram.percentile(0) == pytest.approx(0.001, rel=0.01)
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.
+    assert histogram.mean() == 0.
+
+
+def test_histogram_merge():
+    first, second, combined = (
+        LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    )
+    for us in (5, 300, 7000):
+        first.record(us / 1e6)
+        combined.record(us / 1e6)
+    for us in (2, 90000):
+        second.record(us / 1e6)
+        combined.record(us / 1e6)
+    first.merge(second)
+    first.merge(LatencyHistogram())
+    assert first.counts == combined.counts
+    assert (first.count, first.total_us) == (
+        combined.count, combined.total_us
+    )
+    assert (first.min_us, first.max_us) == (combined.min_us, combined.max_us)
+
+
+def test_merge_into_empty_histogram():
+    histogram, other = LatencyHistogram(), LatencyHistogram()
+    other.record(0.002)
+    histogram.merge(other)
+    assert (histogram.min_us, histogram.max_us) == (other.min_us, 2000)
+
+
+@pytest.mark.parametrize('request_dict', [
+    {'account': 'horns&hoofs', 'login': 'h&f', 'method': 'online_score',
+     'arguments': {}, 'token': 'stale'},
+    {'account': 'horns&hoofs', 'login': 'admin', 'method': 'online_score',
+     'arguments': {}},
+    {'account': '', 'login': 'h&f', 'method': 'online_score',
+     'arguments': {}},
+])
+def test_signed_requests_pass_auth(request_dict: dict):
+    signed = sign(request_dict, time.time())
+    assert signed is not request_dict
+    assert check_auth(MethodRequest(**signed))
+
+
+def test_sign_skips_requests_without_login():
+    request = {'method': 'online_score'}
+    assert sign(request, time.time()) is request
+
+
+def test_request_encode_signs_batch_items():
+    request = Request('batch', [
+        {'account': 'a', 'login': 'b', 'method': 'online_score',
+         'arguments': {}},
+        'not a request',
+    ])
+    assert request.method == 'batch'
+    item, other = json.loads(request.encode(time.time()))
+    assert check_auth(MethodRequest(**item))
+    assert other == 'not a request'
+
+
+def test_read_requests():
+    body = {'login': 'h&f', 'method': 'online_score'}
+    entry = {
+        'route': 'method',
+        'request': json.dumps({'login': 'h&f', 'method': 'clients_interests'})
+    }
+    lines = [
+        json.dumps(body),
+        '',
+        'not a json',
+        json.dumps(entry).encode(),
+        json.dumps(dict(entry, truncated=True)),
+        json.dumps(dict(entry, request='')),
+        json.dumps(dict(entry, request='{"broken')),
+        json.dumps({'route': 'batch', 'request': json.dumps([body])}),
+    ]
+    requests = list(read_requests(lines))
+    assert [(r.route, r.method) for r in requests] == [
+        ('method', 'online_score'),
+        ('method', 'clients_interests'),
+        ('batch', 'batch'),
+    ]
+    assert requests[0].body == body
+    assert requests[2].body == [body]
@@ -0,0 +1,183 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scoring_api.api import store as store_module
+from scoring_api.api.store import LazyStore, MemoryStorage, get_store
+
+
+def test_get_store_memory_backend():
+    assert isinstance(get_store(backend='memory'), MemoryStorage)
+
+
+def test_get_store_unknown_backend():
+    with pytest.raises(ValueError):
+        get_store(backend='unknown')
+
+
+def test_lazy_store_is_created_once():
+    lazy_store = LazyStore()
+    lazy_store.configure(backend='memory')
+    assert lazy_store.pool_stats() is None
+    store = lazy_store.get()
+    assert isinstance(store, MemoryStorage)
+    assert lazy_store.get() is store
+    assert lazy_store.pool_stats() is None
+
+
+def test_lazy_store_is_recreated_on_configure():
+    lazy_store = LazyStore()
+    lazy_store.configure(backend='memory')
+    store = lazy_store.get()
+    lazy_store.configure(backend='memory')
+    assert lazy_store.get() is not store
+
+
+def test_lazy_store_close(monkeypatch):
+    lazy_store = LazyStore()
+    lazy_store.configure(backend='memory')
+    lazy_store.close()
+    store = lazy_store.get()
+    closed = []
+    monkeypatch.setattr(store, 'close', lambda: closed.append(True))
+    lazy_store.close()
+    assert closed == [True]
+    assert lazy_store.get() is not store
+
+
+def test_lazy_store_is_recreated_in_forked_process(monkeypatch):
+    lazy_store = LazyStore()
+    lazy_store.configure(backend='memory')
+    store = lazy_store.get()
+    monkeypatch.setattr(store_module.os, 'getpid', lambda: -1)
+    assert lazy_store.pool_stats() is None
+    assert lazy_store.get() is not store
+
+
+def test_invalid_max_keys():
+    with pytest.raises(ValueError):
+        MemoryStorage(max_keys=0)
+
+
+def test_invalid_max_bytes():
+    with pytest.raises(ValueError):
+        MemoryStorage(max_bytes=0)
+
+
+def test_get_store_memory_bounds():
+    store = get_store(backend='memory', memory_max_keys=1, memory_max_bytes=1)
+    store.set('key', '1')
+    assert len(store) == 0
+
+
+def test_get_non_existing_key():
+    assert MemoryStorage().get('key') is None
+
+
+def test_set_and_get():
+    store = MemoryStorage()
+    store.set('key', '123')
+    assert store.get('key') == '123'
+    assert store.cache_get('key') == '123'
+
+
+def test_numbers_are_stored_as_strings():
+    store = MemoryStorage()
+    store.cache_set('key', 1.5, 10)
+    assert store.cache_get('key') == '1.5'
+
+
+def test_cache_key_expires():
+    store = MemoryStorage()
+    store.cache_set('key', '123', 0.01)
+    assert store.cache_get('key') == '123'
+    time.sleep(0.02)
+    assert store.cache_get('key') is None
+    assert len(store) == 0
+
+
+def test_expired_keys_are_purged_on_write():
+    store = MemoryStorage()
+    for i in range(10):
+        store.cache_set(f'key{i}', i, 0.01)
+    time.sleep(0.02)
+    store.set('other', '1')
+    assert len(store) == 1
+
+
+def test_expired_keys_are_purged_on_read():
+    store = MemoryStorage()
+    for i in range(10):
+        store.cache_set(f'key{i}', i, 0.01)
+    time.sleep(0.02)
+    assert store.get('other') is None
+    assert len(store) == 0
+    assert store.bytes == 0
+
+
+def test_set_removes_ttl():
+    store = MemoryStorage()
+    store.cache_set('key', '1', 0.01)
+    store.set('key', '2')
+    time.sleep(0.02)
+    assert store.get('key') == '2'
+
+
+def test_least_recently_written_key_is_evicted():
+    store = MemoryStorage(max_keys=2)
+    store.set('a', '1')
+    store.set('b', '2')
+    store.set('a', '3')
+    store.set('c', '4')
+    assert store.get_many(['a', 'b', 'c']) == ['3', None, '4']
+
+
+def test_store_is_bounded_by_bytes():
+    value = 'x' * 1000
+    store = MemoryStorage(max_bytes=3500)
+    for key in 'abcde':
+        store.set(key, value)
+    assert store.get_many(list('abcde')) == [None, None, value, value, value]
+    assert store.bytes <= 3500
+    store.set('c', 'small')
+    assert store.bytes < 3000
+    store.flush()
+    assert store.bytes == 0
+
+
+def test_value_larger_than_max_bytes_is_not_kept():
+    store = MemoryStorage(max_bytes=100)
+    store.cache_set('key', 'x' * 1000, 10)
+    assert store.get('key') is None
+    assert len(store) == 0
+    assert store.bytes == 0
+
+
+def test_many():
+    store = MemoryStorage()
+    store.set_many({'a': '1', 'b': '2'})
+    store.cache_set_many({'c': '3'}, 10)
+    assert store.get_many(['a', 'b', 'c', 'd']) == ['1', '2', '3', None]
+    assert store.cache_get_many(['c', 'd']) == ['3', None]
+
+
+def test_flush():
+    store = MemoryStorage()
+    store.set('a', '1')
+    store.cache_set('b', '2', 10)
+    store.flush()
+    assert len(store) == 0
+
+
+def test_concurrent_access():
+    store = MemoryStorage(max_keys=100)
+
+    def write(i: int) -> None:
+        for j in range(100):
+            store.cache_set(f'{i}:{j}', j, 10)
+            store.get(f'{i}:{j}')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(8)))
+    assert len(store) == 100
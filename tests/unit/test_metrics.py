@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+
+from scoring_api.api.metrics import (
+    ComputedCounter,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+
+def test_counter_merges_threads():
+    counter = Counter('test_total', 'test', labelnames=('result',))
+
+    def record() -> None:
+        for _ in range(1000):
+            counter.inc('hit')
+        counter.inc('miss', amount=2)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.values() == {('hit',): 4000, ('miss',): 8}
+
+
+def test_histogram_buckets():
+    histogram = Histogram('test_seconds', 'test', buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    counts, total = histogram.values()[()]
+    assert counts == [2, 1, 1]
+    assert total == 14.5
+
+
+def test_render_prometheus_format():
+    registry = Registry()
+    counter = registry.register(
+        Counter('test_total', 'Test counter', labelnames=('code',))
+    )
+    histogram = registry.register(
+        Histogram('test_seconds', 'Test histogram', buckets=(1,))
+    )
+    registry.register(Gauge('test_ratio', 'Test gauge', lambda: 0.5))
+    counter.inc(200)
+    histogram.observe(2)
+    assert registry.render().splitlines() == [
+        '# HELP test_total Test counter',
+        '# TYPE test_total counter',
+        'test_total{code="200"} 1',
+        '# HELP test_seconds Test histogram',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{le="1"} 0',
+        'test_seconds_bucket{le="+Inf"} 1',
+        'test_seconds_sum 2',
+        'test_seconds_count 1',
+        '# HELP test_ratio Test gauge',
+        '# TYPE test_ratio gauge',
+        'test_ratio 0.5',
+    ]
+
+
+def test_shared_metrics_are_merged(tmp_path):
+    registry = Registry()
+    counter = registry.register(
+        Counter('test_total', 'Test counter', labelnames=('code',))
+    )
+    histogram = registry.register(
+        Histogram('test_seconds', 'Test histogram', buckets=(1,))
+    )
+    registry.register(Gauge('test_ratio', 'Test gauge', lambda: 0.5))
+    registry.share(str(tmp_path), interval_sec=None)
+    counter.inc(200)
+    histogram.observe(2)
+    # snapshot of another worker
+    (tmp_path / '1.json').write_text(json.dumps({
+        'test_total': [[[200], 2], [[500], 1]],
+        'test_seconds': [[[], [[1, 0], 0.5]]],
+        'test_ratio': [[[], 0.25]],
+    }))
+    samples = [
+        line for line in registry.render().splitlines()
+        if not line.startswith('#')
+    ]
+    assert samples == [
+        'test_total{code="200"} 3',
+        'test_total{code="500"} 1',
+        'test_seconds_bucket{le="1"} 1',
+        'test_seconds_bucket{le="+Inf"} 2',
+        'test_seconds_sum 2.5',
+        'test_seconds_count 2',
+        'test_ratio{worker="1"} 0.25',
+        f'test_ratio{{worker="{os.getpid()}"}} 0.5',
+    ]
+
+    registry.retire(str(tmp_path), 1)
+    assert not (tmp_path / '1.json').exists()
+    samples = [
+        line for line in registry.render().splitlines()
+        if line.startswith('test_total') or line.startswith('test_ratio')
+    ]
+    # counters of exited worker are kept, gauges are dropped
+    assert samples == [
+        'test_total{code="200"} 3',
+        'test_total{code="500"} 1',
+        f'test_ratio{{worker="{os.getpid()}"}} 0.5',
+    ]
+
+
+def test_computed_metrics_with_labels(tmp_path):
+    registry = Registry()
+    registry.register(ComputedCounter(
+        'test_total', 'Test counter', lambda: {('a',): 2},
+        labelnames=('cache',)
+    ))
+    registry.register(Gauge(
+        'test_entries', 'Test gauge', lambda: {('a',): 1},
+        labelnames=('cache',)
+    ))
+    assert registry.render().splitlines() == [
+        '# HELP test_total Test counter',
+        '# TYPE test_total counter',
+        'test_total{cache="a"} 2',
+        '# HELP test_entries Test gauge',
+        '# TYPE test_entries gauge',
+        'test_entries{cache="a"} 1',
+    ]
+    registry.share(str(tmp_path), interval_sec=None)
+    (tmp_path / '1.json').write_text(json.dumps({
+        'test_total': [[['a'], 3]],
+        'test_entries': [[['a'], 5]],
+    }))
+    samples = [
+        line for line in registry.render().splitlines()
+        if not line.startswith('#')
+    ]
+    assert samples == [
+        'test_total{cache="a"} 5',
+        'test_entries{worker="1",cache="a"} 5',
+        f'test_entries{{worker="{os.getpid()}",cache="a"}} 1',
+    ]
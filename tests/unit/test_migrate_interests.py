@@ -0,0 +1,92 @@
+import json
+from typing import Generator
+
+import pytest
+
+from scoring_api.api.interests_format import (
+    DICTIONARY_KEY,
+    INTERESTS_DICTIONARY,
+    is_compact,
+)
+from scoring_api.api.scoring import get_interests_many
+from scoring_api.api.store import KeyValueStore, MemoryStorage
+from scoring_api.migrate_interests import migrate_interests
+
+INTERESTS = {
+    cid: [f'interest_{cid % 3}', f'interest_{cid % 5}'] for cid in range(25)
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_dictionary() -> Generator[None, None, None]:
+    INTERESTS_DICTIONARY.clear()
+    yield
+    INTERESTS_DICTIONARY.clear()
+
+
+def fill(store: KeyValueStore) -> None:
+    store.set_many({
+        f'i:{cid}': json.dumps(interests)
+        for cid, interests in INTERESTS.items()
+    })
+    store.set('uid:1', '3.0')
+
+
+def test_migrate_to_compact_and_back():
+    store = MemoryStorage()
+    fill(store)
+    stats = migrate_interests(store, batch_size=10)
+    assert stats == dict(scanned=25, converted=25, skipped=0, invalid=0)
+    assert all(is_compact(store.get(f'i:{cid}')) for cid in INTERESTS)
+    assert json.loads(store.get(DICTIONARY_KEY)) == [
+        'interest_0', 'interest_1', 'interest_2', 'interest_3', 'interest_4'
+    ]
+    assert store.get('uid:1') == '3.0'
+    assert get_interests_many(store, list(INTERESTS)) == INTERESTS
+
+    stats = migrate_interests(store, target_format='json', batch_size=7)
+    assert stats['converted'] == 25
+    assert json.loads(store.get('i:7')) == INTERESTS[7]
+    assert get_interests_many(store, list(INTERESTS)) == INTERESTS
+
+
+def test_migration_is_resumable():
+    store = MemoryStorage()
+    fill(store)
+    migrate_interests(store, batch_size=10)
+    store.set('i:100', json.dumps(['interest_0', 'new']))
+    stats = migrate_interests(store, batch_size=10)
+    assert stats == dict(scanned=26, converted=1, skipped=25, invalid=0)
+    assert get_interests_many(store, [0, 100]) == {
+        0: INTERESTS[0], 100: ['interest_0', 'new']
+    }
+
+
+def test_dry_run_does_not_write():
+    store = MemoryStorage()
+    fill(store)
+    stats = migrate_interests(store, dry_run=True)
+    assert stats['converted'] == 25
+    assert store.get('i:0') == json.dumps(INTERESTS[0])
+    assert store.get(DICTIONARY_KEY) is None
+
+
+def test_invalid_interests_are_skipped():
+    store = MemoryStorage()
+    store.set('i:1', 'not json')
+    store.set('i:2', json.dumps(['a']))
+    stats = migrate_interests(store)
+    assert stats == dict(scanned=2, converted=1, skipped=0, invalid=1)
+    assert store.get('i:1') == 'not json'
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        migrate_interests(MemoryStorage(), target_format='xml')
+
+
+def test_migrate_redis_store(store: KeyValueStore):
+    fill(store)
+    stats = migrate_interests(store, batch_size=10)
+    assert stats['converted'] == 25
+    assert get_interests_many(store, list(INTERESTS)) == INTERESTS
@@ -0,0 +1,78 @@
+import os
+import pstats
+import threading
+
+import pytest
+
+from scoring_api.api.profiling import RequestProfiler
+
+
+def handler(n: int) -> int:
+    return sum(range(n))
+
+
+def test_profiler_is_disabled_by_default(tmp_path):
+    profiler = RequestProfiler()
+    assert not profiler.enabled
+    profiler.configure(directory=str(tmp_path))
+    assert not profiler.enabled
+    profiler.configure(sample_rate=1.)
+    assert not profiler.enabled
+
+
+@pytest.mark.parametrize('headers,expected', [
+    ({}, False),
+    ({'X-Profile': 'wrong'}, False),
+    ({'X-Profile': 'secret'}, True),
+])
+def test_profiler_header_token(tmp_path, headers, expected):
+    profiler = RequestProfiler()
+    profiler.configure(directory=str(tmp_path), token='secret')
+    assert profiler.enabled
+    assert profiler.should_profile(headers) == expected
+
+
+def test_profiler_sample_rate(tmp_path):
+    profiler = RequestProfiler()
+    profiler.configure(directory=str(tmp_path), sample_rate=1.)
+    assert profiler.should_profile({})
+    profiler.configure(directory=str(tmp_path), sample_rate=0.)
+    assert not profiler.should_profile({})
+
+
+def test_profiler_writes_call_stats(tmp_path):
+    profiler = RequestProfiler()
+    profiler.configure(directory=str(tmp_path), sample_rate=1.)
+    result, path = profiler.run('../req/1', handler, n=10)
+    assert result == 45
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).endswith('-.._req_1.prof')
+    stats = pstats.Stats(path)
+    assert any(func[2] == 'handler' for func in stats.stats)
+
+
+def test_profiler_writes_memory_allocations(tmp_path):
+    profiler = RequestProfiler()
+    profiler.configure(directory=str(tmp_path), sample_rate=1., memory=True)
+    _, path = profiler.run('1', lambda: [object() for _ in range(1000)])
+    assert os.path.exists(path.replace('.prof', '.mem.txt'))
+
+
+def test_profiler_skips_concurrent_requests(tmp_path):
+    profiler = RequestProfiler()
+    profiler.configure(directory=str(tmp_path), sample_rate=1.)
+    started, release = threading.Event(), threading.Event()
+
+    def slow() -> None:
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=profiler.run, args=('1', slow))
+    thread.start()
+    started.wait(5)
+    try:
+        assert profiler.run('2', handler, n=3) == (3, None)
+    finally:
+        release.set()
+        thread.join()
+    assert len(os.listdir(tmp_path)) == 1
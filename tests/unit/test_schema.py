@@ -100,3 +100,35 @@ def test_valid_schema_with_validation():
                 raise ValueError('x <= y required')
 
     TestSchema(x=10, y=20)
+
+
+def test_schema_instances_do_not_share_values():
+    class TestSchema(Schema):
+        x = Field(target_type=int, required=True, nullable=False)
+
+    first = TestSchema(x=1)
+    second = TestSchema(x=2)
+    assert first.x == 1
+    assert second.x == 2
+
+
+def test_schema_without_instance_dict():
+    class TestSchema(Schema):
+        x = Field(target_type=int, required=True, nullable=False)
+
+    instance = TestSchema(x=1)
+    with pytest.raises(AttributeError):
+        instance.y = 1
+
+
+def test_schema_inherits_fields():
+    class BaseSchema(Schema):
+        x = Field(target_type=int, required=True, nullable=False)
+
+    class TestSchema(BaseSchema):
+        y = Field(target_type=int, required=True, nullable=False)
+
+    instance = TestSchema(x=1, y=2)
+    assert (instance.x, instance.y) == (1, 2)
+    with pytest.raises(ValueError):
+        TestSchema(y=2)
@@ -0,0 +1,81 @@
+import io
+import json
+
+from scoring_api.api.scoring import get_score_key
+from scoring_api.api.store import MemoryStorage
+from scoring_api.score_file import score_batch, score_file
+
+RECORDS = [
+    dict(id='a', phone='79175002040', email='stupnikov@otus.ru'),
+    dict(first_name='a', last_name='b', gender=1, birthday='01.01.2000'),
+    dict(id=3, phone='89175002040', email='stupnikov@otus.ru'),
+    dict(id=4, first_name='a'),
+]
+
+
+def to_lines(records: list) -> list[bytes]:
+    return [json.dumps(record).encode() + b'\n' for record in records]
+
+
+def parse(output: bytes) -> list[dict]:
+    return [json.loads(line) for line in output.splitlines()]
+
+
+def test_score_batch_scores_and_caches():
+    store = MemoryStorage()
+    lines = list(enumerate(to_lines(RECORDS), start=1))
+    results = parse(score_batch(store, lines))
+    assert [result['id'] for result in results] == ['a', 2, 3, 4]
+    assert results[0] == dict(id='a', score=3.0)
+    assert results[1] == dict(id=2, score=2.0)
+    assert 'error' in results[2] and 'score' not in results[2]
+    assert 'error' in results[3]
+    key = get_score_key(phone='79175002040')
+    assert float(store.cache_get(key)) == 3.0
+
+
+def test_score_batch_uses_cached_scores():
+    store = MemoryStorage()
+    store.cache_set(get_score_key(phone='79175002040'), 10.0, 60)
+    lines = list(enumerate(to_lines(RECORDS[:1]), start=1))
+    assert parse(score_batch(store, lines)) == [dict(id='a', score=10.0)]
+
+
+def test_score_batch_reports_invalid_lines():
+    store = MemoryStorage()
+    lines = [(1, b'{not json\n'), (2, b'[1, 2]\n')]
+    results = parse(score_batch(store, lines))
+    assert [result['id'] for result in results] == [1, 2]
+    assert all('error' in result for result in results)
+
+
+def test_score_file_keeps_input_order():
+    records = [
+        dict(id=i, phone=f'7{i:010d}', email='a@b') for i in range(50)
+    ]
+    input_file = io.BytesIO(b'\n'.join(to_lines(records)))
+    output_file = io.BytesIO()
+    score_file(
+        input_file,
+        output_file,
+        store_options=dict(backend='memory'),
+        batch_size=7
+    )
+    results = parse(output_file.getvalue())
+    assert [result['id'] for result in results] == list(range(50))
+    assert all(result['score'] == 3.0 for result in results)
+
+
+def test_score_file_with_worker_processes():
+    records = [dict(phone=f'7{i:010d}', email='a@b') for i in range(20)]
+    input_file = io.BytesIO(b''.join(to_lines(records)))
+    output_file = io.BytesIO()
+    score_file(
+        input_file,
+        output_file,
+        store_options=dict(backend='memory'),
+        workers=2,
+        batch_size=3
+    )
+    results = parse(output_file.getvalue())
+    assert results == [dict(id=i, score=3.0) for i in range(1, 21)]
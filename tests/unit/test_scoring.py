@@ -0,0 +1,22 @@
+import pytest
+
+from scoring_api.api.scoring import get_interests, get_interests_many
+from scoring_api.api.store import KeyValueStore
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 1000])
+def test_get_interests_many(
+    chunk_size: int,
+    store_with_presets: KeyValueStore
+):
+    cids = [0, 1, 2, 3]
+    result = get_interests_many(store_with_presets, cids, chunk_size)
+    assert result == {
+        cid: get_interests(store_with_presets, cid) for cid in cids
+    }
+    assert result[3] == []
+
+
+def test_get_interests_many_duplicates(store_with_presets: KeyValueStore):
+    result = get_interests_many(store_with_presets, [1, 1, 2])
+    assert result == {1: ['a', 'b'], 2: ['c', 'd']}
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+from scoring_api.api.metrics import SCORE_COALESCED
+from scoring_api.api.scoring import get_score
+from scoring_api.api.singleflight import AsyncSingleFlight, SingleFlight
+from scoring_api.api.store import MemoryStorage
+
+
+def run_concurrently(func, count: int = 8) -> list:
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i: int) -> None:
+        barrier.wait()
+        results[i] = func()
+
+    threads = [
+        threading.Thread(target=run, args=(i,)) for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        time.sleep(0.2)
+        return 42
+
+    results = run_concurrently(lambda: flight.do('key', slow))
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [42] * 8
+    assert sum(coalesced for _, coalesced in results) == 7
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
+
+
+def test_exception_is_raised_to_waiters():
+    flight = SingleFlight()
+
+    def fail() -> None:
+        time.sleep(0.2)
+        raise ValueError('failed')
+
+    def call() -> Exception | None:
+        try:
+            flight.do('key', fail)
+        except ValueError as e:
+            return e
+
+    results = run_concurrently(call, count=4)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.do('key', lambda: 1) == (1, False)
+
+
+def test_async_concurrent_calls_are_coalesced():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def slow() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> list:
+        return await asyncio.gather(
+            *(flight.do('key', slow) for _ in range(8))
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [(42, False)] + [(42, True)] * 7
+
+
+def test_async_exception_is_raised_to_waiters():
+    flight = AsyncSingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0.05)
+        raise ValueError('failed')
+
+    async def run() -> list:
+        return await asyncio.gather(
+            *(flight.do('key', fail) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert not flight._calls
+
+
+def test_concurrent_score_misses_write_cache_once(monkeypatch):
+    store = MemoryStorage()
+    writes = []
+    cache_set = store.cache_set
+
+    def slow_cache_set(key, value, ttl) -> None:
+        writes.append(key)
+        time.sleep(0.2)
+        cache_set(key, value, ttl)
+
+    monkeypatch.setattr(store, 'cache_set', slow_cache_set)
+    coalesced_before = SCORE_COALESCED.values().get((), 0)
+    results = run_concurrently(
+        lambda: get_score(store, phone='79175002040', email='a@b')
+    )
+    assert results == [3.] * 8
+    assert len(writes) == 1
+    assert SCORE_COALESCED.values()[()] - coalesced_before == 7
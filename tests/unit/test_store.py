@@ -1,7 +1,7 @@
 import pytest
 import redis
 
-from scoring_api.api.store import KeyValueStore
+from scoring_api.api.store import KeyValueStore, RedisStorage
 
 
 @pytest.mark.parametrize('key,value', [
@@ -143,3 +143,107 @@ def test_get_retries_on_connection_lost(
     monkeypatch.setattr(redis.Connection, 'send_command', send_command)
     result = store_with_presets.get('uid:0')
     assert result == '666'
+
+
+def test_get_many(store_with_presets: KeyValueStore):
+    result = store_with_presets.get_many(['uid:0', 'non_existing', 'uid:1'])
+    assert result == ['666', None, '777']
+
+
+def test_get_many_empty(store: KeyValueStore):
+    assert store.get_many([]) == []
+
+
+def test_set_many(store: KeyValueStore):
+    store.set_many({'a': '1', 'b': '2'})
+    assert store.get_many(['a', 'b']) == ['1', '2']
+
+
+def test_get_many_lost_connection(
+    store_with_presets: KeyValueStore,
+    monkeypatch
+):
+    def redis_mget_with_connection_error(*args, **kwargs):
+        raise redis.exceptions.ConnectionError
+
+    monkeypatch.setattr(redis.Redis, 'mget', redis_mget_with_connection_error)
+
+    with pytest.raises(redis.exceptions.ConnectionError):
+        store_with_presets.get_many(['uid:0'])
+
+
+def test_cache_get_many(store_with_presets: KeyValueStore):
+    result = store_with_presets.cache_get_many(['uid:0', 'missing'])
+    assert result == ['666', None]
+
+
+def test_cache_set_many(store: KeyValueStore):
+    store.cache_set_many({'a': '1', 'b': '2'}, 1)
+    assert store.cache_get_many(['a', 'b']) == ['1', '2']
+
+
+def test_cache_get_many_lost_connection(
+    store_with_presets: KeyValueStore,
+    monkeypatch
+):
+    def redis_mget_with_connection_error(*args, **kwargs):
+        raise redis.exceptions.ConnectionError
+
+    monkeypatch.setattr(redis.Redis, 'mget', redis_mget_with_connection_error)
+
+    result = store_with_presets.cache_get_many(['uid:0', 'uid:1'])
+    assert result == [None, None]
+
+
+def test_cache_breaker_fails_fast(monkeypatch):
+    calls = []
+
+    def redis_get_with_connection_error(*args, **kwargs):
+        calls.append(1)
+        raise redis.exceptions.ConnectionError
+
+    monkeypatch.setattr(redis.Redis, 'get', redis_get_with_connection_error)
+    monkeypatch.setattr(redis.Redis, 'mget', redis_get_with_connection_error)
+    store = RedisStorage(breaker_failures=2)
+    assert store.cache_get('uid:0') is None
+    assert store.cache_get('uid:0') is None
+    assert len(calls) == 2
+    assert store.cache_get('uid:0') is None
+    assert store.cache_get_many(['uid:0', 'uid:1']) == [None, None]
+    store.cache_set('uid:0', '1', 10)
+    assert len(calls) == 2
+    # plain keys are not guarded by breaker
+    with pytest.raises(redis.exceptions.ConnectionError):
+        store.get('i:0')
+    assert len(calls) == 3
+
+
+def test_cache_breaker_disabled(monkeypatch):
+    calls = []
+
+    def redis_get_with_connection_error(*args, **kwargs):
+        calls.append(1)
+        raise redis.exceptions.ConnectionError
+
+    monkeypatch.setattr(redis.Redis, 'get', redis_get_with_connection_error)
+    store = RedisStorage(breaker_failures=0)
+    for _ in range(10):
+        assert store.cache_get('uid:0') is None
+    assert len(calls) == 10
+
+
+def test_cache_breaker_probe_with_response_error(monkeypatch):
+    errors = [redis.exceptions.ConnectionError, redis.exceptions.ResponseError]
+
+    def redis_get(*args, **kwargs):
+        if errors:
+            raise errors.pop(0)
+        return '1'
+
+    monkeypatch.setattr(redis.Redis, 'get', redis_get)
+    store = RedisStorage(breaker_failures=1, breaker_reset_sec=0.)
+    assert store.cache_get('uid:0') is None
+    # half-open probe fails with an error of responding redis
+    with pytest.raises(redis.exceptions.ResponseError):
+        store.cache_get('uid:0')
+    assert store.cache_get('uid:0') == '1'
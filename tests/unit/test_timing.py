@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from scoring_api.api.timing import (
+    format_server_timing,
+    stage,
+    start_timings,
+    stop_timings,
+    timings_ms,
+)
+
+
+def test_stage_is_not_measured_outside_of_request():
+    stop_timings()
+    with stage('store'):
+        pass
+
+
+def test_repeated_stages_are_summed():
+    timings = start_timings()
+    try:
+        for _ in range(2):
+            with stage('store'):
+                time.sleep(0.01)
+        with stage('serialize'):
+            pass
+    finally:
+        stop_timings()
+    assert list(timings) == ['store', 'serialize']
+    assert timings['store'] >= 0.02
+    with stage('store'):
+        pass
+    assert len(timings) == 2
+
+
+def test_stage_is_measured_on_error():
+    timings = start_timings()
+    try:
+        with stage('request'):
+            raise ValueError
+    except ValueError:
+        pass
+    finally:
+        stop_timings()
+    assert 'request' in timings
+
+
+def test_timings_of_concurrent_tasks_are_separate():
+    async def handle(delay: float) -> dict[str, float]:
+        timings = start_timings()
+        with stage('store'):
+            await asyncio.sleep(delay)
+        return timings
+
+    async def main() -> list[dict[str, float]]:
+        return await asyncio.gather(handle(0.01), handle(0.05))
+
+    fast, slow = asyncio.run(main())
+    assert fast['store'] < 0.05 <= slow['store']
+
+
+def test_format_timings():
+    timings = {'read': 0.0012345, 'store': 0.01}
+    assert format_server_timing(timings) == 'read;dur=1.234, store;dur=10.000'
+    assert timings_ms(timings) == {'read': 1.234, 'store': 10.0}
+    assert format_server_timing({}) == ''